@@ -11,6 +11,14 @@ from dotenv import load_dotenv
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 import threading, time
+import atexit, signal, sys
+from trigger_queue import TriggerQueue
+from drive_service import DriveServiceCache
+from sync_state import get_sync_state
+from change_feed import ChangeFeedConsumer, FolderRoutes, iter_change_pages
+from watch_scheduler import WatchScheduler
+from dedup_store import dedup_key, get_dedup_store
+from run_batcher import RunBatcher
 
 
 load_dotenv()
@@ -29,12 +37,18 @@ SCOPES = ["https://www.googleapis.com/auth/drive", "https://www.googleapis.com/a
 webhook_url = os.getenv("LANGGRAPH_WEBHOOK_URL")
 # This is the URL of the LangGraph API server
 LANGGRAPH_API_URL = os.getenv("LANGGRAPH_API_URL")
-stored_page_token = None # Store page token for changes API (in production, use database)
+stored_page_token = get_sync_state().get_page_token() # Last committed page token for the changes API (see sync_state.py)
 
-# Deduplication
-recent_files = {}
-lock = threading.Lock()
-cooldown = 60 
+# Deduplication (by file ID + content version, see dedup_store.py)
+dedup_store = get_dedup_store()
+
+# Creates the agent runs in micro-batches over a pooled session (see run_batcher.py)
+run_batcher = RunBatcher(LANGGRAPH_API_URL)
+atexit.register(run_batcher.shutdown)
+
+# Bounded worker pool that runs the agent triggers (see trigger_queue.py)
+trigger_queue = TriggerQueue()
+atexit.register(trigger_queue.shutdown)  # atexit runs this first, the drained triggers then flush through run_batcher
 
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY")  # Required for flash messages
@@ -42,70 +56,131 @@ TOKEN_PATH = os.path.join("Langgraph_server", "google_oauth", "token.json")
 CLIENT_SECRET_FILE = os.path.join("Langgraph_server", "google_oauth", "client_secret.json")
 
 # ======= GOOGLE DRIVE SETUP =======
+def save_drive_token(creds):
+    """Writes the OAuth token to token.json so the next start can reuse it."""
+    with open(TOKEN_PATH, "w") as token:
+        token.write(creds.to_json())
+
+def load_drive_credentials():
+    """Loads the OAuth credentials from token.json, refreshing them or running the OAuth flow if needed."""
+    creds = None
+    # Load existing token if exists
+    if os.path.exists(TOKEN_PATH):
+        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+        #print('Token Path: ', TOKEN_PATH)
+     # If no valid creds, do OAuth flow
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
+            print('Client Secret File: ', CLIENT_SECRET_FILE)
+            creds = flow.run_local_server(port=8080,
+                access_type="offline",
+                include_granted_scopes="true",
+                prompt="consent"
+            )  # opens browser for login, make sure https://localhost/'port' is added to oauth redirect uri.
+        print("OAuth Accepted!")
+        try:
+            # Save token for next run
+            save_drive_token(creds)
+        except Exception as e:
+            print(f"❌ Error saving token: {e}")
+            raise
+    return creds
+
+# Credentials and discovery document are loaded once per process, clients once per thread (see drive_service.py)
+drive_services = DriveServiceCache(load_drive_credentials, save_drive_token)
+
 def get_drive_service():
-    """Get Google Drive service - FIXED VERSION"""
-    """Initializes and returns a Google Drive service object using a service account."""
+    """Returns this thread's cached Google Drive service (credentials are refreshed before they expire)."""
     try:
-        creds = None
-        # Load existing token if exists
-        if os.path.exists(TOKEN_PATH):
-            creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
-            #print('Token Path: ', TOKEN_PATH)
-         # If no valid creds, do OAuth flow
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
-                print('Client Secret File: ', CLIENT_SECRET_FILE)
-                creds = flow.run_local_server(port=8080,
-                    access_type="offline",
-                    include_granted_scopes="true",
-                    prompt="consent"
-                )  # opens browser for login, make sure https://localhost/'port' is added to oauth redirect uri.
-            print("OAuth Accepted!")
-            try:
-                # Save token for next run
-                with open(TOKEN_PATH, "w") as token:
-                    token.write(creds.to_json())
-            except Exception as e:
-                print(f"❌ Error saving token: {e}")
-                raise
-
-        return build("drive", "v3", credentials=creds)
+        return drive_services.get()
     except Exception as e:
         print(f"❌ Error creating Drive service: {e}")
         raise
 
 # ======= INITIALIZE WEBHOOK ON STARTUP =======
+WATCH_CHANNEL_HOURS = int(os.getenv("WATCH_CHANNEL_HOURS", "24")) # Requested lifetime of a watch channel
+
+def register_watch_channel(service):
+    """Registers a new changes().watch channel for the webhook URL and records it in the sync state."""
+    channel_id = str(uuid.uuid4())
+    body = {
+        "id": channel_id,
+        "type": "web_hook",
+        "address": webhook_url,  # Your ngrok webhook URL
+        "token": "your-verification-token",  # Optional security token
+        "expiration": int((datetime.now() + timedelta(hours=WATCH_CHANNEL_HOURS)).timestamp() * 1000)
+    }
+    
+    result = service.changes().watch(
+        pageToken=stored_page_token,
+        body=body
+    ).execute()
+    print("Result executed, pageToken: ", stored_page_token)
+    get_sync_state().save_channel(result.get('id', channel_id), result.get('resourceId'), webhook_url, int(result.get('expiration', body['expiration'])))
+    print(f"✅ Webhook initialized! Channel ID: {channel_id}")
+    print(f"🔗 Webhook URL: {webhook_url}")
+    return result
+
+def stop_watch_channel(service, channel):
+    """Stops a channel at Google (ignoring errors, it may have expired already) and forgets it."""
+    try:
+        service.channels().stop(body={"id": channel["id"], "resourceId": channel["resourceId"]}).execute()
+        print(f"🛑 Stopped old webhook channel {channel['id']}")
+    except Exception as e:
+        print(f"⚠️ Could not stop webhook channel {channel['id']}: {e}")
+    get_sync_state().remove_channel(channel["id"])
+
+def ensure_watch_channel(min_remaining_seconds=0):
+    """
+    Makes sure a channel for the webhook URL stays valid for at least min_remaining_seconds, registering
+    a new one first and then stopping the old ones (so notifications overlap instead of having a gap).
+    Returns False if no channel could be registered.
+    """
+    if not webhook_url:
+        return False
+    sync_state = get_sync_state()
+    if sync_state.active_channel(webhook_url, min_remaining_seconds):
+        return True
+    service = get_drive_service()
+    try:
+        new_channel = register_watch_channel(service)
+    except Exception as e:
+        print(f"❌ Error setting up webhook: {e}")
+        return sync_state.active_channel(webhook_url) is not None  # The old channel still works for now
+    now_ms = time.time() * 1000
+    for channel in sync_state.channels():
+        if channel["id"] != new_channel.get("id") and (channel["address"] == webhook_url or (channel["expiration"] or 0) < now_ms):
+            stop_watch_channel(service, channel)
+    return True
+
 def initialize_drive_webhook():
-    """Set up webhook to monitor changes in the entire Drive"""
+    """Set up webhook to monitor changes in the entire Drive (renewed / replaced by polling by watch_scheduler)"""
     global stored_page_token
     try:
         service = get_drive_service()
-        # Get starting page token
-        response = service.changes().getStartPageToken().execute()
-        stored_page_token = response.get('startPageToken')
-        
-        # Set up webhook for all changes
-        channel_id = str(uuid.uuid4())
-        body = {
-            "id": channel_id,
-            "type": "web_hook",
-            "address": webhook_url,  # Your ngrok webhook URL
-            "token": "your-verification-token",  # Optional security token
-            "expiration": int((datetime.now() + timedelta(hours=24)).timestamp() * 1000)  # 24 hours
-        }
-        
-        result = service.changes().watch(
-            pageToken=stored_page_token,
-            body=body
-        ).execute()
-        print("Result executed, pageToken: ", stored_page_token)
-        
-        print(f"✅ Webhook initialized! Channel ID: {channel_id}")
-        print(f"🔗 Webhook URL: {webhook_url}")
-        return result
+        sync_state = get_sync_state()
+        if stored_page_token:
+            # Resume from the last committed token, so changes made while the app was down are not skipped
+            print(f"⏯️ Resuming Drive changes feed from page token {stored_page_token}")
+        else:
+            # Get starting page token
+            response = service.changes().getStartPageToken().execute()
+            stored_page_token = response.get('startPageToken')
+            sync_state.commit_page_token(stored_page_token)
+
+        # Reuse the channel registered before the restart while it is still valid
+        channel = sync_state.active_channel(webhook_url)
+        if channel:
+            print(f"✅ Webhook channel {channel['id']} still active, reusing it")
+        elif ensure_watch_channel():
+            channel = sync_state.active_channel(webhook_url)
+
+        # Keep the channel renewed from now on (and poll the changes feed whenever there is none)
+        watch_scheduler.start()
+        return channel
         
     except Exception as e:
         print(f"❌ Error setting up webhook: {e}")
@@ -129,61 +204,69 @@ def upload_to_drive(file, filename):
         print(f"❌ Upload failed: {e}")
         raise
 
-# Runs the langgraph agent
-def trigger_langgraph_processing(file_id: str, file_name: str):
-    """Sends a request to the LangGraph API to start processing a file."""
+# Builds the run for a new resume. Only the inputs are sent, the agent fills in the rest of AgentState.
+def queue_langgraph_run(file_id: str, file_name: str):
+    """Queues a stateless run of the recruit agent; it is created with the next batch. Returns a Future (None if not configured)."""
     if not LANGGRAPH_API_URL:
         print("❌ LANGGRAPH_API_URL not set in .env. Cannot trigger agent.")
-        return False
-
-    print("---------- URL IS SET ----------")
+        return None
 
-    # This is the endpoint for creating a new stateless run.
     # We assume the assistant is named 'recruit-agent'. Make sure this
     # matches the ID in your langgraph.json file.
-    url = f"{LANGGRAPH_API_URL}/runs"
-    print("Running Langgraph API")
-    # The payload should match the AgentState of the LangGraph agent
     payload = {
         "assistant_id": "recruit-agent",
         "input": {
             "file_id": file_id, # Provided by webhook
             "file_name": file_name, # Provided by webhook
-            "raw_text": "", # Generated in recruit_agent.py - parsepdf
-            
-            "experience_text": None, # Generated in recruit_agent.py - parsepdf
-            "applicant_name": None, # Generated in recruit_agent.py - parsepdf
-            "applicant_email": "", # Generated in recruit_agent.py - parsepdf"
-            "resume_readable": True, # Default to True, will be set to False if work experience not found
-            
             "input_folder_id": FOLDER_ID,
             "resume_folder_id": RESUME_FOLDER_ID,
             "output_folder_id": PROCESSED_FOLDER_ID,
-            "drive_texts": [],
-            "recruiter_list": [],
-            "match_results": [],
         },
         # For stateless runs, we can ask the server to clean up the thread
         "on_completion": "delete",
     }
-    try:
-        response = requests.post(url, json=payload, timeout=20)
-        response.raise_for_status()
-        run_info = response.json()
-        print(f"✅ LangGraph agent triggered for file: {file_name}. Run ID: {run_info.get('run_id')}")
-        return True
-    except requests.exceptions.RequestException as e:
-        print(f"❌ HTTP error for {file_name}: {e}")
-        try:
-            # Try to log server’s JSON error message
-            print("↩️ Response body:", response.json())
-        except Exception:
-            # Fallback to raw text if JSON fails
-            print("↩️ Raw response body:", response.text)
+    return run_batcher.submit(payload)
+
+# Builds the run for a new job posting (reverse matching: new job posting -> whole resume pool)
+def queue_reverse_run(file_id: str, file_name: str):
+    """Queues a stateless run of the reverse matching agent. Returns a Future (None if not configured)."""
+    if not LANGGRAPH_API_URL:
+        print("❌ LANGGRAPH_API_URL not set in .env. Cannot trigger agent.")
+        return None
+
+    payload = {
+        "assistant_id": "reverse-match-agent",
+        "input": {
+            "file_id": file_id, # The new posting
+            "file_name": file_name,
+            "input_folder_id": FOLDER_ID, # Resume pool
+            "resume_folder_id": RESUME_FOLDER_ID, # Opportunities folder
+        },
+        "on_completion": "delete",
+    }
+    return run_batcher.submit(payload)
+
+# Runs the langgraph agent (and waits until its batch was sent)
+def trigger_langgraph_processing(file_id: str, file_name: str):
+    """Sends a request to the LangGraph API to start processing a file."""
+    future = queue_langgraph_run(file_id, file_name)
+    run_info = future.result() if future else None
+    if run_info is None:
+        print(f"❌ Failed to trigger LangGraph for {file_name}")
         return False
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Request failed for {file_name}: {e}")
+    print(f"✅ LangGraph agent triggered for file: {file_name}. Run ID: {run_info.get('run_id')}")
+    return True
+
+# Runs the reverse matching agent (and waits until its batch was sent)
+def trigger_reverse_matching(file_id: str, file_name: str):
+    """Sends a request to the LangGraph API to match a new job posting against the resume pool."""
+    future = queue_reverse_run(file_id, file_name)
+    run_info = future.result() if future else None
+    if run_info is None:
+        print(f"❌ Failed to trigger reverse matching for posting {file_name}")
         return False
+    print(f"✅ Reverse matching triggered for posting: {file_name}. Run ID: {run_info.get('run_id')}")
+    return True
 
 
 @app.route("/test-trigger")
@@ -512,9 +595,122 @@ def get_uploaded_files():
     files.sort(key=lambda x: x['upload_date'], reverse=True)
     return files
 # ======= NEW SETUP ROUTES =======
+# Watched folders: new resumes (PDF) start the agent, new postings (PDF / text) start reverse matching
+change_routes = FolderRoutes()
+change_routes.add(RESUME_FOLDER_ID, "posting", lambda f: f.get('mimeType') == 'application/pdf' or f.get('mimeType', '').startswith('text/'))
+change_routes.add(FOLDER_ID, "resume", lambda f: f.get('mimeType') == 'application/pdf' or f.get('name', '').lower().endswith('.pdf'))
+
+# Keys of the triggers handed to the worker pool by this process whose run is not created yet
+# (so replaying the pending_triggers table does not queue them a second time)
+handed_off_keys = set()
+handed_off_lock = threading.Lock()
+
+# Queues the agent run for one changed file, returns False if the trigger queue is full
+def queue_file_trigger(file: dict, route: str) -> bool:
+    file_id = file.get('id')
+    file_name = file.get('name')
+
+    # === Deduplication check (same file, same content = duplicate notification) ===
+    key = dedup_key(file, route)
+    if dedup_store.seen(key):
+        print(f"⏩ Skipping duplicate event for {file_name} (ID: {file_id})")
+        get_sync_state().remove_pending_trigger(key)
+        return True
+    with handed_off_lock:
+        if key in handed_off_keys:
+            return True  # Already on its way to the LangGraph server
+        handed_off_keys.add(key)
+
+    # A new job posting is matched against the existing resume pool
+    if route == "posting":
+        print(f"🆕 New posting in opportunities folder: {file_name}")
+        queue_run, label = queue_reverse_run, "Reverse matching"
+    else:
+        print(f"🎯 New PDF in target folder: {file_name}")
+        queue_run, label = queue_langgraph_run, "LangGraph"
+
+    def release_key():
+        with handed_off_lock:
+            handed_off_keys.discard(key)
+
+    # === Processing Wrapper (hands the run to the batcher, marks the file once the run exists) ===
+    def process_file(file_id, file_name):
+        future = queue_run(file_id, file_name)
+        if future is None:
+            release_key()
+            return False
+
+        def on_created(done):
+            run_info = done.result()
+            if run_info is not None:
+                # The server has the run now, the trigger no longer needs to survive a crash
+                dedup_store.mark(key)
+                get_sync_state().remove_pending_trigger(key)
+                print(f"✅ {label} triggered for {file_name}. Run ID: {run_info.get('run_id')}")
+            else:
+                print(f"❌ Failed to trigger {label} for {file_name}, it stays pending and is retried on the next pull")
+            release_key()
+
+        future.add_done_callback(on_created)
+        return True
+
+    # === Queue for the worker pool ===
+    if trigger_queue.submit(process_file, file_id, file_name, key=key):
+        print(f"📥 Queued trigger for {file_name} ({trigger_queue.depth()} waiting)")
+        return True
+    release_key()
+    return False
+
+# Queues every trigger still waiting for its run (left over by a crash, a full queue or a failed run creation)
+def replay_pending_triggers() -> bool:
+    for _, route, file in get_sync_state().pending_triggers():
+        if not queue_file_trigger(file, route):
+            return False
+    return True
+
+# Reads the Drive changes since the stored page token and queues an agent run for every relevant file
+def process_drive_changes() -> bool:
+    """
+    Replays the pending triggers, then pages through the changes feed from the committed page token.
+    Each page's triggers are stored with the page token after it (see sync_state.py) before they are queued,
+    and deleted once their run exists. Returns False if it had to stop early (trigger queue full).
+    """
+    global stored_page_token
+    if not stored_page_token:
+        print("⚠️ No page token yet, initialize the webhook first")
+        return True
+    if not replay_pending_triggers():
+        print("⚠️ Trigger queue is full, pending triggers are retried later")
+        return False
+    sync_state = get_sync_state()
+    service = get_drive_service()
+    pages = 0
+    for changes, resume_token in iter_change_pages(service, stored_page_token):
+        pages += 1
+        triggers = []
+        for change in changes:
+            file = change.get('file')
+            route = change_routes.route(file)
+            if route:
+                triggers.append((dedup_key(file, route), route, file))
+        # From here on a crash replays these triggers from the pending_triggers table
+        sync_state.commit_page(resume_token, triggers)
+        stored_page_token = resume_token
+        for _, route, file in triggers:
+            if not queue_file_trigger(file, route):
+                print("⚠️ Trigger queue is full, the remaining triggers stay pending and are retried later")
+                return False
+    print(f"🔄 Read {pages} page(s) of changes, page token is now: {stored_page_token}")
+    return True
+
+# One background consumer pulls the feed; webhook pings that arrive during a pull are coalesced
+change_feed = ChangeFeedConsumer(process_drive_changes)
+
+# Renews the watch channel before it expires, and polls the feed while there is no channel
+watch_scheduler = WatchScheduler(ensure_watch_channel, change_feed.notify, lambda: stored_page_token)
+
 @app.route('/webhooks/google-drive', methods=['POST'])
 def webhook():
-    global stored_page_token
     print("📢 Received a Google Drive webhook notification.")
     if request.data:
         print("Body:", request.get_json(silent=True) or request.data.decode('utf-8'))
@@ -525,62 +721,7 @@ def webhook():
 
         # We only care about new or updated files. `sync` is for the initial watch setup.
         if resource_state in ["update", "add", "change"]:
-            service = get_drive_service()
-            print("Getting Drive Service!")
-            # Get changes since last check
-            changes_response = service.changes().list(
-                pageToken=stored_page_token,
-                includeRemoved=False,  # Only new/modified files
-                fields="changes(file(id,name,parents,mimeType)),newStartPageToken"
-            ).execute()
-            print("Changes.response occurs")
-
-            changes = changes_response.get('changes', [])
-            for change in changes:
-                file = change.get('file')
-                # print("📨 Resource state:", resource_state)
-                if file and file.get('parents'):
-                    # print("Parents: ", file.get('parents'))
-                    # Check if file is in our target folder
-                    if FOLDER_ID in file.get('parents', []):
-                        # print("File parents:", file.get("parents"))
-                        # print("Expected folder:", FOLDER_ID)
-                        # Check if it's a PDF (or any file you want to process)
-                        if file.get('name', '').lower().endswith('.pdf'):
-                            file_id = file.get('id')
-                            file_name = file.get('name')
-                            print(f"🎯 New PDF in target folder: {file_name}")
-
-                            # === Deduplication check ===
-                            with lock:
-                                now = time.time()
-                                last_run = recent_files.get(file_id, 0)
-                                if now - last_run < cooldown:
-                                    print(f"⏩ Skipping duplicate event for {file_name} (ID: {file_id})")
-                                    continue
-
-                            # === Processing Wrapper ===
-                            def process_file(file_id, file_name):
-                                success = trigger_langgraph_processing(file_id, file_name)
-                                if success:
-                                    with lock:
-                                        recent_files[file_id] = now
-                                        print(f"✅ LangGraph triggered for {file_name}")
-                                else:
-                                    print(f"❌ Failed to trigger LangGraph for {file_name}")
-
-                            # === Run in background thread ===
-                            print("Starting up Thread...")
-                            thread = threading.Thread(
-                                target=process_file,
-                                args=(file_id, file_name),
-                                daemon=True
-                            )
-                            thread.start()
-                            print("Thread started!")
-            # Update stored page token for next time
-            stored_page_token = changes_response.get('newStartPageToken')
-            print(f"🔄 Updated page token to: {stored_page_token}")
+            change_feed.notify()
         return jsonify({"status": "success"}), 200
 
     except Exception as e:
@@ -600,13 +741,20 @@ def check_webhook_status():
         return jsonify({
             "webhook_url": webhook,
             "folder_id": FOLDER_ID,
+            "page_token": stored_page_token,
+            "channels": get_sync_state().channels(),
         })
     except Exception as e:
         return jsonify({"error": str(e)})
 
+@app.route("/trigger-queue-status")
+def trigger_queue_status():
+    """Queue depth and counters of the agent trigger worker pool and the changes feed consumer."""
+    return jsonify({**trigger_queue.status(), "change_feed": change_feed.stats, "watch": watch_scheduler.status(), "runs": run_batcher.stats})
+
 @app.route("/reset-processed", methods=["POST"])
 def reset_processed():
-    recent_files.clear()
+    dedup_store.clear()
     print("✅ Cleared processed files for testing.")
     return jsonify({"status": "reset", "message": "Processed files cleared"}), 200
 
@@ -848,21 +996,26 @@ if __name__ == "__main__":
     
     # Try automatic webhook setup if everything is configured
     print("\n🔔 WEBHOOK SETUP CHECK:")
-    if webhook_url and FOLDER_ID and not stored_page_token:
+    if webhook_url and FOLDER_ID:
         print("   🔄 Prerequisites met, attempting automatic setup...")
         try:
+            resuming = bool(stored_page_token)
             initialize_drive_webhook()
             print(f"   ✅ Webhook automatically initialized!")
+            if resuming:
+                # Catch up on the changes made while the app was down
+                change_feed.notify()
         except Exception as e:
             print(f"   ⚠️  Automatic setup failed: {e}")
             print("   📝 You can set it up manually at: http://localhost:8000/setup-webhook")
     elif not webhook_url:
         print("   ❌ WEBHOOK_URL not set in .env")
         print("   📝 Add: WEBHOOK_URL=https://your-ngrok-url.ngrok-free.app/webhooks/google-drive")
+        if FOLDER_ID:
+            print("   🔁 Polling the Drive changes feed instead")
+            initialize_drive_webhook()
     elif not FOLDER_ID:
         print("   ❌ INPUT_FOLDER_ID not set in .env")
-    elif stored_page_token:
-        print("   ✅ Webhook already initialized")
     else:
         print("   📝 Visit http://localhost:8000/check-webhook-status to initialize")
     
@@ -875,4 +1028,6 @@ if __name__ == "__main__":
     print("     (You can get a file's ID by right-clicking it in Google Drive -> Share -> Copy link)")
     
     
+    # Exit through atexit on SIGTERM too, so the pending triggers are drained
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(debug=True, host="0.0.0.0", port=8000)
\ No newline at end of file
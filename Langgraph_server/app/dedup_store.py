@@ -0,0 +1,102 @@
+# Description: Pluggable deduplication store for Drive change notifications
+# Drive often notifies several times for one upload (create, then metadata / content updates). A file is
+# identified by its ID plus its content version (md5Checksum, or the Drive version for Google Docs), so
+# duplicate notifications are skipped while a real re-upload of the same file ID is processed again.
+# Entries expire after a TTL. The SQLite backend survives restarts and is shared by every worker process.
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sync_state import APP_STATE_DIR
+
+DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "sqlite")  # "sqlite" (shared, durable) or "memory" (single process)
+DEDUP_TTL_SECONDS = int(os.getenv("DEDUP_TTL_SECONDS", str(24 * 3600)))  # How long a processed file version is remembered
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "100000"))  # Memory backend only
+
+
+def dedup_key(file: dict, namespace: str = "") -> str:
+    """Builds the key for a Drive file: namespace, file ID and content version."""
+    version = file.get("md5Checksum") or file.get("version") or ""
+    return f"{namespace}:{file.get('id')}:{version}"
+
+
+class MemoryDedupStore:
+    """In-process LRU with a TTL. Only deduplicates within one process."""
+
+    def __init__(self, ttl_seconds: int = DEDUP_TTL_SECONDS, max_entries: int = DEDUP_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> seen_at
+        self._lock = threading.Lock()
+
+    def seen(self, key: str) -> bool:
+        """True if the key was marked within the TTL."""
+        with self._lock:
+            seen_at = self._entries.get(key)
+            if seen_at is None:
+                return False
+            if time.time() - seen_at > self.ttl_seconds:
+                del self._entries[key]
+                return False
+            self._entries.move_to_end(key)
+            return True
+
+    def mark(self, key: str) -> None:
+        with self._lock:
+            self._entries[key] = time.time()
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteDedupStore:
+    """SQLite backed store with a TTL, shared by every process that opens the same file."""
+
+    def __init__(self, path: str, ttl_seconds: int = DEDUP_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS dedup (key TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_dedup_seen_at ON dedup(seen_at)")
+        self._conn.commit()
+
+    def seen(self, key: str) -> bool:
+        """True if the key was marked within the TTL."""
+        with self._lock:
+            row = self._conn.execute("SELECT seen_at FROM dedup WHERE key = ?", (key,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl_seconds
+
+    def mark(self, key: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO dedup (key, seen_at) VALUES (?, ?)", (key, now))
+            if now - self._last_purge > 3600:
+                # Time based eviction, at most once an hour
+                self._conn.execute("DELETE FROM dedup WHERE seen_at < ?", (now - self.ttl_seconds,))
+                self._last_purge = now
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM dedup")
+            self._conn.commit()
+
+
+def get_dedup_store(backend: str = DEDUP_BACKEND):
+    """Creates the dedup store selected by DEDUP_BACKEND."""
+    if backend == "memory":
+        return MemoryDedupStore()
+    if backend == "sqlite":
+        return SqliteDedupStore(os.path.join(APP_STATE_DIR, "dedup.sqlite"))
+    raise ValueError(f"Unknown DEDUP_BACKEND: {backend}")
@@ -0,0 +1,81 @@
+# Description: Process wide, thread-safe cache for the Google Drive client
+# Building a Drive client reads token.json, may refresh OAuth and parses the discovery document, which
+# used to happen on every webhook, upload and notification. Here the credentials are loaded once and
+# refreshed ahead of expiry, the discovery document is parsed once, and every thread keeps its own
+# client + keep-alive connection (httplib2 connections are not thread safe).
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import httplib2
+from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+DRIVE_TOKEN_REFRESH_MARGIN = int(os.getenv("DRIVE_TOKEN_REFRESH_MARGIN", "300"))  # Refresh the access token this many seconds before it expires
+DRIVE_HTTP_TIMEOUT = int(os.getenv("DRIVE_HTTP_TIMEOUT", "60"))
+
+
+class DriveServiceCache:
+    """
+    Hands out Drive v3 clients that share one set of credentials.
+    `load_credentials()` is only called the first time (or after invalidate()); `save_credentials(creds)`
+    is called after every refresh so token.json stays current.
+    """
+
+    def __init__(self, load_credentials: Callable, save_credentials: Optional[Callable] = None, refresh_margin: int = DRIVE_TOKEN_REFRESH_MARGIN):
+        self.load_credentials = load_credentials
+        self.save_credentials = save_credentials
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self._lock = threading.Lock()
+        self._creds = None
+        self._generation = 0  # Bumped on invalidate(), so threads rebuild their clients
+        self._document = None
+        self._local = threading.local()
+
+    def _discovery_document(self) -> dict:
+        # Called with the lock held. The document ships with google-api-python-client, parse it once.
+        if self._document is None:
+            self._document = json.loads(discovery_cache.get_static_doc("drive", "v3"))
+        return self._document
+
+    def _fresh_credentials(self):
+        """Returns the shared credentials, refreshing them if they expire within the margin."""
+        with self._lock:
+            if self._creds is None:
+                self._creds = self.load_credentials()
+            creds = self._creds
+            expiry = getattr(creds, "expiry", None)  # Naive UTC datetime
+            expiring = expiry is not None and expiry - self.refresh_margin <= datetime.utcnow()
+            if (expiring or not creds.valid) and getattr(creds, "refresh_token", None):
+                creds.refresh(Request())
+                print(f"🔑 Drive access token refreshed (valid until {creds.expiry})")
+                if self.save_credentials:
+                    try:
+                        self.save_credentials(creds)
+                    except Exception as e:
+                        print(f"⚠️ Could not save refreshed token: {e}")
+            return creds
+
+    def get(self):
+        """Returns this thread's Drive client (built on first use, from the cached discovery document)."""
+        creds = self._fresh_credentials()
+        local = self._local
+        if getattr(local, "service", None) is None or local.generation != self._generation:
+            with self._lock:
+                document = self._discovery_document()
+                generation = self._generation
+            http = AuthorizedHttp(creds, http=httplib2.Http(timeout=DRIVE_HTTP_TIMEOUT))
+            local.service = build_from_document(document, http=http)
+            local.generation = generation
+        return local.service
+
+    def invalidate(self) -> None:
+        """Drops the cached credentials and clients (e.g. after the token was revoked or re-authorized)."""
+        with self._lock:
+            self._creds = None
+            self._generation += 1
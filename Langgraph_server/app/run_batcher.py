@@ -0,0 +1,129 @@
+# Description: Micro-batched run creation against the LangGraph API
+# During bulk uploads every file used to cost its own POST /runs on a fresh connection. Runs are now
+# collected for a short window (or until the batch is full) and created with one POST /runs/batch over a
+# pooled keep-alive session. Servers without the batch endpoint get one POST /runs per run, still pooled.
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+LANGGRAPH_BATCH_WINDOW_SECONDS = float(os.getenv("LANGGRAPH_BATCH_WINDOW_SECONDS", "0.5"))  # How long the first run of a batch waits for others
+LANGGRAPH_BATCH_MAX_RUNS = int(os.getenv("LANGGRAPH_BATCH_MAX_RUNS", "25"))  # Runs per /runs/batch request
+LANGGRAPH_MAX_PENDING_RUNS = int(os.getenv("LANGGRAPH_MAX_PENDING_RUNS", "500"))  # submit() blocks above this (back-pressure)
+LANGGRAPH_HTTP_TIMEOUT = float(os.getenv("LANGGRAPH_HTTP_TIMEOUT", "20"))
+
+
+def pooled_session(pool_size: int = 4) -> requests.Session:
+    """A keep-alive session. Only connection errors are retried, a retried POST could create a run twice."""
+    session = requests.Session()
+    retry = Retry(total=None, connect=3, read=0, status=0, other=0, backoff_factor=0.5)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class RunBatcher:
+    """
+    Collects run payloads ({assistant_id, input, ...}) and creates them in batches on a background thread.
+    submit() returns a Future that resolves to the created run (dict), or to None if creating it failed.
+    """
+
+    def __init__(self, api_url: str, window_seconds: float = LANGGRAPH_BATCH_WINDOW_SECONDS, max_batch: int = LANGGRAPH_BATCH_MAX_RUNS, max_pending: int = LANGGRAPH_MAX_PENDING_RUNS):
+        self.api_url = (api_url or "").rstrip("/")
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self.max_pending = max(1, max_pending)
+        self.session = pooled_session()
+        self.batch_supported = True  # Flipped off if the server has no /runs/batch
+        self._pending: List[Tuple[dict, Future, float]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {"runs": 0, "failed": 0, "requests": 0}
+
+    def submit(self, payload: dict) -> Future:
+        """Queues one run. Blocks while max_pending runs are already waiting."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                future.set_result(None)
+                return future
+            while len(self._pending) >= self.max_pending:
+                self._cond.wait()
+            self._pending.append((payload, future, time.monotonic()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="langgraph-run-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return future
+
+    def _next_batch(self) -> List[Tuple[dict, Future, float]]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            # Wait for the batch to fill up, at most window_seconds after its first run arrived
+            while self._pending and len(self._pending) < self.max_batch and not self._closed:
+                remaining = self._pending[0][2] + self.window_seconds - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._cond.notify_all()  # Wake submitters blocked on max_pending
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return  # Closed and drained
+            payloads = [payload for payload, _, _ in batch]
+            try:
+                runs = self._create_runs(payloads)
+            except Exception as e:
+                print(f"❌ Creating {len(payloads)} LangGraph run(s) failed: {e}")
+                runs = [None] * len(payloads)
+            for (_, future, _), run in zip(batch, runs):
+                self.stats["runs" if run is not None else "failed"] += 1
+                future.set_result(run)
+
+    def _create_runs(self, payloads: List[dict]) -> List[Optional[dict]]:
+        if self.batch_supported and len(payloads) > 1:
+            self.stats["requests"] += 1
+            response = self.session.post(f"{self.api_url}/runs/batch", json=payloads, timeout=LANGGRAPH_HTTP_TIMEOUT)
+            if response.status_code in (404, 405):
+                print("⚠️ LangGraph server has no /runs/batch, creating runs one by one")
+                self.batch_supported = False
+            else:
+                response.raise_for_status()
+                runs = response.json()
+                print(f"✅ Created {len(runs)} LangGraph run(s) in one batch")
+                return runs
+
+        runs = []
+        for payload in payloads:
+            self.stats["requests"] += 1
+            try:
+                response = self.session.post(f"{self.api_url}/runs", json=payload, timeout=LANGGRAPH_HTTP_TIMEOUT)
+                response.raise_for_status()
+                runs.append(response.json())
+            except requests.exceptions.RequestException as e:
+                body = getattr(e.response, "text", "") if getattr(e, "response", None) is not None else ""
+                print(f"❌ HTTP error creating run: {e} {body}")
+                runs.append(None)
+        return runs
+
+    def shutdown(self, timeout: float = 30) -> None:
+        """Creates the runs still waiting for their batch, then stops the background thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
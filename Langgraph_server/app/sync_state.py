@@ -0,0 +1,138 @@
+# Description: Durable checkpoint store for the Drive changes feed
+# The changes page token and the watch channel metadata used to live in module globals, so a restart
+# of the Flask app reset the feed to "now" and silently skipped every change made while it was down.
+# They are kept in SQLite instead. The triggers found on a page are stored in the same transaction as the
+# page token after it, and a trigger is only deleted once the LangGraph server created its run, so a crash
+# at any point replays the pending triggers instead of losing them.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+APP_STATE_DIR = os.getenv("AGENT_CACHE_DIR") or os.path.abspath(os.path.join(script_dir, '..', '.cache'))
+
+
+class SyncStateStore:
+    """SQLite backed store for the changes cursor (page token) and the registered watch channels."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")  # The token must survive a power loss, not just a crash
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watch_channels ("
+            " id TEXT PRIMARY KEY,"
+            " resource_id TEXT,"
+            " address TEXT,"
+            " expiration INTEGER,"  # Milliseconds since the epoch, as returned by Drive
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_triggers ("
+            " key TEXT PRIMARY KEY,"  # dedup_key() of the file version
+            " route TEXT NOT NULL,"
+            " file TEXT NOT NULL,"  # The changed file's metadata as JSON
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_page_token(self) -> Optional[str]:
+        """Returns the last committed page token, or None if the feed was never started."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = 'page_token'").fetchone()
+        return row[0] if row else None
+
+    def commit_page_token(self, token: str) -> None:
+        """Stores the page token. Only call this once everything before the token has been handled."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value, updated_at) VALUES ('page_token', ?, ?)",
+                (token, time.time()),
+            )
+            self._conn.commit()
+
+    def commit_page(self, token: str, triggers: List[Tuple[str, str, dict]]) -> None:
+        """Stores a page's triggers [(key, route, file)] and the page token after it, atomically."""
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO pending_triggers (key, route, file, created_at) VALUES (?, ?, ?, ?)",
+                    [(key, route, json.dumps(file), now) for key, route, file in triggers],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (key, value, updated_at) VALUES ('page_token', ?, ?)",
+                    (token, now),
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def pending_triggers(self) -> List[Tuple[str, str, dict]]:
+        """Returns the triggers whose run was not created yet, oldest first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, route, file FROM pending_triggers ORDER BY created_at, key").fetchall()
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+    def remove_pending_trigger(self, key: str) -> None:
+        """Forgets a trigger once its run exists (or it turned out to be a duplicate)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM pending_triggers WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def save_channel(self, channel_id: str, resource_id: str, address: str, expiration: Optional[int]) -> None:
+        """Records a watch channel returned by changes().watch()."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watch_channels (id, resource_id, address, expiration, created_at) VALUES (?, ?, ?, ?, ?)",
+                (channel_id, resource_id, address, expiration, time.time()),
+            )
+            self._conn.commit()
+
+    def remove_channel(self, channel_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM watch_channels WHERE id = ?", (channel_id,))
+            self._conn.commit()
+
+    def channels(self) -> List[dict]:
+        """Returns every recorded channel, newest expiration first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, resource_id, address, expiration FROM watch_channels ORDER BY expiration DESC"
+            ).fetchall()
+        return [{"id": r[0], "resourceId": r[1], "address": r[2], "expiration": r[3]} for r in rows]
+
+    def active_channel(self, address: str, min_remaining_seconds: float = 0) -> Optional[dict]:
+        """Returns the channel for this webhook address that is still valid for at least min_remaining_seconds."""
+        now_ms = time.time() * 1000
+        for channel in self.channels():
+            if channel["address"] == address and (channel["expiration"] or 0) > now_ms + min_remaining_seconds * 1000:
+                return channel
+        return None
+
+
+_sync_state = None
+_sync_state_lock = threading.Lock()
+
+
+def get_sync_state() -> SyncStateStore:
+    """Returns the process wide sync state store."""
+    global _sync_state
+    with _sync_state_lock:
+        if _sync_state is None:
+            _sync_state = SyncStateStore(os.path.join(APP_STATE_DIR, "drive_sync.sqlite"))
+        return _sync_state
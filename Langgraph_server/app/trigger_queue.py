@@ -0,0 +1,115 @@
+# Description: Bounded work queue for webhook-triggered agent runs
+# The webhook only puts triggers on this queue and returns; a fixed pool of worker threads calls
+# the LangGraph API. The queue has a maximum depth (back-pressure instead of one thread per file),
+# pending triggers for the same file are coalesced, and shutdown drains the queue instead of dropping it.
+
+import os
+import queue
+import threading
+import time
+from typing import Callable, Hashable, Optional
+
+# Worker threads = trigger calls running at once. The app's triggers return once the run is handed to the run
+# batcher, so this bounds the hand-off, not the agent runs (those are limited by the LangGraph server's N_JOBS_PER_WORKER)
+TRIGGER_MAX_IN_FLIGHT = int(os.getenv("TRIGGER_MAX_IN_FLIGHT", "4"))
+TRIGGER_QUEUE_SIZE = int(os.getenv("TRIGGER_QUEUE_SIZE", "1000"))  # Pending triggers before new ones are rejected
+TRIGGER_DRAIN_TIMEOUT = float(os.getenv("TRIGGER_DRAIN_TIMEOUT", "60"))  # Seconds to wait for pending triggers on shutdown
+
+_STOP = object()
+
+
+class TriggerQueue:
+    """Fixed-size worker pool fed by a bounded queue. Workers are started on the first submit."""
+
+    def __init__(self, max_in_flight: int = TRIGGER_MAX_IN_FLIGHT, max_queued: int = TRIGGER_QUEUE_SIZE):
+        self.max_in_flight = max(1, max_in_flight)
+        self._queue = queue.Queue(maxsize=max(1, max_queued))
+        self._lock = threading.Lock()
+        self._pending_keys = set()
+        self._workers = []
+        self._accepting = True
+        self.stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "completed": 0, "failed": 0, "in_flight": 0, "max_depth": 0}
+
+    def _start_workers(self) -> None:
+        # Called with the lock held
+        if self._workers:
+            return
+        for i in range(self.max_in_flight):
+            worker = threading.Thread(target=self._work, name=f"trigger-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, func: Callable[..., bool], *args, key: Optional[Hashable] = None) -> bool:
+        """
+        Queues func(*args) without blocking. Returns False if the queue is full or shutting down.
+        A trigger whose key is already waiting in the queue is coalesced into it (counts as accepted).
+        """
+        with self._lock:
+            if not self._accepting:
+                self.stats["rejected"] += 1
+                return False
+            if key is not None and key in self._pending_keys:
+                self.stats["coalesced"] += 1
+                return True
+            self._start_workers()
+            try:
+                self._queue.put_nowait((key, func, args))
+            except queue.Full:
+                self.stats["rejected"] += 1
+                print(f"⚠️ Trigger queue full ({self._queue.qsize()} pending), rejecting trigger")
+                return False
+            if key is not None:
+                self._pending_keys.add(key)
+            self.stats["submitted"] += 1
+            self.stats["max_depth"] = max(self.stats["max_depth"], self._queue.qsize())
+            return True
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                key, func, args = item
+                with self._lock:
+                    self._pending_keys.discard(key)
+                    self.stats["in_flight"] += 1
+                try:
+                    ok = func(*args)
+                except Exception as e:
+                    print(f"❌ Trigger failed: {e}")
+                    ok = False
+                with self._lock:
+                    self.stats["in_flight"] -= 1
+                    self.stats["completed" if ok is not False else "failed"] += 1
+            finally:
+                self._queue.task_done()
+
+    def depth(self) -> int:
+        """Number of triggers waiting for a worker."""
+        return self._queue.qsize()
+
+    def status(self) -> dict:
+        """Queue depth and counters, for the status endpoint."""
+        with self._lock:
+            return {**self.stats, "queued": self._queue.qsize(), "workers": len(self._workers), "accepting": self._accepting}
+
+    def shutdown(self, timeout: float = TRIGGER_DRAIN_TIMEOUT) -> bool:
+        """Stops accepting triggers and waits for the queued ones to finish. Returns False on timeout."""
+        with self._lock:
+            self._accepting = False
+            workers = list(self._workers)
+        if not workers:
+            return True
+        pending = self._queue.qsize()
+        if pending:
+            print(f"⏳ Draining {pending} pending trigger(s)...")
+        for _ in workers:
+            self._queue.put(_STOP)  # Queued after the pending triggers, so those run first
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        drained = not any(worker.is_alive() for worker in workers)
+        if not drained:
+            print(f"⚠️ Trigger queue not drained after {timeout}s, {self._queue.qsize()} trigger(s) dropped")
+        return drained
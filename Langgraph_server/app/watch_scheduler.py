@@ -0,0 +1,76 @@
+# Description: Keeps the Drive push channel alive, and polls when there is none
+# Drive watch channels expire (we ask for 24h), and nothing renewed them, so a day after startup the
+# app silently stopped receiving changes. This scheduler renews the channel well before it expires
+# (the new channel is registered before the old one is stopped, so there is no gap), and whenever no
+# channel can be registered it falls back to polling the changes feed: every POLL_MIN seconds while
+# changes keep coming in, backing off to POLL_MAX while the feed is quiet.
+
+import os
+import threading
+import time
+from typing import Callable, Hashable, Optional
+
+WATCH_CHECK_SECONDS = float(os.getenv("WATCH_CHECK_SECONDS", "300"))  # How often the channel expiration is checked
+WATCH_RENEW_BEFORE_SECONDS = float(os.getenv("WATCH_RENEW_BEFORE_SECONDS", "3600"))  # Renew when the channel expires within this
+WATCH_POLL_MIN_SECONDS = float(os.getenv("WATCH_POLL_MIN_SECONDS", "30"))  # Fallback polling interval while changes are coming in
+WATCH_POLL_MAX_SECONDS = float(os.getenv("WATCH_POLL_MAX_SECONDS", "300"))  # Fallback polling interval after a quiet stretch
+
+
+class WatchScheduler:
+    """
+    Background thread that calls `renew(min_remaining_seconds) -> bool` (True: a push channel is valid for at
+    least that long, renewing it if needed). While it returns False, `poll()` is called on an adaptive
+    interval; `activity()` returns a value that changes whenever the feed had changes (e.g. the page token).
+    """
+
+    def __init__(self, renew: Callable[[float], bool], poll: Callable[[], None], activity: Callable[[], Hashable]):
+        self.renew = renew
+        self.poll = poll
+        self.activity = activity
+        self.push_active = None  # Unknown until the first check
+        self.poll_interval = WATCH_POLL_MIN_SECONDS
+        self._last_activity = None
+        self._next_renew_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="drive-watch-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _check_channel(self) -> None:
+        try:
+            active = bool(self.renew(WATCH_RENEW_BEFORE_SECONDS))
+        except Exception as e:
+            print(f"❌ Watch channel renewal failed: {e}")
+            active = False
+        if active != self.push_active:
+            print("✅ Drive push notifications active" if active else "⚠️ No Drive push channel, falling back to polling the changes feed")
+        self.push_active = active
+
+    def _poll(self) -> None:
+        current = self.activity()
+        if current != self._last_activity:
+            self.poll_interval = WATCH_POLL_MIN_SECONDS  # The feed moved, keep polling quickly
+        else:
+            self.poll_interval = min(WATCH_POLL_MAX_SECONDS, self.poll_interval * 2)
+        self._last_activity = current
+        self.poll()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if time.monotonic() >= self._next_renew_at:
+                self._check_channel()
+                self._next_renew_at = time.monotonic() + WATCH_CHECK_SECONDS
+            if self.push_active:
+                self._stop.wait(max(0.0, self._next_renew_at - time.monotonic()))
+            else:
+                self._poll()
+                self._stop.wait(self.poll_interval)
+
+    def status(self) -> dict:
+        return {"push_active": self.push_active, "poll_interval": None if self.push_active else self.poll_interval}
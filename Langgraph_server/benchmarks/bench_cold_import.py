@@ -0,0 +1,51 @@
+# Description: Measures how long a cold import of the agent graphs takes (what the LangGraph server / a new worker pays)
+# Every sample is a fresh interpreter. Also checks that importing built no clients (see agent/clients.py).
+# Usage (from Langgraph_server/): python benchmarks/bench_cold_import.py [runs] [module]
+
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+MODULE = sys.argv[2] if len(sys.argv) > 2 else "agent.recruit_agent"
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+PROBE = f"""
+import time
+start = time.perf_counter()
+import {MODULE} as module
+elapsed = time.perf_counter() - start
+from agent.clients import clients
+print(elapsed, len(clients._instances), hasattr(module, "graph"))
+"""
+
+
+def sample():
+    env = {**os.environ, "PYTHONPATH": SRC + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True).stdout
+    elapsed, built, has_graph = out.strip().splitlines()[-1].split()
+    return float(elapsed), int(built), has_graph == "True"
+
+
+def slowest_imports(limit=10):
+    """Top cumulative import times from -X importtime (microseconds)."""
+    env = {**os.environ, "PYTHONPATH": SRC + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {MODULE}"], env=env, capture_output=True, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+if __name__ == "__main__":
+    samples = [sample() for _ in range(RUNS)]
+    times = [s[0] for s in samples]
+    print(f"import {MODULE}: median {statistics.median(times) * 1000:.0f} ms, min {min(times) * 1000:.0f} ms over {RUNS} cold runs")
+    print(f"clients built during import: {samples[0][1]} (should be 0), graph compiled: {samples[0][2]}")
+    print("slowest imports (cumulative):")
+    for cumulative_us, name in slowest_imports():
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
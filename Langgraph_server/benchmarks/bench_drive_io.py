@@ -0,0 +1,79 @@
+# Description: Benchmarks bulk Drive I/O (drive_io.py) against the old list-once + serial download loop
+# Runs against a local fake Drive HTTP server, so no credentials or network are needed.
+# Usage (from Langgraph_server/): python benchmarks/bench_drive_io.py [num_files] [latency_ms]
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
+from googleapiclient.discovery import build
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from agent.drive_io import download_file, download_many, list_folder  # noqa: E402
+
+NUM_FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+LATENCY = (int(sys.argv[2]) if len(sys.argv) > 2 else 40) / 1000
+FILE_BYTES = b"%PDF-1.4 fake posting " * 2000  # ~44 KB per file
+DEFAULT_PAGE_SIZE = 100  # Like Drive, a listing without pageSize is truncated
+
+
+class FakeDriveHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        time.sleep(LATENCY)  # Simulated round trip to Google
+        if url.path.endswith("/files"):
+            page_size = int(params.get("pageSize", [DEFAULT_PAGE_SIZE])[0])
+            start = int(params.get("pageToken", ["0"])[0])
+            end = min(start + page_size, NUM_FILES)
+            body = {"files": [{"id": f"file{i}", "name": f"posting{i}.pdf", "mimeType": "application/pdf"} for i in range(start, end)]}
+            if end < NUM_FILES:
+                body["nextPageToken"] = str(end)
+            self._send(json.dumps(body).encode(), "application/json")
+        else:
+            self._send(FILE_BYTES, "application/pdf")
+
+
+def old_loop(service, folder_id):
+    """The original read_drive_folder_node I/O: one listing call, then one download after another."""
+    files = service.files().list(q=f"'{folder_id}' in parents and trashed = false", fields="files(id, name, mimeType)").execute().get("files", [])
+    return {f["id"]: download_file(service, f["id"]) for f in files}
+
+
+def new_io(service, folder_id):
+    files = list_folder(service, folder_id, "id, name, mimeType")
+    return download_many(service, [f["id"] for f in files])
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeDriveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/"
+    service = build("drive", "v3", http=httplib2.Http(), static_discovery=True, client_options={"api_endpoint": endpoint})
+
+    print(f"Fake Drive: {NUM_FILES} files, {LATENCY * 1000:.0f} ms latency per request")
+    for name, fn in (("old loop", old_loop), ("drive_io", new_io)):
+        start = time.perf_counter()
+        result = fn(service, "folder")
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {len(result):4d} files in {elapsed:6.2f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
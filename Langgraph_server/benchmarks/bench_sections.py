@@ -0,0 +1,116 @@
+# Description: Benchmarks the single-pass section segmenter (sections.py) against the old per-keyword line scans
+# Runs on a synthetic corpus (half resumes, half job postings), no PDFs or network needed.
+# Usage (from Langgraph_server/): python benchmarks/bench_sections.py [num_documents]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from agent.sections import posting_sections, resume_sections  # noqa: E402
+
+NUM_DOCUMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+WORDS = "python java cloud team lead design build data api service customer growth agile scale".split()
+
+
+def filler(rng, count):
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))) for _ in range(count)]
+
+
+def make_resume(rng):
+    lines = ["Jane Doe", "jane.doe@example.com", "SUMMARY"] + filler(rng, rng.randint(3, 8))
+    sections = ["WORK EXPERIENCE", "EDUCATION", "SKILLS", "PROJECTS", "CERTIFICATIONS"]
+    rng.shuffle(sections)
+    for heading in sections:
+        lines += [heading] + filler(rng, rng.randint(5, 25))
+    return "\n".join(lines)
+
+
+def make_posting(rng):
+    lines = ["Senior Engineer", "Acme Corp"] + filler(rng, rng.randint(5, 15))
+    lines += ["Required Skills"] + filler(rng, rng.randint(5, 15))
+    lines += [rng.choice(["Nice to have", "About the team", "About you"])] + filler(rng, rng.randint(5, 15))
+    return "\n".join(lines).lower()
+
+
+# The scans extract_experience_node / parse_job_bytes used before (the requirements slice with its
+# off-by-one fixed, so both versions can be compared). All take the cleaned lines and return (start, end).
+def old_experience(lines):
+    end_keys = ["CERTIFICATIONS", "EDUCATION", "SKILLS", "PROJECTS", "SUMMARY"]
+    try:
+        start_index = next(i for i, line in enumerate(lines) if "WORK EXPERIENCE" in line.upper())
+    except StopIteration:
+        return None
+    end_index = len(lines)
+    for i in range(start_index + 1, len(lines)):
+        if any(key in lines[i].upper() for key in end_keys):
+            end_index = i
+            break
+    return start_index, end_index
+
+
+def old_requirements(lines):
+    start_keys = ["skills required", "required skills", "job requirements"]
+    end_keys = ["nice to have", "about you", "about the team", "about the company"]
+    start_index = None
+    for i, line in enumerate(lines[2:]):
+        if any(key in line.lower() for key in start_keys):
+            start_index = i + 2
+            break
+    if start_index is None:
+        return None
+    end_index = len(lines)
+    for j in range(start_index + 1, len(lines)):
+        if any(key in lines[j].lower() for key in end_keys):
+            end_index = j
+            break
+    return start_index, end_index
+
+
+def new_experience(lines):
+    experience = resume_sections.find(lines, "experience")
+    return None if experience is None else (experience.start, experience.end)
+
+
+def new_requirements(lines):
+    requirements = posting_sections.find(lines, "requirements", first_line=2)
+    return None if requirements is None else (requirements.start, requirements.end)
+
+
+def timed(func, documents, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(lines) for lines in documents]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    rng = random.Random(42)
+    resumes = [make_resume(rng) for _ in range(NUM_DOCUMENTS // 2)]
+    postings = [make_posting(rng) for _ in range(NUM_DOCUMENTS - len(resumes))]
+    print(f"Corpus: {len(resumes)} resumes, {len(postings)} postings, {sum(map(len, resumes + postings)) / 1e6:.1f} MB")
+
+    # Line cleanup is the same before and after, only the section search is timed
+    resume_lines = [[line.strip() for line in text.splitlines()] for text in resumes]
+    posting_lines = [[line.strip() for line in text.splitlines() if line.strip()] for text in postings]
+
+    for label, old, new, documents in (
+        ("experience", old_experience, new_experience, resume_lines),
+        ("requirements", old_requirements, new_requirements, posting_lines),
+    ):
+        old_time, old_results = timed(old, documents)
+        new_time, new_results = timed(new, documents)
+        same = sum(a == b for a, b in zip(old_results, new_results))
+        print(f"{label:<13} old scan: {old_time * 1000:7.1f} ms   segmenter: {new_time * 1000:7.1f} ms   "
+              f"speedup: {old_time / new_time:4.1f}x   identical: {same}/{len(documents)}")
+
+    split_time, sections = timed(resume_sections.split, resume_lines)
+    agree = sum(split.get("experience") == resume_sections.find(lines, "experience") for split, lines in zip(sections, resume_lines))
+    print(f"full resume segmentation (all {len(sections[0])} sections): {split_time * 1000:.1f} ms, agrees with find(): {agree}/{len(resume_lines)}")
+
+
+if __name__ == "__main__":
+    main()
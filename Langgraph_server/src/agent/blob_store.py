@@ -0,0 +1,80 @@
+# Description: Run scoped store for downloaded file bytes (e.g. the resume PDF)
+# parse_pdf_node downloads the resume once and puts the bytes here; later nodes (the recruiter
+# email attachment) read them back through a small string handle kept in AgentState, so the state
+# never carries raw bytes and the file is not fetched from Drive twice.
+# Small blobs stay in memory, large ones spill to a temp file. A blob lives until its last reference is
+# released: there is no age-based sweep, which could not tell a leaked blob from one a slow run still uses.
+# Runs that fail part way release their blob from the node that raised (see release_on_error in recruit_agent.py).
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Optional
+
+BLOB_SPILL_BYTES = int(os.getenv("BLOB_SPILL_BYTES", str(5 * 1024 * 1024)))  # Blobs above this go to disk
+
+
+class BlobStore:
+    """Reference counted blob store keyed by '<file_id>:<md5>'."""
+
+    def __init__(self, spill_bytes: int = BLOB_SPILL_BYTES):
+        self.spill_bytes = spill_bytes
+        self._blobs = {}  # handle -> {"data": bytes | None, "path": str | None, "refs": int}
+        self._lock = threading.Lock()
+        self._spill_dir = None
+
+    def put(self, file_id: str, data: bytes) -> str:
+        """Stores the bytes and returns a handle. Putting the same file twice shares one copy."""
+        handle = f"{file_id}:{hashlib.md5(data).hexdigest()}"
+        with self._lock:
+            blob = self._blobs.get(handle)
+            if blob is not None:
+                blob["refs"] += 1
+                return handle
+
+            blob = {"data": None, "path": None, "refs": 1}
+            if len(data) > self.spill_bytes:
+                if self._spill_dir is None:
+                    self._spill_dir = tempfile.mkdtemp(prefix="agent_blobs_")
+                fd, blob["path"] = tempfile.mkstemp(dir=self._spill_dir)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+            else:
+                blob["data"] = data
+            self._blobs[handle] = blob
+            return handle
+
+    def get(self, handle: Optional[str]) -> Optional[bytes]:
+        """Returns the bytes for the handle, or None if it is unknown (e.g. released or expired)."""
+        if not handle:
+            return None
+        with self._lock:
+            blob = self._blobs.get(handle)
+            if blob is None:
+                return None
+            if blob["data"] is not None:
+                return blob["data"]
+            # Read under the lock, so a concurrent release cannot remove the spill file mid-read
+            with open(blob["path"], "rb") as f:
+                return f.read()
+
+    def release(self, handle: Optional[str]) -> None:
+        """Drops one reference to the blob and frees it once nobody uses it."""
+        if not handle:
+            return
+        with self._lock:
+            blob = self._blobs.get(handle)
+            if blob is None:
+                return
+            blob["refs"] -= 1
+            if blob["refs"] <= 0:
+                self._free(handle)
+
+    def _free(self, handle: str) -> None:
+        blob = self._blobs.pop(handle)
+        if blob["path"] and os.path.exists(blob["path"]):
+            os.remove(blob["path"])
+
+
+blob_store = BlobStore()
@@ -0,0 +1,114 @@
+# Description: Lazy, per-process registry of the agent's external clients
+# Importing recruit_agent.py used to read the service account file, build the Calendar and Drive
+# discovery clients, set up the MCP transport and the LLM, all before the graph was even compiled.
+# Each client is now built the first time a node asks for it and then reused by the whole process,
+# so importing / compiling the graphs is cheap and works without credentials or network access.
+
+import os
+import threading
+from typing import Any, Callable, Dict
+
+SCOPES = ['https://www.googleapis.com/auth/drive.readonly', "https://www.googleapis.com/auth/calendar"]
+
+# Build a robust path to the credentials file relative to the script's location.
+# This ensures the script works regardless of the current working directory.
+script_dir = os.path.dirname(os.path.abspath(__file__))
+credentials_path = os.path.abspath(os.path.join(script_dir, '..', '..', 'google_oauth', 'credentials.json'))
+
+
+class ClientRegistry:
+    """Named factories whose result is built once, on first use (thread safe)."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()  # Re-entrant: factories get the clients they depend on
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self._instances[name] = self._factories[name]()
+        return instance
+
+    def reset(self, name: str = None) -> None:
+        """Forgets a built client (or all of them), it is rebuilt on next use."""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+
+clients = ClientRegistry()
+
+
+def _google_credentials():
+    from google.oauth2 import service_account
+
+    # Set up the Service Account (please make sure to add you service account to any google files / calendars you will use)
+    return service_account.Credentials.from_service_account_file(credentials_path, scopes=SCOPES)
+
+
+def _calendar_service():
+    from googleapiclient.discovery import build
+
+    print("📅 Calendar client initialized")
+    return build("calendar", "v3", credentials=clients.get("google_credentials"))  # connect to gcal (to create events)
+
+
+def _drive_service():
+    from googleapiclient.discovery import build
+
+    print("📁 Drive client initialized")
+    return build('drive', 'v3', credentials=clients.get("google_credentials"))  # connect to gdrive (to read files)
+
+
+def _llm():
+    from langchain_openai import ChatOpenAI
+
+    # Initialize openai api key from env
+    print("🤖 LLM initialized")
+    return ChatOpenAI(model="gpt-4", temperature=0)
+
+
+def _mcp_pool():
+    from fastmcp import Client
+    from fastmcp.client.transports import StreamableHttpTransport
+    from agent.mcp_pool import MCPSessionPool
+
+    # Define the MCP client pool (sessions stay open across nodes and runs, see mcp_pool.py)
+    url = os.getenv('gentoro_mcp_url')
+    headers = {"Accept": "application/json, text/event-stream"}
+    print("🔌 MCP client pool initialized")
+    return MCPSessionPool(lambda: Client(StreamableHttpTransport(url=url, headers=headers)))
+
+
+clients.register("google_credentials", _google_credentials)
+clients.register("calendar", _calendar_service)
+clients.register("drive", _drive_service)
+clients.register("llm", _llm)
+clients.register("mcp_pool", _mcp_pool)
+
+
+def get_calendar_service():
+    return clients.get("calendar")
+
+
+def get_drive_service():
+    return clients.get("drive")
+
+
+def get_llm():
+    return clients.get("llm")
+
+
+def get_mcp_pool():
+    return clients.get("mcp_pool")
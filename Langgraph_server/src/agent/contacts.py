@@ -0,0 +1,102 @@
+# Description: Name and email extraction shared by resumes (applicant) and job postings (recruiter)
+# extract_applicant_info and extract_recruiter_emails_node each carried their own copy of these heuristics,
+# recompiling the regexes and lower-casing every line against a skip-word list for every document.
+# Patterns are compiled once here, the skip words are matched by one compiled alternation, and extract_many()
+# handles a whole corpus in one call (used when the job corpus is ingested, see read_drive_folder_node).
+
+import re
+from typing import Iterable, List, NamedTuple, Optional
+
+# Applicant emails (resumes) and recruiter emails (postings) keep the patterns they were found with before
+APPLICANT_EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+RECRUITER_EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
+
+# "Label: Name" patterns, tried in order (the first pattern that matches anywhere wins)
+APPLICANT_NAME_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'name\s*:\s*([A-Za-z\s\.]+)',
+    r'full\s+name\s*:\s*([A-Za-z\s\.]+)',
+    r'contact\s+name\s*:\s*([A-Za-z\s\.]+)',
+))
+RECRUITER_NAME_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'from\s*:\s*([A-Za-z\s\.]+)',
+    r'sent\s+by\s*:\s*([A-Za-z\s\.]+)',
+    r'contact\s*:\s*([A-Za-z\s\.]+)',
+    r'recruiter\s*:\s*([A-Za-z\s\.]+)',
+    r'hiring\s+manager\s*:\s*([A-Za-z\s\.]+)',
+    r'contact\s+name\s*:\s*([A-Za-z\s\.]+)',
+))
+
+NAME_LINE_PATTERN = re.compile(r'^[A-Za-z\s\.]+$')  # A name line only holds letters, spaces and dots
+EMAIL_NAME_SEPARATORS = re.compile(r'[0-9._-]')
+
+# Words that mark a line near the top of a resume as a heading / contact detail rather than the name.
+# They are matched anywhere in the lowered line (like before), so "Educational Background" is skipped too.
+SKIP_WORDS = frozenset((
+    'resume', 'cv', 'curriculum vitae', 'phone', 'email', 'address',
+    'objective', 'summary', 'experience', 'education', 'skills',
+    'linkedin', 'github', 'portfolio', 'website', 'http', 'www',
+))
+SKIP_PATTERN = re.compile("|".join(re.escape(word) for word in sorted(SKIP_WORDS)))
+NAME_SEARCH_LINES = 10  # The name is looked for in the first lines of a resume
+
+
+class Contact(NamedTuple):
+    name: Optional[str]
+    email: Optional[str]
+
+
+def name_from_email(email: str) -> Optional[str]:
+    """'jane.doe93@x.com' -> 'Jane Doe', None when the local part does not look like a name."""
+    clean_name = ' '.join(EMAIL_NAME_SEPARATORS.sub(' ', email.split('@')[0]).split())
+    if len(clean_name) > 2 and len(clean_name.split()) <= 3:
+        return clean_name.title()
+    return None
+
+
+def _labelled_name(text: str, patterns) -> Optional[str]:
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def _top_line_name(text: str) -> Optional[str]:
+    for line in text.split('\n', NAME_SEARCH_LINES)[:NAME_SEARCH_LINES]:
+        line = line.strip()
+        if not line or len(line) >= 100 or not NAME_LINE_PATTERN.match(line) or len(line.split()) > 4:
+            continue
+        if not SKIP_PATTERN.search(line.lower()):
+            return line
+    return None
+
+
+def applicant_contact(text: str) -> Contact:
+    """Name and email of the applicant: the name from the top lines, a "Name:" label, or the email address."""
+    match = APPLICANT_EMAIL_PATTERN.search(text)
+    email = match.group(0) if match else None
+    name = _top_line_name(text) or _labelled_name(text, APPLICANT_NAME_PATTERNS)
+    if not name and email:
+        name = name_from_email(email)
+    return Contact(name, email)
+
+
+def recruiter_contact(text: str) -> Optional[Contact]:
+    """The first email address of a posting and the recruiter's name, None when the posting has no email."""
+    match = RECRUITER_EMAIL_PATTERN.search(text)
+    if not match:
+        return None
+    email = match.group(0)
+    return Contact(_labelled_name(text, RECRUITER_NAME_PATTERNS) or name_from_email(email), email)
+
+
+def extract_many(texts: Iterable[str], kind: str = "applicant") -> List[Optional[Contact]]:
+    """Contacts of a whole corpus in one call, kind is "applicant" or "recruiter". Identical texts are parsed once."""
+    extract = {"applicant": applicant_contact, "recruiter": recruiter_contact}[kind]
+    seen = {}
+    results = []
+    for text in texts:
+        if text not in seen:
+            seen[text] = extract(text)
+        results.append(seen[text])
+    return results
@@ -0,0 +1,120 @@
+# Description: Persistent on-disk cache for parsed Google Drive files
+# Job postings only change a few times a week, so we keep the cleaned text and
+# extracted requirements on disk and only re-download files whose Drive
+# fingerprint (modifiedTime + md5Checksum) has changed since the last run.
+
+import json
+import os
+import tempfile
+import threading
+from typing import Iterable, Optional
+
+# Build a robust path to the cache folder relative to the script's location (Langgraph_server/.cache)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.getenv("AGENT_CACHE_DIR") or os.path.abspath(os.path.join(script_dir, '..', '..', '.cache'))
+CACHE_VERSION = 2 # Bump when the stored payload format changes (forces a full re-parse)
+
+# Metadata fields that must be requested from files().list for the cache to work
+DRIVE_FINGERPRINT_FIELDS = "id, name, mimeType, modifiedTime, md5Checksum"
+
+
+def drive_fingerprint(file_meta: dict) -> dict:
+    """Returns the parts of the Drive metadata that change when the file content changes."""
+    return {
+        "modifiedTime": file_meta.get("modifiedTime"),
+        "md5Checksum": file_meta.get("md5Checksum"),
+    }
+
+
+class DriveFileCache:
+    """
+    JSON backed cache of parsed Drive files, keyed by Drive file ID.
+    Each entry stores the fingerprint it was parsed from, so a changed file is treated as a miss.
+    One cache file should map to one Drive folder, so that evict_missing() can drop deleted files.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CACHE_VERSION:
+                print(f"♻️ Cache format changed, rebuilding: {self.path}")
+                return {}
+            return data.get("entries", {})
+        except Exception as e:
+            print(f"⚠️ Could not read cache {self.path}, starting empty: {e}")
+            return {}
+
+    def get(self, file_meta: dict) -> Optional[dict]:
+        """Returns the cached payload for the file, or None if it is missing or stale."""
+        with self._lock:
+            entry = self._entries.get(file_meta["id"])
+            if entry is None or entry.get("fingerprint") != drive_fingerprint(file_meta):
+                return None
+            return entry["payload"]
+
+    def put(self, file_meta: dict, payload: dict) -> None:
+        """Stores the payload parsed from the given version of the file."""
+        with self._lock:
+            self._entries[file_meta["id"]] = {
+                "fingerprint": drive_fingerprint(file_meta),
+                "payload": payload,
+            }
+            self._dirty = True
+
+    def evict_missing(self, live_ids: Iterable[str]) -> int:
+        """Drops entries for files that no longer exist in the folder. Returns the number evicted."""
+        live = set(live_ids)
+        with self._lock:
+            stale = [file_id for file_id in self._entries if file_id not in live]
+            for file_id in stale:
+                del self._entries[file_id]
+            if stale:
+                self._dirty = True
+        return len(stale)
+
+    def payloads(self) -> dict:
+        """Returns a snapshot of {file_id: payload} for every cached file."""
+        with self._lock:
+            return {file_id: entry["payload"] for file_id, entry in self._entries.items()}
+
+    def save(self) -> None:
+        """Writes the cache to disk atomically (only if something changed)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": CACHE_VERSION, "entries": self._entries}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Write to a temp file first so a crash never leaves a half written cache behind
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+
+# One cache object per file per process
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_drive_cache(name: str, folder_id: str) -> DriveFileCache:
+    """Returns the process wide cache for the given folder (e.g. name='job_corpus')."""
+    path = os.path.join(CACHE_DIR, f"{name}_{folder_id}.json")
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = DriveFileCache(path)
+        return _caches[path]
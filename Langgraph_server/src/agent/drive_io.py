@@ -0,0 +1,108 @@
+# Description: Bulk Google Drive I/O helpers
+# - list_folder pages through the whole listing (files().list silently truncates at one page)
+# - download_many downloads media concurrently on a bounded thread pool
+# Every call is retried with exponential backoff on rate limits (429), server errors (5xx) and SSL errors.
+
+import io
+import os
+import random
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import MediaIoBaseDownload, HttpError
+
+DRIVE_MAX_WORKERS = int(os.getenv("DRIVE_MAX_WORKERS", "8"))  # Parallel media downloads
+DRIVE_CHUNK_SIZE = int(os.getenv("DRIVE_CHUNK_SIZE", str(32 * 1024 * 1024)))  # Bytes per download request
+DRIVE_MAX_RETRIES = int(os.getenv("DRIVE_MAX_RETRIES", "5"))
+DRIVE_PAGE_SIZE = 1000  # Max allowed by files().list
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRY_STATUSES
+    return isinstance(error, (ssl.SSLError, ConnectionError, TimeoutError))
+
+
+def execute_with_retry(call: Callable, retries: int = DRIVE_MAX_RETRIES, base_delay: float = 0.5):
+    """Runs call() and retries retryable errors with exponential backoff plus jitter."""
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            delay = base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+            print(f"🔁 Drive call failed ({e}), retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
+
+
+def list_folder(service, folder_id: str, fields: str, extra_query: str = "") -> List[dict]:
+    """Lists every (non trashed) file in the folder, following nextPageToken until the end."""
+    query = f"'{folder_id}' in parents and trashed = false" + (f" and {extra_query}" if extra_query else "")
+    files, page_token = [], None
+    while True:
+        response = execute_with_retry(lambda: service.files().list(
+            q=query,
+            fields=f"nextPageToken, files({fields})",
+            pageSize=DRIVE_PAGE_SIZE,
+            pageToken=page_token,
+        ).execute())
+        files.extend(response.get("files", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return files
+
+
+# httplib2 is not thread safe, so every worker thread gets its own connection (reused across downloads)
+_thread_local = threading.local()
+
+
+def _thread_http(service):
+    base = service._http
+    key = id(base)
+    pool = getattr(_thread_local, "http", None)
+    if pool is None:
+        pool = _thread_local.http = {}
+    if key not in pool:
+        credentials = getattr(base, "credentials", None)
+        http = httplib2.Http(timeout=getattr(base, "timeout", None) or 60)
+        pool[key] = AuthorizedHttp(credentials, http=http) if credentials is not None else http
+    return pool[key]
+
+
+def download_file(service, file_id: str, http=None, chunksize: int = DRIVE_CHUNK_SIZE) -> bytes:
+    """Downloads a file's content, retrying (from the start) on transient errors."""
+    def _download():
+        request = service.files().get_media(fileId=file_id)
+        if http is not None:
+            request.http = http
+        fh = io.BytesIO()
+        downloader = MediaIoBaseDownload(fh, request, chunksize=chunksize)
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+        return fh.getvalue()
+
+    return execute_with_retry(_download)
+
+
+def download_many(service, file_ids: Iterable[str], max_workers: int = DRIVE_MAX_WORKERS, chunksize: int = DRIVE_CHUNK_SIZE) -> Dict[str, Union[bytes, Exception]]:
+    """Downloads many files concurrently. Returns {file_id: bytes} (or the exception for failed files)."""
+    file_ids = list(file_ids)
+    if not file_ids:
+        return {}
+
+    def _worker(file_id):
+        try:
+            return download_file(service, file_id, http=_thread_http(service), chunksize=chunksize)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(file_ids))), thread_name_prefix="drive-io") as pool:
+        return dict(zip(file_ids, pool.map(_worker, file_ids)))
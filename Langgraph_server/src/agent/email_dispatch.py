@@ -0,0 +1,99 @@
+# Description: Concurrent email dispatch with per-recipient ordering and Gmail friendly rate limits
+# Messages to different recipients are sent in parallel (bounded by a semaphore), messages to the same
+# recipient keep their order, and token buckets per recipient domain / per sender keep us under quota.
+
+import asyncio
+import os
+import weakref
+from typing import Awaitable, Callable, Dict, List, Union
+
+from agent.match_engine import TokenBucket
+
+EMAIL_MAX_CONCURRENCY = int(os.getenv("EMAIL_MAX_CONCURRENCY", "5"))  # Emails in flight at once
+EMAIL_PER_DOMAIN_RPM = int(os.getenv("EMAIL_PER_DOMAIN_RPM", "30"))  # Emails per minute to one recipient domain (0 disables)
+EMAIL_PER_SENDER_RPM = int(os.getenv("EMAIL_PER_SENDER_RPM", "60"))  # Emails per minute from one sender (0 disables)
+
+SendFunc = Callable[[dict], Awaitable]
+
+
+def _payload_key(payload: dict) -> tuple:
+    attachments = tuple((a.get("filename"), a.get("file_bytes")) for a in payload.get("attachments") or [])
+    return payload.get("recipient_email"), payload.get("subject"), payload.get("body"), attachments
+
+
+def _domain(address: str) -> str:
+    return address.rsplit("@", 1)[-1].lower() if address else ""
+
+
+class EmailDispatcher:
+    """Sends Gmail payloads ({sender_id, recipient_email, subject, body, attachments?}) through `send`."""
+
+    def __init__(self, send: SendFunc, max_concurrency: int = EMAIL_MAX_CONCURRENCY, per_domain_rpm: int = EMAIL_PER_DOMAIN_RPM, per_sender_rpm: int = EMAIL_PER_SENDER_RPM):
+        self.send = send
+        self.per_domain_rpm = per_domain_rpm
+        self.per_sender_rpm = per_sender_rpm
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._domain_buckets: Dict[str, TokenBucket] = {}
+        self._sender_buckets: Dict[str, TokenBucket] = {}
+
+    async def _throttle(self, payload: dict) -> None:
+        if self.per_sender_rpm > 0:
+            sender = payload.get("sender_id", "me")
+            bucket = self._sender_buckets.setdefault(sender, TokenBucket(self.per_sender_rpm))
+            await bucket.acquire()
+        if self.per_domain_rpm > 0:
+            domain = _domain(payload.get("recipient_email", ""))
+            bucket = self._domain_buckets.setdefault(domain, TokenBucket(self.per_domain_rpm))
+            await bucket.acquire()
+
+    async def _send_one(self, payload: dict):
+        await self._throttle(payload)
+        async with self._semaphore:
+            return await self.send(payload)
+
+    async def send_all(self, payloads: List[dict]) -> List[Union[object, Exception]]:
+        """
+        Sends every payload and returns the result (or exception) for each, in the same order.
+        Identical payloads are only sent once; payloads to the same recipient are sent one after another.
+        """
+        # Coalesce exact duplicates (same recipient, subject, body and attachments)
+        unique: Dict[tuple, int] = {}
+        order = []
+        for payload in payloads:
+            key = _payload_key(payload)
+            if key not in unique:
+                unique[key] = len(order)
+                order.append(payload)
+
+        # One sequential chain per recipient, chains run concurrently
+        chains: Dict[str, List[int]] = {}
+        for i, payload in enumerate(order):
+            chains.setdefault((payload.get("recipient_email") or "").lower(), []).append(i)
+
+        results: List[Union[object, Exception]] = [None] * len(order)
+
+        async def _run_chain(indexes: List[int]) -> None:
+            for i in indexes:
+                try:
+                    results[i] = await self._send_one(order[i])
+                except Exception as e:
+                    results[i] = e
+
+        await asyncio.gather(*(_run_chain(indexes) for indexes in chains.values()))
+        return [
+            results[unique[_payload_key(p)]]
+            for p in payloads
+        ]
+
+
+# Gmail quotas are per account, so all runs in the process share one dispatcher (one per event loop)
+_dispatchers = weakref.WeakKeyDictionary()
+
+
+def get_email_dispatcher(send: SendFunc) -> EmailDispatcher:
+    """Returns the process wide dispatcher for the running event loop."""
+    loop = asyncio.get_running_loop()
+    dispatcher = _dispatchers.get(loop)
+    if dispatcher is None:
+        dispatcher = _dispatchers[loop] = EmailDispatcher(send)
+    return dispatcher
@@ -0,0 +1,95 @@
+# Description: Cached, batched Google Calendar free/busy lookups
+# All recruiters that need slots in a run are looked up with a single freebusy().query covering
+# the whole search horizon, and the answer is cached for a short time so the same recruiter is not
+# queried again for every resume that matches one of their postings.
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+FREEBUSY_TTL_SECONDS = int(os.getenv("FREEBUSY_TTL_SECONDS", "300"))
+FREEBUSY_MAX_ITEMS = 50  # Max calendars per freebusy query
+FREEBUSY_TIMEZONE = "America/Los_Angeles"
+
+BusyIntervals = List[Tuple[datetime, datetime]]
+
+
+def _parse_busy(busy_times: List[dict]) -> BusyIntervals:
+    # Normalize busy intervals to naive datetimes for comparison
+    intervals = [
+        (datetime.fromisoformat(b["start"].replace("Z", "+00:00")).replace(tzinfo=None),
+         datetime.fromisoformat(b["end"].replace("Z", "+00:00")).replace(tzinfo=None))
+        for b in busy_times
+    ]
+    intervals.sort(key=lambda x: x[0])
+    return intervals
+
+
+class FreeBusyCache:
+    """
+    Per-recruiter cache of busy intervals. An entry answers any lookup whose time range it covers.
+    `None` is cached for calendars we have no access to, so those are not re-queried either.
+    """
+
+    def __init__(self, ttl_seconds: int = FREEBUSY_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}  # email -> (time_min, time_max, fetched_at, intervals | None)
+        self._lock = threading.Lock()
+
+    def get(self, email: str, time_min: datetime, time_max: datetime):
+        """Returns (hit, intervals). intervals is None when the calendar is not accessible."""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return False, None
+            entry_min, entry_max, fetched_at, intervals = entry
+            if time.monotonic() - fetched_at > self.ttl_seconds or entry_min > time_min or entry_max < time_max:
+                return False, None
+            return True, intervals
+
+    def put(self, email: str, time_min: datetime, time_max: datetime, intervals: Optional[BusyIntervals]) -> None:
+        with self._lock:
+            self._entries[email] = (time_min, time_max, time.monotonic(), intervals)
+
+
+freebusy_cache = FreeBusyCache()
+
+
+def query_busy(service, emails: Iterable[str], time_min: datetime, time_max: datetime, cache: FreeBusyCache = freebusy_cache) -> Dict[str, Optional[BusyIntervals]]:
+    """
+    Returns {email: busy intervals} for every email, or None for calendars we cannot read.
+    Cached calendars are served from memory; the rest are fetched with one multi-calendar query
+    (split in groups of 50, the API limit) covering [time_min, time_max).
+    """
+    results = {}
+    missing = []
+    for email in dict.fromkeys(emails):  # Dedupe, keep order
+        hit, intervals = cache.get(email, time_min, time_max)
+        if hit:
+            results[email] = intervals
+        else:
+            missing.append(email)
+
+    for start in range(0, len(missing), FREEBUSY_MAX_ITEMS):
+        group = missing[start:start + FREEBUSY_MAX_ITEMS]
+        freebusy_query = {
+            "timeMin": time_min.isoformat() + "Z",
+            "timeMax": time_max.isoformat() + "Z",
+            "timeZone": FREEBUSY_TIMEZONE,
+            "items": [{"id": email} for email in group],
+        }
+        response = service.freebusy().query(body=freebusy_query).execute()
+        calendars = response.get("calendars", {})
+        for email in group:
+            calendar = calendars.get(email)
+            if calendar is None:
+                print(f"⚠️ No calendar access for {email}")
+                intervals = None
+            else:
+                intervals = _parse_busy(calendar.get("busy", []))
+            cache.put(email, time_min, time_max, intervals)
+            results[email] = intervals
+    print(f"📅 Free/busy lookup: {len(results) - len(missing)} cached, {len(missing)} queried")
+    return results
@@ -0,0 +1,129 @@
+# Description: Content addressed cache for LLM match results
+# The same resume is often re-uploaded / re-triggered, so identical comparisons
+# (same experience text, same requirements, same prompt version, same model) are answered from disk.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from agent.corpus_cache import CACHE_DIR
+
+MATCH_CACHE_TTL_SECONDS = int(os.getenv("MATCH_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))  # 30 days
+MATCH_CACHE_MAX_ENTRIES = int(os.getenv("MATCH_CACHE_MAX_ENTRIES", "50000"))
+MATCH_CACHE_PURGE_INTERVAL_SECONDS = 3600  # Expired rows are also swept from put() at most this often
+
+
+def match_cache_key(experience_text: str, requirements: str, prompt_version: str, model_name: str) -> str:
+    """Hashes everything that can change the LLM's answer into one key."""
+    digest = hashlib.sha256()
+    for part in (experience_text or "", requirements or "", prompt_version, model_name):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")  # Separator so ("ab", "c") and ("a", "bc") do not collide
+    return digest.hexdigest()
+
+
+class MatchCache:
+    """
+    SQLite backed key/value cache with a TTL and LRU eviction.
+    `hits` and `misses` count lookups since the cache object was created.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = MATCH_CACHE_TTL_SECONDS, max_entries: int = MATCH_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS match_cache ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_match_cache_last_access ON match_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached LLM answer, or None on a miss (expired entries count as misses)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content, created_at FROM match_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM match_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE match_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, content: str) -> None:
+        """Stores an LLM answer and evicts the least recently used entries above max_entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO match_cache (key, content, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, content, now, now),
+            )
+            if self.max_entries > 0:
+                self._conn.execute(
+                    "DELETE FROM match_cache WHERE key IN ("
+                    " SELECT key FROM match_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            # Expired answers that are never looked up again would otherwise stay until the LRU cap evicts them
+            if now - self._last_purge > MATCH_CACHE_PURGE_INTERVAL_SECONDS:
+                self._delete_expired(now)
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Deletes every entry older than the TTL. Returns the number removed."""
+        with self._lock:
+            removed = self._delete_expired(time.time())
+            self._conn.commit()
+            return removed
+
+    def _delete_expired(self, now: float) -> int:
+        self._last_purge = now
+        if self.ttl_seconds <= 0:
+            return 0
+        return self._conn.execute("DELETE FROM match_cache WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current number of entries."""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM match_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": size,
+        }
+
+
+_match_cache = None
+_match_cache_lock = threading.Lock()
+
+
+def get_match_cache() -> MatchCache:
+    """Returns the process wide match cache."""
+    global _match_cache
+    with _match_cache_lock:
+        if _match_cache is None:
+            _match_cache = MatchCache(os.path.join(CACHE_DIR, "match_cache.sqlite"))
+            removed = _match_cache.purge_expired()
+            if removed:
+                print(f"🧹 Removed {removed} expired match cache entries")
+        return _match_cache
@@ -0,0 +1,285 @@
+# Description: Async matching engine that fans resume/job comparisons out to the LLM
+# Requests run concurrently (bounded by a max-in-flight limit), each with its own timeout,
+# and are throttled by token buckets so we stay under the provider's RPM / TPM quotas.
+
+import asyncio
+import json
+import os
+import re
+import time
+import weakref
+from typing import List, Optional, Tuple, Union
+
+# Engine settings (set in .env, 0 disables the rate limit)
+MATCH_MAX_IN_FLIGHT = int(os.getenv("MATCH_MAX_IN_FLIGHT", "8"))
+MATCH_TIMEOUT_SECONDS = float(os.getenv("MATCH_TIMEOUT_SECONDS", "90"))
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))
+EXPECTED_OUTPUT_TOKENS = 150 # Rough size of a "Score / Did Meet / Comment" answer
+
+# Batch mode packs several postings into one prompt so the resume is only sent once per batch
+MATCH_BATCH_MODE = os.getenv("MATCH_BATCH_MODE", "false").lower() in ("1", "true", "yes")
+MATCH_BATCH_TOKEN_BUDGET = int(os.getenv("MATCH_BATCH_TOKEN_BUDGET", "6000"))  # Max prompt tokens per batch
+MATCH_BATCH_MAX_POSTINGS = int(os.getenv("MATCH_BATCH_MAX_POSTINGS", "8"))
+
+# Bump whenever MATCH_PROMPT changes, so cached answers from the old prompt are not reused
+MATCH_PROMPT_VERSION = "1"
+MATCH_PROMPT = """
+        You're a recruiting assistant. Compare the resume experience below with the job requirements, and rate the match on a scale from 1 to 10.
+        It is most important that the candidate meets the job requirements. Please add a yes or no to the end pertaining to if all the requirements are met.
+        If a resume has all the requirements, you will send an email to the recruiter, skills desired are not important. be consistent.
+        If the candidate meets all job requirements, you will send an email to the recruiter.
+        Also give a two-sentence explanation. If a resume does not meet the requirements, explain why.
+        Resume Experience:
+        \"\"\"
+        {resume}
+        \"\"\"
+        Job Requirements:
+        \"\"\"
+        {requirements}
+        \"\"\"
+        Return your answer in this format:
+        Score: X/10
+        Did Meet All Requirements: Yes/No (If yes, will be sending an email to the recruiter)
+        Comment: <your explanation here>
+        """
+
+
+MATCH_BATCH_PROMPT_VERSION = "1"
+MATCH_BATCH_PROMPT = """
+        You're a recruiting assistant. Compare the resume experience below with EACH of the numbered job postings, and rate every match on a scale from 1 to 10.
+        It is most important that the candidate meets the job requirements. For each posting, say whether all the requirements are met.
+        Skills desired are not important, only the requirements. Judge every posting independently and be consistent.
+        Also give a two-sentence explanation per posting. If a resume does not meet the requirements, explain why.
+        Resume Experience:
+        \"\"\"
+        {resume}
+        \"\"\"
+        Job Postings:
+        {postings}
+        Return ONLY a JSON array with one object per posting, in this format:
+        [{{"id": <posting number>, "score": <1-10>, "requirements_met": true/false, "comment": "<your explanation here>"}}]
+        """
+MATCH_BATCH_POSTING = """
+        Posting {id} Requirements:
+        \"\"\"
+        {requirements}
+        \"\"\"
+"""
+
+
+def build_match_prompt(resume: str, requirements: str) -> str:
+    """Builds the single posting comparison prompt."""
+    return MATCH_PROMPT.format(resume=resume, requirements=requirements)
+
+
+def build_batch_prompt(resume: str, requirements_list: List[str]) -> str:
+    """Builds one prompt comparing the resume with several postings (numbered from 1)."""
+    postings = "".join(
+        MATCH_BATCH_POSTING.format(id=i, requirements=requirements)
+        for i, requirements in enumerate(requirements_list, 1)
+    )
+    return MATCH_BATCH_PROMPT.format(resume=resume, postings=postings)
+
+
+def match_prompt_version(batch_mode: bool = MATCH_BATCH_MODE) -> str:
+    """Version of the prompt template in use (part of the match cache key)."""
+    return f"batch-{MATCH_BATCH_PROMPT_VERSION}" if batch_mode else MATCH_PROMPT_VERSION
+
+
+def match_prompt_versions(batch_mode: bool = MATCH_BATCH_MODE) -> List[str]:
+    """Prompt versions whose cached answers can be reused, preferred first (batch mode falls back to single prompts)."""
+    return [match_prompt_version(True), MATCH_PROMPT_VERSION] if batch_mode else [MATCH_PROMPT_VERSION]
+
+
+def pack_batches(resume: str, requirements_list: List[str], token_budget: int = MATCH_BATCH_TOKEN_BUDGET, max_postings: int = MATCH_BATCH_MAX_POSTINGS) -> List[List[int]]:
+    """
+    Greedily groups posting indexes into batches whose prompt stays under token_budget.
+    A posting that does not fit alongside the resume on its own still gets a batch of one.
+    """
+    base = estimate_tokens(build_batch_prompt(resume, []))
+    batches, current, used = [], [], base
+    for i, requirements in enumerate(requirements_list):
+        cost = estimate_tokens(MATCH_BATCH_POSTING.format(id=len(current) + 1, requirements=requirements))
+        if current and (used + cost > token_budget or len(current) >= max_postings):
+            batches.append(current)
+            current, used = [], base
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_response(content: str, count: int) -> List[str]:
+    """
+    Parses the JSON array answer of a batch prompt into one answer per posting, in the
+    single posting "Score / Did Meet All Requirements / Comment" format used everywhere else.
+    Raises ValueError if the answer is not valid or does not cover every posting.
+    """
+    start, end = content.find("["), content.rfind("]")
+    if start == -1 or end <= start:
+        raise ValueError("No JSON array in batch answer")
+    items = json.loads(content[start:end + 1])
+
+    answers = {}
+    for item in items:
+        posting_id = int(item["id"])
+        score = int(item["score"])
+        met = item["requirements_met"]
+        if isinstance(met, str):
+            met = met.strip().lower() in ("yes", "true")
+        answers[posting_id] = (
+            f"Score: {score}/10\n"
+            f"Did Meet All Requirements: {'Yes' if met else 'No'}\n"
+            f"Comment: {str(item.get('comment', '')).strip()}"
+        )
+    missing = [i for i in range(1, count + 1) if i not in answers]
+    if missing:
+        raise ValueError(f"Batch answer is missing postings {missing}")
+    return [answers[i] for i in range(1, count + 1)]
+
+
+def evaluate_match(content: str):
+    """
+    Applies the acceptance rule to an LLM answer: requirements met OR score >= 8.
+    Returns (accepted, requirements_met, score).
+    """
+    requirements_met = "Did Meet All Requirements: Yes" in content
+
+    # Extract score from the response
+    score_match = re.search(r'Score:\s*(\d+)/10', content)
+    score = None
+    if score_match:
+        score = int(score_match.group(1))
+
+    accepted = requirements_met or (score is not None and score >= 8)
+    return accepted, requirements_met, score
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Async token bucket: holds up to `capacity` tokens and refills `capacity` tokens per `period` seconds."""
+
+    def __init__(self, capacity: int, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: int = 1) -> None:
+        """Waits until `amount` tokens are available, then takes them."""
+        # A single request larger than the bucket could never run, so cap it at the capacity
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """Combines a requests-per-minute and a tokens-per-minute bucket (either can be disabled with 0)."""
+
+    def __init__(self, rpm: int = LLM_RPM_LIMIT, tpm: int = LLM_TPM_LIMIT):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+
+    async def acquire(self, tokens: int) -> None:
+        if self.requests:
+            await self.requests.acquire(1)
+        if self.tokens:
+            await self.tokens.acquire(tokens)
+
+
+# Quotas are per API key, so every run in the process shares one limiter (one per event loop, since asyncio locks are loop bound)
+_shared_limiters = weakref.WeakKeyDictionary()
+
+
+def get_shared_rate_limiter() -> RateLimiter:
+    """Returns the process wide rate limiter for the running event loop."""
+    loop = asyncio.get_running_loop()
+    limiter = _shared_limiters.get(loop)
+    if limiter is None:
+        limiter = _shared_limiters[loop] = RateLimiter()
+    return limiter
+
+
+async def run_prompts(
+    llm,
+    prompts: List[str],
+    max_in_flight: int = MATCH_MAX_IN_FLIGHT,
+    timeout: Optional[float] = MATCH_TIMEOUT_SECONDS,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> List[Union[str, Exception]]:
+    """
+    Sends every prompt to the LLM concurrently using `ainvoke`.
+    At most `max_in_flight` requests are outstanding at once, each is cancelled after `timeout` seconds.
+    Returns the answer text (or the raised exception) for each prompt, in the same order as `prompts`.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+    rate_limiter = rate_limiter or get_shared_rate_limiter()
+
+    async def _run(prompt: str) -> Union[str, Exception]:
+        async with semaphore:
+            try:
+                await rate_limiter.acquire(estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS)
+                response = await asyncio.wait_for(llm.ainvoke(prompt), timeout=timeout)
+                return response.content.strip()
+            except asyncio.TimeoutError:
+                return TimeoutError(f"LLM request timed out after {timeout}s")
+            except Exception as e:
+                return e
+
+    return await asyncio.gather(*(_run(prompt) for prompt in prompts))
+
+
+async def match_postings(llm, resume: str, requirements_list: List[str], batch_mode: bool = MATCH_BATCH_MODE) -> List[Union[str, Exception]]:
+    """
+    Compares the resume with every posting and returns one answer (or exception) per posting, in order.
+    In batch mode postings are packed into shared prompts; any batch whose answer cannot be
+    parsed falls back to one prompt per posting.
+    """
+    return [answer for answer, _ in await match_postings_versioned(llm, resume, requirements_list, batch_mode)]
+
+
+async def match_postings_versioned(llm, resume: str, requirements_list: List[str], batch_mode: bool = MATCH_BATCH_MODE) -> List[Tuple[Union[str, Exception], str]]:
+    """Like match_postings, but returns (answer, version of the prompt that produced it) per posting, for the match cache."""
+    if not batch_mode:
+        answers = await run_prompts(llm, [build_match_prompt(resume, r) for r in requirements_list])
+        return [(answer, MATCH_PROMPT_VERSION) for answer in answers]
+
+    batches = pack_batches(resume, requirements_list)
+    batch_answers = await run_prompts(
+        llm, [build_batch_prompt(resume, [requirements_list[i] for i in batch]) for batch in batches]
+    )
+
+    answers: List[Optional[Tuple[Union[str, Exception], str]]] = [None] * len(requirements_list)
+    fallback = []
+    for batch, content in zip(batches, batch_answers):
+        try:
+            if isinstance(content, Exception):
+                raise content
+            for i, answer in zip(batch, parse_batch_response(content, len(batch))):
+                answers[i] = (answer, match_prompt_version(True))
+        except Exception as e:
+            print(f"⚠️ Batch of {len(batch)} postings could not be used ({e}), falling back to single prompts")
+            fallback.extend(batch)
+
+    if fallback:
+        single_answers = await run_prompts(llm, [build_match_prompt(resume, requirements_list[i]) for i in fallback])
+        for i, answer in zip(fallback, single_answers):
+            answers[i] = (answer, MATCH_PROMPT_VERSION)
+    print(f"📦 Batch mode: {len(requirements_list)} postings in {len(batches)} prompts ({len(fallback)} fell back)")
+    return answers
@@ -0,0 +1,162 @@
+# Description: Long lived, pooled MCP client sessions
+# Opening a Streamable HTTP session to the MCP server costs a full handshake, so instead of
+# `async with client:` in every node of every run we keep a few sessions open, ping idle ones
+# to keep them warm / detect dead ones, and reconnect transparently when a call fails.
+
+import asyncio
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))  # Concurrent sessions to the MCP server
+MCP_HEALTH_CHECK_SECONDS = float(os.getenv("MCP_HEALTH_CHECK_SECONDS", "30"))  # Ping a session idle for longer than this before use
+MCP_KEEPALIVE_SECONDS = float(os.getenv("MCP_KEEPALIVE_SECONDS", "60"))  # Background ping interval for idle sessions
+MCP_CALL_RETRIES = int(os.getenv("MCP_CALL_RETRIES", "1"))  # Reconnect + retry attempts per tool call
+# A request on a session the server no longer knows (e.g. after a server restart) is never answered, so every
+# call / ping gives up after this long and the session is reopened
+MCP_CALL_TIMEOUT_SECONDS = float(os.getenv("MCP_CALL_TIMEOUT_SECONDS", "60"))
+
+
+class _Session:
+    """One pooled client plus bookkeeping."""
+
+    def __init__(self, client: Client):
+        self.client = client
+        self.last_used = 0.0
+        self.connected = False
+
+
+class _LoopPool:
+    """The sessions that belong to one event loop (MCP sessions are tasks bound to the loop that opened them)."""
+
+    def __init__(self, factory: Callable[[], Client], size: int):
+        self.factory = factory
+        self.idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(max(1, size)):
+            self.idle.put_nowait(_Session(factory()))
+        self.keepalive_task: Optional[asyncio.Task] = None
+
+
+class MCPSessionPool:
+    """
+    Pool of warm MCP sessions. Use `await pool.call_tool(name, args)` for single calls,
+    or `async with pool.session() as client:` to hold one session for several calls.
+    """
+
+    def __init__(self, factory: Callable[[], Client], size: int = MCP_POOL_SIZE, call_timeout: float = MCP_CALL_TIMEOUT_SECONDS):
+        self.factory = factory
+        self.size = size
+        self.call_timeout = call_timeout
+        self._pools = weakref.WeakKeyDictionary()  # event loop -> _LoopPool
+        self.stats = {"handshakes": 0, "calls": 0, "reconnects": 0}
+
+    def _pool(self) -> _LoopPool:
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            pool = self._pools[loop] = _LoopPool(self.factory, self.size)
+            pool.keepalive_task = loop.create_task(self._keepalive(pool))
+        return pool
+
+    async def _connect(self, session: _Session) -> None:
+        await session.client.__aenter__()
+        session.connected = True
+        session.last_used = time.monotonic()
+        self.stats["handshakes"] += 1
+
+    async def _reset(self, session: _Session) -> None:
+        """Drops a broken session and replaces its client with a fresh one."""
+        if session.connected:
+            try:
+                await session.client.close()
+            except Exception:
+                pass
+        session.client = self.factory()
+        session.connected = False
+
+    async def _ensure_healthy(self, session: _Session) -> None:
+        if session.connected and session.client.is_connected():
+            if time.monotonic() - session.last_used < MCP_HEALTH_CHECK_SECONDS:
+                return
+            try:
+                await asyncio.wait_for(session.client.ping(), self.call_timeout)
+                return
+            except Exception as e:
+                print(f"⚠️ MCP session failed health check, reconnecting: {e}")
+                self.stats["reconnects"] += 1
+        await self._reset(session)
+        await self._connect(session)
+
+    @asynccontextmanager
+    async def session(self):
+        """Checks out a healthy, connected client (waits if all sessions are busy)."""
+        pool = self._pool()
+        session = await pool.idle.get()
+        try:
+            await self._ensure_healthy(session)
+            yield session.client
+            session.last_used = time.monotonic()
+        except ToolError:
+            # The tool itself failed, the session is fine
+            session.last_used = time.monotonic()
+            raise
+        except BaseException:
+            # We don't know what state the session is in, start the next user from a clean one
+            await self._reset(session)
+            raise
+        finally:
+            pool.idle.put_nowait(session)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any], retries: int = MCP_CALL_RETRIES):
+        """Calls an MCP tool on a pooled session, reconnecting and retrying if the call fails."""
+        for attempt in range(retries + 1):
+            try:
+                async with self.session() as client:
+                    self.stats["calls"] += 1
+                    return await client.call_tool(name, arguments, timeout=self.call_timeout)
+            except ToolError:
+                raise  # Not a connection problem, retrying would just repeat the tool call
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                self.stats["reconnects"] += 1
+                print(f"🔁 MCP call '{name}' failed ({e}), reconnecting and retrying ({attempt + 1}/{retries})")
+
+    async def _keepalive(self, pool: _LoopPool) -> None:
+        """Pings idle sessions in the background so they stay warm (and dead ones are reopened lazily)."""
+        while True:
+            await asyncio.sleep(MCP_KEEPALIVE_SECONDS)
+            for _ in range(pool.idle.qsize()):
+                try:
+                    session = pool.idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                try:
+                    if session.connected and time.monotonic() - session.last_used >= MCP_KEEPALIVE_SECONDS:
+                        await asyncio.wait_for(session.client.ping(), self.call_timeout)
+                        session.last_used = time.monotonic()
+                except Exception as e:
+                    print(f"⚠️ MCP keep-alive ping failed, session will reconnect on next use: {e}")
+                    await self._reset(session)
+                finally:
+                    pool.idle.put_nowait(session)
+
+    async def close(self) -> None:
+        """Closes every session opened from the running event loop."""
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is None:
+            return
+        if pool.keepalive_task:
+            pool.keepalive_task.cancel()
+        while not pool.idle.empty():
+            session = pool.idle.get_nowait()
+            if session.connected:
+                try:
+                    await session.client.close()
+                except Exception:
+                    pass
@@ -0,0 +1,306 @@
+# Description: Durable outbox for outgoing emails
+# The email nodes only write their messages here and return; a background worker drains the outbox
+# through the EmailDispatcher (concurrency + rate limits), retries failed sends with exponential backoff
+# and moves messages that keep failing to a dead-letter table instead of losing them.
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Iterable, List, Optional
+
+from agent.corpus_cache import CACHE_DIR
+from agent.email_dispatch import EmailDispatcher, SendFunc, get_email_dispatcher
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))  # Sends before a message is dead-lettered
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))  # First retry delay, doubled every attempt
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))  # Messages claimed per worker pass
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))  # Idle wait between passes (enqueue wakes the worker early)
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))  # A claimed message is handed out again after this (worker crashed)
+OUTBOX_SENT_RETENTION_SECONDS = int(os.getenv("OUTBOX_SENT_RETENTION_SECONDS", str(7 * 24 * 3600)))  # How long sent keys block re-sends
+
+
+def _digest(parts: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")  # Separator so ("ab", "c") and ("a", "bc") do not collide
+    return digest.hexdigest()
+
+
+def idempotency_key(payload: dict) -> str:
+    """Fallback key when the caller has none: the same recipient, subject, body and attachments is the same email."""
+    parts = [(payload.get("recipient_email") or "").lower(), payload.get("subject") or "", payload.get("body") or ""]
+    for attachment in payload.get("attachments") or []:
+        parts += [attachment.get("filename") or "", hashlib.md5((attachment.get("file_bytes") or "").encode("utf-8")).hexdigest()]
+    return _digest(parts)
+
+
+def run_email_key(kind: str, file_id: str, version: str, postings: Iterable[str], recipient: str, attachment: Optional[bytes] = None) -> str:
+    """
+    Key for an email sent by a graph run: which email (kind), about which upload of the file (ID + content md5),
+    for which postings and to whom. A re-uploaded resume has a new md5 and is emailed again; a replayed run is not.
+    """
+    parts = [kind, file_id or "", version or "", *sorted(postings), (recipient or "").lower()]
+    parts.append(hashlib.md5(attachment).hexdigest() if attachment is not None else "")
+    return _digest(parts)
+
+
+class Outbox:
+    """
+    SQLite backed message queue. Rows move pending -> sending -> sent, or to the dead_letter table.
+    Enqueueing a key that is already queued or was sent recently is a no-op.
+    """
+
+    def __init__(self, path: str, max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " idempotency_key TEXT NOT NULL UNIQUE,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letter ("
+            " id INTEGER PRIMARY KEY,"
+            " idempotency_key TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " failed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def enqueue(self, payload: dict, key: Optional[str] = None) -> bool:
+        """Queues one email. Returns False if a message with the same key is already queued or sent."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, payload, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (key or idempotency_key(payload), json.dumps(payload), now, now, now),
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def claim(self, limit: int = OUTBOX_BATCH_SIZE, lease_seconds: float = OUTBOX_LEASE_SECONDS) -> List[tuple]:
+        """
+        Hands out up to `limit` due messages as [(id, payload)] and leases them to the caller.
+        Messages whose lease ran out (the worker died mid-send) are due again, so delivery is at-least-once.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, payload FROM outbox WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?"
+                    " ORDER BY next_attempt_at, id LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET status = 'sending', next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                    [(now + lease_seconds, now, row[0]) for row in rows],
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def mark_sent(self, message_id: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'sent', payload = '{}', last_error = NULL, updated_at = ? WHERE id = ?",
+                (now, message_id),
+            )
+            self._conn.commit()
+
+    def mark_failed(self, message_id: int, error: str) -> bool:
+        """Schedules a retry with exponential backoff (+ jitter). Returns True if the message was dead-lettered instead."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM outbox WHERE id = ?", (message_id,)).fetchone()
+            if row is None:
+                return False
+            attempts = row[0] + 1
+            if attempts >= self.max_attempts:
+                self._conn.execute(
+                    "INSERT INTO dead_letter (id, idempotency_key, payload, attempts, last_error, created_at, failed_at)"
+                    " SELECT id, idempotency_key, payload, ?, ?, created_at, ? FROM outbox WHERE id = ?",
+                    (attempts, error, now, message_id),
+                )
+                self._conn.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+                self._conn.commit()
+                return True
+            delay = min(OUTBOX_MAX_BACKOFF_SECONDS, OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1))
+            delay *= random.uniform(0.8, 1.2)  # Jitter, so a failed batch does not retry in lockstep
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (attempts, now + delay, error, now, message_id),
+            )
+            self._conn.commit()
+            return False
+
+    def requeue_dead_letters(self) -> int:
+        """
+        Moves dead-lettered messages back into the outbox (e.g. after fixing the MCP server). Returns the count moved.
+        A message whose key was queued or sent again since it failed stays in the dead-letter table.
+        """
+        now = time.time()
+        moved = 0
+        skipped = []
+        with self._lock:
+            rows = self._conn.execute("SELECT id, idempotency_key, payload, created_at FROM dead_letter").fetchall()
+            for message_id, key, payload, created_at in rows:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO outbox (id, idempotency_key, payload, status, attempts, next_attempt_at, created_at, updated_at)"
+                    " VALUES (?, ?, ?, 'pending', 0, ?, ?, ?)",
+                    (message_id, key, payload, now, created_at, now),
+                )
+                if cursor.rowcount == 1:
+                    self._conn.execute("DELETE FROM dead_letter WHERE id = ?", (message_id,))
+                    moved += 1
+                else:
+                    skipped.append(message_id)
+            self._conn.commit()
+        if skipped:
+            print(f"⚠️ {len(skipped)} dead-lettered email(s) not requeued, a newer email with the same key exists: ids {skipped}")
+        return moved
+
+    def purge_sent(self, retention_seconds: int = OUTBOX_SENT_RETENTION_SECONDS) -> int:
+        """Forgets sent messages older than the retention window. Returns the number removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM outbox WHERE status = 'sent' AND updated_at < ?", (time.time() - retention_seconds,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        """Returns the number of messages per status, plus the dead-letter count."""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            counts["dead_letter"] = self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+        return counts
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """Returns the process wide outbox."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox(os.path.join(CACHE_DIR, "outbox.sqlite"))
+        return _outbox
+
+
+class OutboxWorker:
+    """Drains the outbox in the background: claim a batch, send it through the dispatcher, record the outcome."""
+
+    def __init__(self, outbox: Outbox, dispatcher: EmailDispatcher):
+        self.outbox = outbox
+        self.dispatcher = dispatcher
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    async def drain_once(self) -> int:
+        """Sends every message that is due right now. Returns the number of messages handled."""
+        # The SQLite calls commit to disk, so they run in a thread instead of blocking the graph runs on this loop
+        handled = 0
+        while True:
+            batch = await asyncio.to_thread(self.outbox.claim)
+            if not batch:
+                return handled
+            results = await self.dispatcher.send_all([payload for _, payload in batch])
+            for (message_id, payload), result in zip(batch, results):
+                recipient = payload.get("recipient_email")
+                if isinstance(result, Exception):
+                    if await asyncio.to_thread(self.outbox.mark_failed, message_id, f"{type(result).__name__}: {result}"):
+                        print(f"☠️ Email to {recipient} moved to the dead-letter table: {result}")
+                    else:
+                        print(f"🔁 Email to {recipient} failed, will retry: {result}")
+                else:
+                    await asyncio.to_thread(self.outbox.mark_sent, message_id)
+                    print(f"✅ Email sent to {recipient} ('{payload.get('subject')}')")
+            handled += len(batch)
+
+    async def run(self) -> None:
+        last_purge = 0.0
+        while True:
+            try:
+                await self.drain_once()
+                if time.monotonic() - last_purge > 3600:
+                    await asyncio.to_thread(self.outbox.purge_sent)
+                    last_purge = time.monotonic()
+            except Exception as e:
+                print(f"❌ Outbox worker error: {e}")
+            # asyncio.wait rather than wait_for: wait_for can swallow a cancel that races with the wakeup
+            waiter = asyncio.ensure_future(self.wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=OUTBOX_POLL_SECONDS)
+            finally:
+                waiter.cancel()
+            self.wakeup.clear()
+
+
+# One worker per event loop (the dispatcher and MCP sessions it uses are bound to the loop)
+_workers = weakref.WeakKeyDictionary()
+
+
+def start_outbox_worker(send: SendFunc) -> OutboxWorker:
+    """Starts the outbox worker on the running event loop if it isn't running yet, and wakes it up."""
+    loop = asyncio.get_running_loop()
+    worker = _workers.get(loop)
+    if worker is None or worker.task.done():
+        worker = _workers[loop] = OutboxWorker(get_outbox(), get_email_dispatcher(send))
+        worker.task = loop.create_task(worker.run())
+    worker.wakeup.set()
+    return worker
+
+
+async def enqueue_emails(payloads: List[dict], send: SendFunc, keys: Optional[List[str]] = None) -> int:
+    """
+    Writes the payloads to the outbox (keys[i] is the idempotency key of payloads[i], see run_email_key),
+    kicks the worker and returns how many were newly queued.
+    """
+    def write() -> int:
+        outbox = get_outbox()
+        return sum(outbox.enqueue(payload, key) for payload, key in zip(payloads, keys or [None] * len(payloads)))
+
+    queued = await asyncio.to_thread(write)  # Off the event loop, see drain_once
+    start_outbox_worker(send)
+    return queued
+
+
+# Run a standalone outbox worker: python -m agent.outbox
+if __name__ == "__main__":
+    from agent.recruit_agent import send_email
+
+    async def main():
+        worker = start_outbox_worker(send_email)
+        print(f"📬 Outbox worker started ({get_outbox().stats()})")
+        await worker.task
+
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+# Description: PDF text extraction API for every path, on a process pool for bulk ingestion (job corpus, resume pool)
+# PyMuPDF extraction is CPU bound and holds the GIL, so parsing hundreds of postings or resumes one by one
+# stalled the graph worker. Batches are spread over a pool of processes instead. The PDFs are handed over
+# as temp files that the workers open by path (MuPDF reads them from disk), not as pickled byte copies.
+# Small batches are parsed in-process, where starting / feeding the pool would cost more than it saves.
+
+import atexit
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Hashable, Optional, Union
+
+from agent.pdf_text import PDF_MAX_PAGES, ResumeStop, extract_pdf_text
+
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS") or os.cpu_count() or 2)  # Processes in the pool (0 = always in-process, blank = CPU count)
+PDF_POOL_MIN_FILES = int(os.getenv("PDF_POOL_MIN_FILES", "4"))  # Batches smaller than this are parsed in-process
+
+# Stop conditions by name (the callables themselves are created in the worker)
+STOP_CONDITIONS = {"resume": ResumeStop}
+
+
+def _extract(source: Union[bytes, str], stop: Optional[str], max_pages: int) -> str:
+    stop_when = STOP_CONDITIONS[stop]() if stop else None
+    return extract_pdf_text(source, max_pages=max_pages, stop_when=stop_when)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the graph server is multi-threaded and forking it could copy held locks
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor) -> None:
+    """Drops a broken pool (a worker died), the next batch starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_inline(pdfs: Dict[Hashable, bytes], stop: Optional[str], max_pages: int) -> Dict[Hashable, Union[str, Exception]]:
+    results = {}
+    for key, data in pdfs.items():
+        try:
+            results[key] = _extract(data, stop, max_pages)
+        except Exception as e:
+            results[key] = e
+    return results
+
+
+def extract_many(pdfs: Dict[Hashable, bytes], stop: Optional[str] = None, max_pages: int = PDF_MAX_PAGES, workers: int = PDF_PARSE_WORKERS) -> Dict[Hashable, Union[str, Exception]]:
+    """
+    Extracts the text of every PDF ({key: bytes} -> {key: text or the exception it raised}).
+    `stop` names a stop condition from STOP_CONDITIONS (e.g. "resume"), see pdf_text.py.
+    """
+    if not pdfs:
+        return {}
+    if workers <= 0 or len(pdfs) < PDF_POOL_MIN_FILES:
+        return _extract_inline(pdfs, stop, max_pages)
+
+    pool = _get_pool(workers)
+    spool_dir = tempfile.mkdtemp(prefix="pdf_pool_")
+    results = {}
+    try:
+        futures = {}
+        for i, (key, data) in enumerate(pdfs.items()):
+            path = os.path.join(spool_dir, f"{i}.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+            futures[key] = pool.submit(_extract, path, stop, max_pages)
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                results[key] = e
+        print(f"🧵 Extracted {len(pdfs)} PDFs on {workers} processes")
+    except BrokenProcessPool as e:
+        print(f"⚠️ PDF process pool broke ({e}), extracting the remaining PDFs in-process")
+        _reset_pool(pool)
+        results.update(_extract_inline({key: data for key, data in pdfs.items() if key not in results}, stop, max_pages))
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+    return results
+
+
+def extract_one(data: bytes, stop: Optional[str] = None, max_pages: int = PDF_MAX_PAGES) -> str:
+    """Extracts a single PDF through the same API as the bulk paths (in-process), raising its error."""
+    text = extract_many({0: data}, stop=stop, max_pages=max_pages)[0]
+    if isinstance(text, Exception):
+        raise text
+    return text
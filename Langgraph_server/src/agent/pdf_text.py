@@ -0,0 +1,66 @@
+# Description: Streaming, page-by-page PDF text extraction
+# Pages are extracted one at a time and joined once at the end (instead of growing a string page by page),
+# at most PDF_MAX_PAGES pages are read, and an optional stop condition ends the extraction as soon as
+# everything we need has been seen, so long portfolio PDFs are not extracted in full.
+
+import os
+from typing import Callable, Iterator, Optional, Union
+
+import fitz  # PyMuPDF
+
+from agent.contacts import APPLICANT_EMAIL_PATTERN
+from agent.sections import resume_sections
+
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "20"))  # Pages extracted per PDF at most (0 = no limit)
+
+
+def iter_pdf_pages(source: Union[bytes, str], max_pages: int = PDF_MAX_PAGES) -> Iterator[str]:
+    """
+    Yields the text of every page (up to max_pages) of the PDF bytes, or of the PDF file at that path.
+    The document is closed when the generator is.
+    """
+    doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    try:
+        page_count = len(doc) if max_pages <= 0 else min(len(doc), max_pages)
+        for page_num in range(page_count):
+            yield doc.load_page(page_num).get_text()
+    finally:
+        doc.close()
+
+
+def extract_pdf_text(source: Union[bytes, str], max_pages: int = PDF_MAX_PAGES, stop_when: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    Returns the text of the PDF, one "\\n" after every page (like the old loop).
+    stop_when(page_text) is called after every page; returning True stops the extraction there.
+    """
+    pages = []
+    for page_text in iter_pdf_pages(source, max_pages):
+        pages.append(page_text)
+        if stop_when is not None and stop_when(page_text):
+            break
+    return "".join(page + "\n" for page in pages)
+
+
+class ResumeStop:
+    """
+    Stop condition for resumes: done once the work experience section has ended (the next heading was
+    seen) and an email address was found. Until then, every page is read (up to the page cap).
+    """
+
+    def __init__(self):
+        self.email_found = False
+        self.in_experience = False
+        self.experience_done = False
+
+    def __call__(self, page_text: str) -> bool:
+        if not self.email_found and APPLICANT_EMAIL_PATTERN.search(page_text):
+            self.email_found = True
+        if not self.experience_done:
+            # Same headings extract_experience_node looks for
+            for _, sections in resume_sections.headings(page_text.splitlines()):
+                if not self.in_experience:
+                    self.in_experience = "experience" in sections
+                elif sections - {"experience"}:
+                    self.experience_done = True
+                    break
+        return self.email_found and self.experience_done
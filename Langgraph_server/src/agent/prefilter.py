@@ -0,0 +1,185 @@
+# Description: Cheap TF-IDF pre-filter that ranks job postings against a resume before the LLM judge
+# The index is built from the postings' requirements, stored next to the job corpus cache,
+# and only rebuilt when the corpus changes. Scoring a resume is a single NumPy matrix-vector product.
+
+import hashlib
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from agent.corpus_cache import CACHE_DIR
+
+PREFILTER_TOP_K = int(os.getenv("PREFILTER_TOP_K", "10"))  # Keep the K best postings (0 disables)
+PREFILTER_MIN_SCORE = float(os.getenv("PREFILTER_MIN_SCORE", "0"))  # Also keep anything scoring above this (0 disables)
+PREFILTER_MAX_FEATURES = int(os.getenv("PREFILTER_MAX_FEATURES", "8192"))  # Vocabulary size cap (keeps the matrix small)
+
+# Words plus tech tokens such as "c++", "c#", "node.js", "ci/cd"
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it of on or our the to we will with you your
+this that these those who what which can must should able etc all any experience years year
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases the text and splits it into terms, dropping stop words."""
+    return [tok for tok in TOKEN_PATTERN.findall(text.lower()) if tok not in STOP_WORDS]
+
+
+def corpus_key(docs: Dict[str, str]) -> str:
+    """Hash of the documents an index was built from (used to detect a stale index)."""
+    digest = hashlib.sha256()
+    for doc_id in sorted(docs):
+        digest.update(doc_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(docs[doc_id].encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TfidfIndex:
+    """Dense, row normalized TF-IDF matrix (postings x terms) with cosine scoring."""
+
+    def __init__(self, doc_ids: List[str], terms: List[str], idf: np.ndarray, matrix: np.ndarray, key: str):
+        self.doc_ids = doc_ids
+        self.terms = terms
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.idf = idf
+        self.matrix = matrix
+        self.key = key
+
+    @classmethod
+    def build(cls, docs: Dict[str, str], max_features: int = PREFILTER_MAX_FEATURES) -> "TfidfIndex":
+        """Builds the index from {doc_id: text}."""
+        doc_ids = list(docs)
+        counts = [Counter(tokenize(docs[doc_id])) for doc_id in doc_ids]
+
+        # Keep the terms that appear in the most postings
+        doc_freq = Counter()
+        for c in counts:
+            doc_freq.update(c.keys())
+        terms = [term for term, _ in doc_freq.most_common(max_features)]
+        vocabulary = {term: i for i, term in enumerate(terms)}
+
+        n_docs = len(doc_ids)
+        df = np.array([doc_freq[t] for t in terms], dtype=np.float32)
+        idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+
+        # Fill the sparse counts into a dense matrix in one shot
+        rows, cols, vals = [], [], []
+        for row, c in enumerate(counts):
+            for term, count in c.items():
+                col = vocabulary.get(term)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+                    vals.append(count)
+        matrix = np.zeros((n_docs, len(terms)), dtype=np.float32)
+        if vals:
+            matrix[rows, cols] = 1 + np.log(np.asarray(vals, dtype=np.float32))  # Sub-linear term frequency
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        return cls(doc_ids, terms, idf, matrix, corpus_key(docs))
+
+    def score(self, text: str) -> np.ndarray:
+        """Returns the cosine similarity of the text against every posting (same order as doc_ids)."""
+        c = Counter(tok for tok in tokenize(text) if tok in self.vocabulary)
+        if not c or not self.terms:
+            return np.zeros(len(self.doc_ids), dtype=np.float32)
+        cols = np.fromiter((self.vocabulary[t] for t in c), dtype=np.int64, count=len(c))
+        vals = 1 + np.log(np.fromiter(c.values(), dtype=np.float32, count=len(c)))
+        vals *= self.idf[cols]
+        vals /= np.linalg.norm(vals)
+        # Only the resume's terms are non-zero, so only those columns take part in the product
+        return self.matrix[:, cols] @ vals
+
+    def rank(self, text: str, top_k: int = PREFILTER_TOP_K, min_score: float = PREFILTER_MIN_SCORE) -> List[Tuple[str, float]]:
+        """
+        Returns (doc_id, score) for the postings to forward: the top_k best, plus any scoring >= min_score.
+        With both limits disabled every posting is returned.
+        """
+        scores = self.score(text)
+        order = np.argsort(-scores, kind="stable")
+        if top_k <= 0 and min_score <= 0:
+            keep = order
+        else:
+            keep_mask = np.zeros(len(scores), dtype=bool)
+            if top_k > 0:
+                keep_mask[order[:top_k]] = True
+            if min_score > 0:
+                keep_mask |= scores >= min_score
+            keep = order[keep_mask[order]]
+        return [(self.doc_ids[i], float(scores[i])) for i in keep]
+
+    def save(self, path: str) -> None:
+        """Persists the index as a compressed .npz file (written atomically)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            matrix=self.matrix,
+            idf=self.idf,
+            terms=np.array(self.terms, dtype=str),
+            doc_ids=np.array(self.doc_ids, dtype=str),
+            key=np.array(self.key),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TfidfIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                doc_ids=data["doc_ids"].tolist(),
+                terms=data["terms"].tolist(),
+                idf=data["idf"],
+                matrix=data["matrix"],
+                key=str(data["key"]),
+            )
+
+
+# Loaded indexes, one per opportunities folder
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_path(folder_id: str) -> str:
+    return os.path.join(CACHE_DIR, f"job_index_{folder_id}.npz")
+
+
+def refresh_job_index(folder_id: str, docs: Dict[str, str]) -> TfidfIndex:
+    """Returns the index for the folder, rebuilding (and persisting) it only if the postings changed."""
+    key = corpus_key(docs)
+    path = _index_path(folder_id)
+    with _indexes_lock:
+        index = _indexes.get(folder_id)
+        if index is None and os.path.exists(path):
+            try:
+                index = TfidfIndex.load(path)
+            except Exception as e:
+                print(f"⚠️ Could not load job index {path}: {e}")
+        if index is None or index.key != key:
+            index = TfidfIndex.build(docs)
+            try:
+                index.save(path)
+            except Exception as e:
+                print(f"⚠️ Could not save job index {path}: {e}")
+            print(f"🗂️ Rebuilt job index: {len(index.doc_ids)} postings, {len(index.terms)} terms")
+        _indexes[folder_id] = index
+        return index
+
+
+def get_job_index(folder_id: str) -> Optional[TfidfIndex]:
+    """Returns the index last built for the folder (or None if there is none)."""
+    with _indexes_lock:
+        index = _indexes.get(folder_id)
+        if index is None and os.path.exists(_index_path(folder_id)):
+            try:
+                index = _indexes[folder_id] = TfidfIndex.load(_index_path(folder_id))
+            except Exception as e:
+                print(f"⚠️ Could not load job index: {e}")
+        return index
@@ -4,57 +4,41 @@
 
 # Import necessary libraries
 import asyncio, ssl
+import functools
 from langgraph.graph import StateGraph, END, START
 from langgraph.graph.message import add_messages
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage
 from typing import TypedDict, Optional, List, Union, Literal, Annotated
-from fastmcp import Client
-from fastmcp.client.transports import StreamableHttpTransport
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, HttpError
-from google.oauth2 import service_account
+from googleapiclient.http import HttpError
 from email.mime.text import MIMEText
-import fitz  # PyMuPDF
 import io
 import os, sys
 import re
 import base64
+import hashlib
 import datetime
 from datetime import timedelta, time, datetime
 import requests
 import textwrap
+from agent.blob_store import blob_store
+from agent.contacts import applicant_contact, recruiter_contact, extract_many as extract_contacts
+from agent.clients import get_calendar_service, get_drive_service, get_llm, get_mcp_pool
+from agent.corpus_cache import DRIVE_FINGERPRINT_FIELDS, get_drive_cache
+from agent.drive_io import download_file, download_many, list_folder
+from agent.outbox import enqueue_emails, run_email_key
+from agent.pdf_pool import extract_many, extract_one
+from agent.freebusy import query_busy
+from agent.match_cache import get_match_cache, match_cache_key
+from agent.slot_finder import WORKING_HOURS, get_free_time_index
+from agent.sections import posting_sections, resume_sections
+from agent.prefilter import get_job_index, refresh_job_index
+from agent.match_engine import MATCH_MAX_IN_FLIGHT, evaluate_match, match_postings_versioned, match_prompt_versions
  
 # load environment variables
 from dotenv import load_dotenv
 
 load_dotenv()
-print("Environment variables loaded")
-SCOPES = ['https://www.googleapis.com/auth/drive.readonly', "https://www.googleapis.com/auth/calendar"]
-
-# Build a robust path to the credentials file relative to the script's location.
-# This ensures the script works regardless of the current working directory.
-script_dir = os.path.dirname(os.path.abspath(__file__))
-credentials_path = os.path.abspath(os.path.join(script_dir, '..', '..', 'google_oauth', 'credentials.json'))
-
-# Set up the Service Account (please make sure to add you service account to any google files / calendars you will use)
-creds = service_account.Credentials.from_service_account_file(
-    credentials_path,
-    scopes=SCOPES
-)
-service = build("calendar", "v3", credentials=creds)  # connect to gcal (to create events)
-service_drive = build('drive', 'v3', credentials=creds) # connect to gdrive (to read files)
-
-# Define and connect to MCP client
-url= os.getenv('gentoro_mcp_url')
-headers = {"Accept": "application/json, text/event-stream"}
-transport = StreamableHttpTransport(url=url, headers=headers)
-client = Client(transport)
-
-# Initialize openai api key from env
-llm = ChatOpenAI(model="gpt-4", temperature=0)
-print("MCP Client initialized with transport, and LLM initialized")
 
+# External clients (Calendar, Drive, LLM, MCP) are built on first use, see clients.py
 
 class AgentState(TypedDict):
     # Resume fields
@@ -66,6 +50,8 @@ class AgentState(TypedDict):
     applicant_name: Optional[str] # Name of the applicant
     applicant_email: str # Email of the applicant
     resume_readable: bool # Flag to track if resume could be processed successfully
+    resume_blob: Optional[str] # Handle of the downloaded resume bytes in the blob store (see blob_store.py)
+    resume_md5: Optional[str] # md5 of the downloaded resume bytes, tells re-uploads of the same file apart (see outbox.py)
 
     # Google Drive fields
     input_folder_id: str # The ID of the Google Drive folder with the opportunities
@@ -84,49 +70,39 @@ def parse_pdf_node(state: AgentState) -> AgentState:
     file_name = state['file_name']
     print(f"--- Starting Agent Run for file: {file_name} (ID: {file_id}) ---")
 
+    resume_blob = None
+    handed_over = False  # Set once the handle is returned in the state (later nodes release it)
     try:
 
-        # Create temporary download of the file in memory 
-        request = service_drive.files().get_media(fileId=file_id)
-        pdf_buffer = io.BytesIO() 
-        downloader = MediaIoBaseDownload(pdf_buffer, request)
-        
-        # Check statues of download
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
-            print(f"Download progress: {int(status.progress() * 100)}%")
-        
-        # Reset pdf buffer
-        pdf_buffer.seek(0)
+        # Download the file into memory (retried on rate limits / transient errors)
+        pdf_bytes = download_file(get_drive_service(), file_id)
+        print(f"Downloaded {len(pdf_bytes)} bytes")
 
-        # Open the PDF with PyMuPDF
-        doc = fitz.open(stream=pdf_buffer.getvalue(), filetype='pdf')
-        text = ""
-        
-        # Extract text from all pages
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            page_text = page.get_text()
-            text += page_text + "\n"
-        
-        # Close the document
-        doc.close()
-        pdf_buffer.close() 
+        # Keep the bytes for the rest of the run (the recruiter email attaches them)
+        resume_blob = blob_store.put(file_id, pdf_bytes)
+        resume_md5 = hashlib.md5(pdf_bytes).hexdigest()
+
+        # Extract the text page by page with PyMuPDF, stopping once the contact info and work experience are read
+        # (through the same pdf_pool API as the bulk paths, a single file is parsed in-process)
+        text = extract_one(pdf_bytes, stop="resume")
         
         print(f"Extracted text from {file_name} using PyMuPDF")
 
         if len(text) < 100:
             print(f"⚠️ Text is too short: {len(text)} characters")
-            return {"raw_text": "", "applicant_name": None, "applicant_email": ""}
+            handed_over = True
+            return {"raw_text": "", "applicant_name": None, "applicant_email": "", "resume_blob": resume_blob, "resume_md5": resume_md5}
 
         # Extract applicant information
         applicant_name, applicant_email = extract_applicant_info(text)
         
+        handed_over = True
         return {
             'raw_text': text,
             'applicant_name': applicant_name,
-            'applicant_email': applicant_email or ""
+            'applicant_email': applicant_email or "",
+            'resume_blob': resume_blob,
+            'resume_md5': resume_md5
         }
     except ssl.SSLError as e:
         print(f"❌ SSL Error while downloading {file_name}: {e}")
@@ -140,33 +116,28 @@ def parse_pdf_node(state: AgentState) -> AgentState:
         print(f"❌ Unexpected error while processing {file_name}: {e}")
         return {"raw_text": "", "applicant_name": None, "applicant_email": ""}
 
+    finally:
+        # The error returns drop the handle, so nothing later in the run would release it
+        if not handed_over:
+            blob_store.release(resume_blob)
+
 # Extracts the experience section from the resume text
 def extract_experience_node(state: AgentState) -> AgentState:
     """Extracts the experience section from the resume text."""
     text = state["raw_text"]
-    start_key = "WORK EXPERIENCE"
-    end_keys = ["CERTIFICATIONS", "EDUCATION", "SKILLS", "PROJECTS", "SUMMARY"]
 
     # Normalize and split text into lines
     lines = text.splitlines()
     lines = [line.strip() for line in lines]
 
-    # Find where the WORK EXPERIENCE section starts
-    try:
-        start_index = next(i for i, line in enumerate(lines) if start_key in line.upper())
-    except StopIteration:
+    # Find the WORK EXPERIENCE section (it ends at the next resume heading, see sections.py)
+    experience = resume_sections.find(lines, "experience")
+    if experience is None:
         print("❌ 'WORK EXPERIENCE' section not found. Resume could not be read.")
         return {"experience_text": "", "resume_readable": False}
 
-    # Look for the next heading after WORK EXPERIENCE
-    end_index = len(lines)
-    for i in range(start_index + 1, len(lines)):
-        if any(key in lines[i].upper() for key in end_keys):
-            end_index = i
-            break
-
     # Extract and return just the experience section
-    experience_lines = lines[start_index:end_index]
+    experience_lines = lines[experience.start:experience.end]
     return {'experience_text':"\n".join(experience_lines), "resume_readable": True} 
 
 def resume_unreadable_end_node(state: AgentState) -> AgentState:
@@ -174,6 +145,7 @@ def resume_unreadable_end_node(state: AgentState) -> AgentState:
     print(f"🛑 Processing terminated: Resume '{state['file_name']}' could not be read.")
     print("   Reason: 'WORK EXPERIENCE' section not found in the resume.")
     print("   The recruitment process has been stopped for this file.")
+    blob_store.release(state.get("resume_blob"))
     return state
 
 # Cleans up text to make information extraction easier.
@@ -192,70 +164,20 @@ def clean_job_text(text: str) -> str:
 
 # Gets Applicant's Name and Email from the document, stores for later use.
 def extract_applicant_info(text):
-    """Extract applicant name and email from resume text"""
-    applicant_name = None
-    applicant_email = None
-    
-    # Email extraction using regex
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    email_match = re.search(email_pattern, text)
-    if email_match:
-        applicant_email = email_match.group(0)
+    """Extract applicant name and email from resume text (see contacts.py)"""
+    applicant_name, applicant_email = applicant_contact(text)
+    if applicant_email:
         print(f"📧 Found email: {applicant_email}")
-    
-    # Name extraction - look for common patterns
-    lines = text.split('\n')
-    
-    # Strategy 1: Look for name at the top of the resume (first few lines)
-    for i, line in enumerate(lines[:10]):  # Check first 10 lines
-        line = line.strip()
-        if len(line) > 0 and len(line) < 100:  # Reasonable name length
-            # Skip lines that are clearly not names
-            if any(skip_word in line.lower() for skip_word in [
-                'resume', 'cv', 'curriculum vitae', 'phone', 'email', 'address',
-                'objective', 'summary', 'experience', 'education', 'skills',
-                'linkedin', 'github', 'portfolio', 'website', 'http', 'www'
-            ]):
-                continue
-            
-            # Check if line looks like a name (contains letters, spaces, maybe dots)
-            if re.match(r'^[A-Za-z\s\.]+$', line) and len(line.split()) <= 4:
-                # Additional check: should not contain common non-name words
-                if not any(word in line.lower() for word in [
-                    'resume', 'cv', 'phone', 'email', 'address', 'objective',
-                    'summary', 'experience', 'education', 'skills'
-                ]):
-                    applicant_name = line.strip()
-                    print(f"👤 Found name: {applicant_name}")
-                    break
-    
-    # Strategy 2: If no name found, look for patterns like "Name: John Doe"
-    if not applicant_name:
-        name_patterns = [
-            r'name\s*:\s*([A-Za-z\s\.]+)',
-            r'full\s+name\s*:\s*([A-Za-z\s\.]+)',
-            r'contact\s+name\s*:\s*([A-Za-z\s\.]+)'
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                applicant_name = match.group(1).strip()
-                print(f"👤 Found name (pattern): {applicant_name}")
-                break
-    
-    # Strategy 3: Look for LinkedIn-style names (if email contains name)
-    if not applicant_name and applicant_email:
-        email_name = applicant_email.split('@')[0]
-        # Clean email name (remove numbers, dots, underscores)
-        clean_name = re.sub(r'[0-9._-]', ' ', email_name)
-        clean_name = ' '.join(clean_name.split())
-        if len(clean_name) > 2 and len(clean_name.split()) <= 3:
-            applicant_name = clean_name.title()
-            print(f"👤 Found name (from email): {applicant_name}")
-    
+    if applicant_name:
+        print(f"👤 Found name: {applicant_name}")
     return applicant_name, applicant_email
 
+# Finds the recruiter of every posting in one batch. Done once, when the posting is parsed, and stored with
+# the posting in the job corpus cache.
+def attach_recruiters(entries: List[dict]) -> None:
+    for entry, contact in zip(entries, extract_contacts([entry["text"] for entry in entries], kind="recruiter")):
+        entry["recruiter"] = contact._asdict() if contact else None
+
 # Extracts a recruiters email and filename.
 def extract_recruiter_emails_node(state: AgentState) -> AgentState:
     recruiter_list = state.get("recruiter_list", [])
@@ -263,184 +185,203 @@ def extract_recruiter_emails_node(state: AgentState) -> AgentState:
 
     for entry in drive_entries:
         filename = entry.get("filename", "Unknown")
-        text = entry.get("text", "")
 
-        # Use regex to find email in the beginning of the text
-        email_matches = re.findall(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", text)
+        # Found when the posting was ingested, postings from older caches are looked at now
+        if "recruiter" in entry:
+            recruiter = entry["recruiter"]
+        else:
+            contact = recruiter_contact(entry.get("text", ""))
+            recruiter = contact._asdict() if contact else None
 
-        if email_matches:
-            email = email_matches[0]  # Only get the first one
-            
-            # Extract recruiter name
-            recruiter_name = None
-            
-            # Strategy 1: Look for common name patterns near the email
-            name_patterns = [
-                r'from\s*:\s*([A-Za-z\s\.]+)',
-                r'sent\s+by\s*:\s*([A-Za-z\s\.]+)',
-                r'contact\s*:\s*([A-Za-z\s\.]+)',
-                r'recruiter\s*:\s*([A-Za-z\s\.]+)',
-                r'hiring\s+manager\s*:\s*([A-Za-z\s\.]+)',
-                r'contact\s+name\s*:\s*([A-Za-z\s\.]+)'
-            ]
-            
-            for pattern in name_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    recruiter_name = match.group(1).strip()
-                    print(f"👤 Found recruiter name (pattern): {recruiter_name}")
-                    break
-            
-            # Strategy 2: Extract name from email if no pattern found
-            if not recruiter_name:
-                email_name = email.split('@')[0]
-                # Clean email name (remove numbers, dots, underscores)
-                clean_name = re.sub(r'[0-9._-]', ' ', email_name)
-                clean_name = ' '.join(clean_name.split())
-                if len(clean_name) > 2 and len(clean_name.split()) <= 3:
-                    recruiter_name = clean_name.title()
-                    print(f"👤 Found recruiter name (from email): {recruiter_name}")
-            
+        if recruiter:
             recruiter_list.append({
-                "email": email,
-                "name": recruiter_name,
+                "email": recruiter["email"],
+                "name": recruiter["name"],
                 "job_file": filename
             })
-            print(f"📧 Found recruiter email: {email} in {filename}")
+            print(f"📧 Found recruiter email: {recruiter['email']} ({recruiter['name']}) in {filename}")
         else:
             print(f"⚠️ No email found in {filename}")
 
     return {"recruiter_list": recruiter_list}
 
+# Downloads and parses a single job posting. Returns the structured entry, or None if the file should be skipped.
+def parse_job_file(file_id: str, file_name: str, mime_type: str) -> Optional[dict]:
+    return parse_job_bytes(file_name, mime_type, download_file(get_drive_service(), file_id))
+
+# Parses the downloaded bytes of a job posting (text + requirements block)
+def parse_job_bytes(file_name: str, mime_type: str, data: bytes) -> Optional[dict]:
+    text = extract_job_text(file_name, mime_type, data)
+    if text is None:
+        return None
+    return parse_job_text(file_name, text)
+
+# Extracts the raw text of a job posting, None for unsupported file types
+def extract_job_text(file_name: str, mime_type: str, data: bytes) -> Optional[str]:
+    fh = io.BytesIO(data)
+
+    if mime_type == 'application/pdf':
+        # Use PyMuPDF for better text extraction (up to PDF_MAX_PAGES pages)
+        text = extract_one(data)
+        print(f"✅ Extracted PDF: {file_name}")
+    elif mime_type.startswith("text/"): # 
+        text = fh.read().decode("utf-8")
+        print(f"✅ Extracted text file: {file_name}")
+    else:
+        print(f"⚠️ Skipping unsupported file type: {file_name} ({mime_type})")
+        return None
+    return text
+
+# Cleans the text of a job posting and extracts its requirements block
+def parse_job_text(file_name: str, text: str) -> Optional[dict]:
+    cleaned = clean_job_text(text)
+    cleaned = cleaned.lower()  # Normalize to lowercase for easier matching
+
+    # Check if the resume is blank or too short after cleaning
+    if not cleaned or len(cleaned.strip()) < 50:
+        print(f"⚠️ Skipping blank or too short resume: {file_name} (length: {len(cleaned.strip())})")
+        return None
+
+    # 🔍 Requirements extraction
+    lines = cleaned.splitlines()
+    lines = [line.strip() for line in lines if line.strip()]
+    print(f"🔍 Total non-empty lines after cleaning: {len(lines)}")
+
+    # The requirements block runs from its heading to the "nice to have" / "about ..." heading that follows it.
+    # The first two lines (title) are not searched for the heading.
+    requirements = posting_sections.find(lines, "requirements", first_line=2)
+    if requirements is not None:
+        print("Found start key!")
+        requirement_text = "\n".join(lines[requirements.start:requirements.end])
+    else:
+        print("⚠️ No start key found, using entire text as requirements.")
+        requirement_text = "\n".join(lines)
+    print(f"✅ Extracted requirements from {file_name}")
+
+    # ✅ Structured entry
+    return {
+        "filename": file_name,
+        "text": cleaned,
+        "requirements": requirement_text
+    }
+
 # Opens a google drive folder and reads all files in it, put files in a list
+# Parsed postings are cached on disk, so only new or changed files are downloaded again.
 def read_drive_folder_node(state: AgentState) -> AgentState:
     folder_id = state["resume_folder_id"]
 
-    query = f"'{folder_id}' in parents and trashed = false"
-    response = service_drive.files().list(q=query, fields="files(id, name, mimeType)").execute()
-    files = response.get('files', [])
+    files = list_folder(get_drive_service(), folder_id, DRIVE_FINGERPRINT_FIELDS)
 
+    corpus_cache = get_drive_cache("job_corpus", folder_id)
     all_texts = []
+    parsed = []  # (file, entry or None) for the postings parsed in this run
+    fetched = 0
+    hits = 0
+
+    # Reuse the parsed posting if the file has not changed since it was cached, download the rest in parallel
+    cached_entries = {file['id']: corpus_cache.get(file) for file in files}
+    downloads = download_many(get_drive_service(), [file['id'] for file in files if cached_entries[file['id']] is None])
+
+    # Bulk PDF extraction runs on the process pool (see pdf_pool.py), text files are decoded inline below
+    pdf_texts = extract_many({
+        file['id']: downloads[file['id']] for file in files
+        if file['id'] in downloads and file['mimeType'] == 'application/pdf' and isinstance(downloads[file['id']], bytes)
+    })
 
     for file in files:
         file_id = file['id']
         file_name = file['name']
         mime_type = file['mimeType']
 
+        cached = cached_entries[file_id]
+        if cached is not None:
+            hits += 1
+            if not cached.get("skipped"):
+                all_texts.append({**cached, "filename": file_name, "file_id": file_id})
+            continue
+
         try:
-            request = service_drive.files().get_media(fileId=file_id) # Get the file content
-            fh = io.BytesIO() 
-            downloader = MediaIoBaseDownload(fh, request) 
-
-            done = False
-            while not done:
-                try:
-                    status, done = downloader.next_chunk() 
-                except ssl.SSLError as e:
-                    print(f"SSL error while downloading file: {e}")
-                    raise
-                except Exception as e:
-                    print(f"Unexpected error: {e}")
-                    raise
-
-
-            fh.seek(0) # Reset the file handle to the beginning
-
-            if mime_type == 'application/pdf':
-                # Use PyMuPDF for better text extraction
-                doc = fitz.open(stream=fh, filetype="pdf")
-                text = ""
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    page_text = page.get_text()
-                    text += page_text + "\n"
-                doc.close()
+            data = downloads[file_id]
+            if isinstance(data, Exception):
+                raise data
+            if file_id in pdf_texts:
+                text = pdf_texts[file_id]
+                if isinstance(text, Exception):
+                    raise text
                 print(f"✅ Extracted PDF: {file_name}")
-            elif mime_type.startswith("text/"): # 
-                text = fh.read().decode("utf-8")
-                print(f"✅ Extracted text file: {file_name}")
+                entry = parse_job_text(file_name, text)
             else:
-                print(f"⚠️ Skipping unsupported file type: {file_name} ({mime_type})")
-                continue
-            
-            cleaned = clean_job_text(text)
-            cleaned = cleaned.lower()  # Normalize to lowercase for easier matching
-
-            # Check if the resume is blank or too short after cleaning
-            if not cleaned or len(cleaned.strip()) < 50:
-                print(f"⚠️ Skipping blank or too short resume: {file_name} (length: {len(cleaned.strip())})")
-                continue
-
-            # 🔍 Improved requirements extraction
-            requirement_text = ""
-            lines = cleaned.splitlines()
-            lines = [line.strip() for line in lines if line.strip()]
-
-            # Try finding a requirements block based on heading cues
-            start_index = None
-            end_index = len(lines)
-            end = False
-
-            # Expanded heading keys to match more patterns
-            start_keys = [
-                "skills required", "required skills", "job requirements"
-            ]
-            end_keys = [
-                "nice to have", 
-                "about you", "about the team", "about the company"
-            ]
-
-            print(f"🔍 Total non-empty lines after cleaning: {len(lines)}")
-            for i, line in enumerate(lines[2:]):
-                if any(key in line.lower() for key in start_keys):
-                    start_index = i-1
-                    #print(f"Found start key: {line}") # for sample opp. 2, cleaning turns it into 3 lines total, figure it out later
-                    break
-
-            if start_index is not None:
-                end=False
-                print("Found start key!")
-                for j in range(start_index+1, len(lines)):
-                    if any(key in lines[j].lower() for key in end_keys):
-                        print("Found end key!")
-                        end_index = j
-                        end = True
-                        break
-            else:
-                print("⚠️ No start key found, using entire text as requirements.")
-                start_index = 0
-         
-            if not end:
-                end_index = len(lines)
-            
-            requirement_text = "\n".join(lines[start_index-5:end_index])
-            print(f"✅ Extracted requirements from {file_name}")
-
-            # ✅ Append structured entry
-            all_texts.append({
-                "filename": file_name,
-                "text": cleaned,
-                "requirements": requirement_text
-            })
+                entry = parse_job_bytes(file_name, mime_type, data)
+            fetched += 1
+            parsed.append((file, entry))
 
         except Exception as e:
             print(f"❌ Error reading file {file_name}: {e}")
+
+    attach_recruiters([entry for _, entry in parsed if entry is not None])
+    for file, entry in parsed:
+        # Skipped files are cached too, so unsupported / blank files are not downloaded every run
+        corpus_cache.put(file, entry if entry is not None else {"skipped": True})
+        if entry is not None:
+            all_texts.append({**entry, "file_id": file["id"]})
+
+    # Drop postings that were deleted from the folder
+    evicted = corpus_cache.evict_missing(file['id'] for file in files)
+    try:
+        corpus_cache.save()
+    except Exception as e:
+        print(f"⚠️ Could not save job corpus cache: {e}")
+    print(f"📚 Job corpus: {len(all_texts)} postings ({fetched} fetched, {hits} cached, {evicted} evicted)")
+
+    # Keep the pre-filter index in sync with the corpus (only rebuilt when a posting changed)
+    try:
+        refresh_job_index(folder_id, {entry["file_id"]: entry["requirements"] for entry in all_texts})
+    except Exception as e:
+        print(f"⚠️ Could not build job index: {e}")
     return {"drive_texts": all_texts}
 
+# Ranks the postings against the resume with the TF-IDF index and only forwards the best ones to the LLM
+def prefilter_postings_node(state: AgentState) -> AgentState:
+    """Keeps the top-K postings (plus any above the score threshold) for LLM matching."""
+    drive_texts = state.get("drive_texts", [])
+    index = get_job_index(state["resume_folder_id"])
+    if index is None or not drive_texts:
+        print("⚠️ No job index available, sending every posting to the LLM.")
+        return {"drive_texts": drive_texts}
+
+    ranked = index.rank(state.get("experience_text") or "")
+    scores = dict(ranked)
+    kept = [entry for entry in drive_texts if entry.get("file_id") in scores]
+    kept.sort(key=lambda entry: scores[entry["file_id"]], reverse=True)
+    for entry in kept:
+        print(f"🎯 Pre-filter kept {entry['filename']} (similarity {scores[entry['file_id']]:.3f})")
+
+    # Postings the index has not seen (it could not be rebuilt after they were added) cannot be ranked, keep them
+    indexed = set(index.doc_ids)
+    for entry in drive_texts:
+        if entry.get("file_id") not in indexed:
+            print(f"🎯 Pre-filter kept {entry['filename']} (not in the job index)")
+            kept.append(entry)
+    print(f"🔎 Pre-filter: {len(kept)} of {len(drive_texts)} postings forwarded to the LLM")
+    return {"drive_texts": kept}
+
 # Compares the resume experience with the job requirements using an llm
-def match_resume_node(state: AgentState) -> AgentState:
+# All postings are sent to the LLM concurrently (see match_engine.py for the concurrency / rate limit settings)
+async def match_resume_node(state: AgentState) -> AgentState:
     """Compares the resume experience with the job requirements using an LLM."""
     resume = state.get("experience_text")
     drive_texts = state.get("drive_texts")
     recruiter_list = state.get("recruiter_list")
 
     match_results = []
+    candidates = []
 
     for entry in drive_texts: 
         requirements = entry.get("requirements", "")
         filename = entry.get("filename", "Unknown")
 
         recruiter_email = None
+        name = None
         for recruiter in recruiter_list:
             if recruiter.get("job_file") == filename:
                 recruiter_email = recruiter.get("email")
@@ -450,117 +391,137 @@ def match_resume_node(state: AgentState) -> AgentState:
         if not requirements.strip():
             print(f"⚠️ No requirements found in {filename}, skipping.")
             continue  
-        prompt = f"""
-        You're a recruiting assistant. Compare the resume experience below with the job requirements, and rate the match on a scale from 1 to 10. 
-        It is most important that the candidate meets the job requirements. Please add a yes or no to the end pertaining to if all the requirements are met.
-        If a resume has all the requirements, you will send an email to the recruiter, skills desired are not important. be consistent.
-        If the candidate meets all job requirements, you will send an email to the recruiter. 
-        Also give a two-sentence explanation. If a resume does not meet the requirements, explain why.
-        Resume Experience:
-        \"\"\"
-        {resume}
-        \"\"\"
-        Job Requirements:
-        \"\"\"
-        {requirements}
-        \"\"\"
-        Return your answer in this format:
-        Score: X/10
-        Did Meet All Requirements: Yes/No (If yes, will be sending an email to the recruiter)
-        Comment: <your explanation here>
-        """
-        try:
-            response = llm.invoke(prompt)
-            content = response.content.strip()
+        candidates.append({
+            "recruiter_email": recruiter_email,
+            "name": name,
+            "filename": filename,
+            "requirements": requirements,
+        })
 
-            # Check if requirements are met OR score is 8 or above
-            requirements_met = "Did Meet All Requirements: Yes" in content
-            
-            # Extract score from the response
-            score_match = re.search(r'Score:\s*(\d+)/10', content)
-            score = None
-            if score_match:
-                score = int(score_match.group(1))
-            
-            # Accept if requirements are met OR score is 8 or above
-            if requirements_met or (score is not None and score >= 8):
-                match_results.append({
-                    "recruiter_email": recruiter_email,
-                    "name": name,
-                    "filename": filename,
-                    "match_score": content
-                })
-                print(f"✅ Match accepted for {filename} - Requirements met: {requirements_met}, Score: {score}")
-            else:
-                print(f"❌ Match rejected for {filename} - Requirements met: {requirements_met}, Score: {score}")
-            
-            print(f"✅ Match result for {filename}:\n{content}\n")
-        except Exception as e:
-            print(f"❌ Error matching {filename}: {e}")
+    # Identical comparisons (re-uploaded resumes) are answered from the match cache
+    # Answers are keyed by the prompt that produced them (in batch mode, a posting may have fallen back to a single prompt)
+    def cache_key(candidate: dict, prompt_version: str) -> str:
+        return match_cache_key(resume, candidate["requirements"], prompt_version, get_llm().model_name)
+
+    match_cache = get_match_cache()
+    answers = []
+    for candidate in candidates:
+        answer = None
+        for prompt_version in match_prompt_versions():
+            answer = match_cache.get(cache_key(candidate, prompt_version))
+            if answer is not None:
+                break
+        answers.append(answer)
+    pending = [i for i, answer in enumerate(answers) if answer is None]
+
+    print(f"🤖 Matching resume against {len(candidates)} postings ({len(candidates) - len(pending)} cached, {MATCH_MAX_IN_FLIGHT} in flight)")
+    fresh = await match_postings_versioned(get_llm(), resume, [candidates[i]["requirements"] for i in pending])
+    for i, (content, prompt_version) in zip(pending, fresh):
+        answers[i] = content
+        if not isinstance(content, Exception):
+            match_cache.put(cache_key(candidates[i], prompt_version), content)
+    print(f"📊 Match cache: {match_cache.stats()}")
+
+    # Results are returned in the same order as the postings
+    for candidate, content in zip(candidates, answers):
+        filename = candidate["filename"]
+        if isinstance(content, Exception):
+            print(f"❌ Error matching {filename}: {content}")
+            continue
+
+        # Accept if requirements are met OR score is 8 or above
+        accepted, requirements_met, score = evaluate_match(content)
+        if accepted:
+            match_results.append({
+                "recruiter_email": candidate["recruiter_email"],
+                "name": candidate["name"],
+                "filename": filename,
+                "match_score": content
+            })
+            print(f"✅ Match accepted for {filename} - Requirements met: {requirements_met}, Score: {score}")
+        else:
+            print(f"❌ Match rejected for {filename} - Requirements met: {requirements_met}, Score: {score}")
+        
+        print(f"✅ Match result for {filename}:\n{content}\n")
     return {"match_results": match_results}
 
+# Sends one Gmail payload through the pooled MCP sessions
+async def send_email(email_payload: dict):
+    return await get_mcp_pool().call_tool('google_mail_send_email', email_payload)
+
 # Sends emails to recruiters with matched resumes { Note: Need to remove recruiter list, rec. email is now min matched results}
 async def send_recruiter_emails_node(state: AgentState) -> AgentState:
     """Downloads the resume and emails it as an attachment to recruiters for matched jobs."""
-    async with client:
-        print("--- Sending Recruiter Emails ---")
-
-        match_results = state.get("match_results", [])
-        if not match_results:
-            print("No matches found, skipping recruiter emails.")
-            return state
-
-        # Get resume info from state
-        file_id = state.get("file_id")
-        resume_filename = state.get("file_name", "resume.pdf")
-        applicant_name = state.get("applicant_name", "the candidate")
-        applicant_email = state.get("applicant_email", "")
-
-        # Download resume content to attach it to emails
-        encoded_file = None
-        if file_id:
-            try:
-                print(f"⬇️  Downloading resume '{resume_filename}' to attach to emails...")
-                request = service_drive.files().get_media(fileId=file_id)
-                pdf_buffer = io.BytesIO()
-                downloader = MediaIoBaseDownload(pdf_buffer, request)
-                done = False
-                while not done:
-                    status, done = downloader.next_chunk()
-                pdf_buffer.seek(0)
-                file_data = pdf_buffer.read()
-                encoded_file = base64.b64encode(file_data).decode('utf-8')
-                print("✅ Resume downloaded and encoded for attachment.")
-            except Exception as e:
-                print(f"⚠️ Could not download resume for attachment: {e}")
+    print("--- Sending Recruiter Emails ---")
+
+    match_results = state.get("match_results", [])
+    if not match_results:
+        print("No matches found, skipping recruiter emails.")
+        return state
+
+    # Get resume info from state
+    file_id = state.get("file_id")
+    resume_filename = state.get("file_name", "resume.pdf")
+    applicant_name = state.get("applicant_name", "the candidate")
+    applicant_email = state.get("applicant_email", "")
+
+    # Attach the resume downloaded by parse_pdf_node (only download again if it is not in the blob store)
+    encoded_file = None
+    file_data = blob_store.get(state.get("resume_blob"))
+    if file_data is not None:
+        encoded_file = base64.b64encode(file_data).decode('utf-8')
+        print("✅ Resume loaded from the run's blob store for attachment.")
+    elif file_id:
+        try:
+            print(f"⬇️  Downloading resume '{resume_filename}' to attach to emails...")
+            file_data = await asyncio.to_thread(download_file, get_drive_service(), file_id)  # Off the event loop
+            encoded_file = base64.b64encode(file_data).decode('utf-8')
+            print("✅ Resume downloaded and encoded for attachment.")
+        except Exception as e:
+            print(f"⚠️ Could not download resume for attachment: {e}")
+    
+    # Create the candidate description used in every email
+    if applicant_name and applicant_name != "the candidate":
+        candidate_info = f"**{applicant_name}**"
+        if applicant_email:
+            candidate_info += f" ({applicant_email})"
+    else:
+        candidate_info = "a candidate"
+
+    # Group matches by recruiter, so a recruiter owning several matched postings gets one digest email
+    recruiter_matches = {}
+    for match in match_results:
+        recruiter_email = match.get("recruiter_email")
+        if not recruiter_email:
+            print(f"⚠️ No recruiter email for match with {match.get('filename', 'your job opportunity')}, skipping.")
+            continue
+        recruiter_matches.setdefault(recruiter_email.lower(), []).append(match)
+
+    # Keyed by this upload of the resume (file ID + md5), so a re-uploaded resume is sent again but a replayed run is not
+    resume_md5 = state.get("resume_md5") or (hashlib.md5(file_data).hexdigest() if file_data is not None else "")
+    payloads = []
+    keys = []
+    for matches in recruiter_matches.values():
+        recruiter_email = matches[0].get("recruiter_email")
+        recruiter_name = matches[0].get("name", "Recruiter")
+        job_filenames = [match.get("filename", "your job opportunity") for match in matches]
+
+        if len(matches) == 1:
+            subject = f"Potential Candidate Match for {job_filenames[0]}"
+            listing_text = f"your job listing for **{job_filenames[0]}**"
+        else:
+            subject = f"Potential Candidate Match for {len(matches)} of your job listings"
+            listing_text = "your job listings for " + ", ".join(f"**{name}**" for name in job_filenames)
+
+        llm_notes = "\n\n".join(
+            (f"{match.get('filename')}:\n" if len(matches) > 1 else "") + match.get("match_score", "No specific notes from the LLM.")
+            for match in matches
+        )
         
-        emails_sent = 0
-        # Iterate through matches to send emails
-        for match in match_results:
-            recruiter_email = match.get("recruiter_email")
-            recruiter_name = match.get("name", "Recruiter")
-            job_filename = match.get("filename", "your job opportunity")
-
-            if not recruiter_email:
-                print(f"⚠️ No recruiter email for match with {job_filename}, skipping.")
-                continue
-
-            subject = f"Potential Candidate Match for {job_filename}"
-            
-            # Create email body
-            if applicant_name and applicant_name != "the candidate":
-                candidate_info = f"**{applicant_name}**"
-                if applicant_email:
-                    candidate_info += f" ({applicant_email})"
-            else:
-                candidate_info = "a candidate"
-            
-            llm_notes = match.get("match_score", "No specific notes from the LLM.")
-            
-            body = textwrap.dedent(f"""\
+        body = textwrap.dedent(f"""\
     Hi {recruiter_name},
 
-    I'm reaching out on behalf of our recruiting team. We've reviewed your job listing for **{job_filename}** and found {candidate_info} whose resume appears to be a strong match.
+    I'm reaching out on behalf of our recruiting team. We've reviewed {listing_text} and found {candidate_info} whose resume appears to be a strong match.
 
     I've attached the candidate's resume for your review. If you'd like to connect with them, please let us know.
 
@@ -573,78 +534,39 @@ async def send_recruiter_emails_node(state: AgentState) -> AgentState:
     {llm_notes}
     """)
 
-            # Prepare payload with attachment if available
-            email_payload = {
-                'sender_id': "me",
-                'recipient_email': recruiter_email,
-                'subject': subject,
-                'body': body,
-            }
-            if encoded_file:
-                email_payload['attachments'] = [
-                    {
-                        'filename': resume_filename,
-                        'file_bytes': encoded_file
-                    }
-                ]
-                print_attachment_msg = f"with attachment '{resume_filename}'"
-            else:
-                print_attachment_msg = "without attachment"
-
-            try:
-                await client.call_tool('google_mail_send_email', email_payload)
-                print(f"✅ Email sent to {recruiter_email} {print_attachment_msg}")
-                emails_sent += 1
-            except Exception as e:
-                print(f"❌ Failed to send email to {recruiter_email}: {e}")
+        # Prepare payload with attachment if available
+        email_payload = {
+            'sender_id': "me",
+            'recipient_email': recruiter_email,
+            'subject': subject,
+            'body': body,
+        }
+        if encoded_file:
+            email_payload['attachments'] = [
+                {
+                    'filename': resume_filename,
+                    'file_bytes': encoded_file
+                }
+            ]
+        payloads.append(email_payload)
+        keys.append(run_email_key("recruiter", file_id, resume_md5, job_filenames, recruiter_email, file_data if encoded_file else None))
 
-        if emails_sent == 0:
-            print("⚠️ No recruiter emails were sent for this resume.")
+    # Queue the recruiter emails in the outbox, the outbox worker sends them (see outbox.py)
+    emails_queued = await enqueue_emails(payloads, send_email, keys)
+    for email_payload in payloads:
+        print_attachment_msg = f"with attachment '{resume_filename}'" if 'attachments' in email_payload else "without attachment"
+        print(f"📬 Email to {email_payload['recipient_email']} queued {print_attachment_msg}")
 
-        return state
+    if not payloads:
+        print("⚠️ No recruiter emails were queued for this resume.")
+    elif emails_queued < len(payloads):
+        print(f"ℹ️ {len(payloads) - emails_queued} recruiter email(s) were already queued or sent, skipped.")
 
-# Helper Function to find all Free slots for a given time window (Set to 9am to 5pm PST)
-def _collect_slots_in_window(busy_intervals, window_start, window_end, max_to_collect):
-    """Collect up to max_to_collect 30-minute slots within [window_starts, window_end)."""
-    slots = []
-    cursor = window_start
-    for start, end in busy_intervals:
-        # Ignore busy blocks fully before our cursor, ignores all past events
-        if end <= cursor:
-            continue
-        # Fill any free gap before the next busy start { If a busy block is found after cursor -> there is some free time }
-        if start > cursor:
-            free_until = min(start, window_end)
-            while max_to_collect > 0 and cursor + timedelta(minutes=30) <= free_until:
-                slots.append({
-                    "start": cursor.isoformat(),
-                    "end": (cursor + timedelta(minutes=30)).isoformat()
-                })
-                cursor += timedelta(minutes=30) # iterate in 30 min intervals to find all 30min slots
-                max_to_collect -= 1
-                if max_to_collect == 0:
-                    return slots
-        # Advance cursor to after this busy block
-        cursor = max(cursor, end)
-        if cursor >= window_end:
-            return slots
-    # After last busy block, try to fill until window end
-    while max_to_collect > 0 and cursor + timedelta(minutes=30) <= window_end:
-        slots.append({
-            "start": cursor.isoformat(),
-            "end": (cursor + timedelta(minutes=30)).isoformat()
-        })
-        cursor += timedelta(minutes=30)
-        max_to_collect -= 1
-    return slots
+    return state
 
-# Find a recruiters free times so they can be sent to the applicant for an interview
-def find_free_time_(service, email, weeks_to_check=2, morning_needed=2, afternoon_needed=2):
-    """
-    Find two morning (9:00–12:00) and two afternoon (13:00–17:00) 30-min free slots.
-    Starts searching from the day after today (or next Monday if today is Friday).
-    Returns dict with lists of slots under keys "morning" and "afternoon".
-    """
+# Works out the days to search for free slots: starts the day after today (or next Monday if today is Friday)
+def free_time_horizon(weeks_to_check=2):
+    """Returns (today, search_start, monday, horizon_end) where [monday, horizon_end) covers every searched Mon–Fri."""
     # Want the variable for the day after
     today = datetime.now()
     tomorrow = today + timedelta(days=3) 
@@ -654,8 +576,20 @@ def find_free_time_(service, email, weeks_to_check=2, morning_needed=2, afternoo
         search_start = today + timedelta(days=3)
     else:
         search_start = tomorrow
-    # Monday of the start week
-    monday = search_start - timedelta(days=search_start.weekday())
+    # Monday of the start week (from midnight, so the whole day is covered)
+    monday = datetime.combine((search_start - timedelta(days=search_start.weekday())).date(), time(0, 0))
+    horizon_end = monday + timedelta(days=(weeks_to_check - 1) * 7 + 5)  # End of the last Friday
+    return today, search_start, monday, horizon_end
+
+# Find a recruiters free times so they can be sent to the applicant for an interview
+def find_free_time_(service, email, weeks_to_check=2, morning_needed=2, afternoon_needed=2):
+    """
+    Find two morning (9:00–12:00) and two afternoon (13:00–17:00) 30-min free slots.
+    Starts searching from the day after today (or next Monday if today is Friday).
+    Returns dict with lists of slots under keys "morning" and "afternoon".
+    Busy times come from the free/busy cache (see freebusy.py), one lookup for the whole horizon.
+    """
+    today, search_start, monday, horizon_end = free_time_horizon(weeks_to_check)
 
     print(f"🔍 Checking availability for: {email}")
     print(f"📅 Today is: {today.strftime('%A, %Y-%m-%d')}")
@@ -666,82 +600,30 @@ def find_free_time_(service, email, weeks_to_check=2, morning_needed=2, afternoo
     morning_slots = []
     afternoon_slots = []
 
-    for week_offset in range(weeks_to_check):
-        week_start = monday + timedelta(days=week_offset * 7)
-        week_end = week_start + timedelta(days=5)  # Mon–Fri
-        print(f"📅 Week {week_offset + 1}: {week_start.strftime('%Y-%m-%d')} to {week_end.strftime('%Y-%m-%d')}")
-
-        freebusy_query = {
-            "timeMin": week_start.isoformat() + "Z",
-            "timeMax": week_end.isoformat() + "Z",
-            "timeZone": "America/Los_Angeles",
-            "items": [{"id": email}],
-        }
-
-        try:
-            response = service.freebusy().query(body=freebusy_query).execute()
-            if email not in response.get("calendars", {}):
-                print(f"⚠️ No calendar access for {email}")
-                continue
-
-            busy_times = response["calendars"][email].get("busy", [])
-            # Normalize busy intervals to naive datetimes for comparison
-            busy_intervals = [
-                (datetime.fromisoformat(b["start"].replace("Z", "+00:00")).replace(tzinfo=None),
-                 datetime.fromisoformat(b["end"].replace("Z", "+00:00")).replace(tzinfo=None))
-                for b in busy_times
-            ]
-            busy_intervals.sort(key=lambda x: x[0])
-            print(f"📊 Found {len(busy_intervals)} busy time blocks")
-
-            for day_offset in range(5):
-                if len(morning_slots) >= morning_needed and len(afternoon_slots) >= afternoon_needed:
-                    break
-                day = week_start + timedelta(days=day_offset)
-                # Skip days before search_start
-                if day.date() < search_start.date():
-                    continue
-
-                # Morning window 09:00–12:00
-                if len(morning_slots) < morning_needed:
-                    m_start = datetime.combine(day.date(), time(9, 0))
-                    m_end = datetime.combine(day.date(), time(12, 0))
-                    m_found = _collect_slots_in_window(busy_intervals, m_start, m_end, morning_needed - len(morning_slots))
-                    for s in m_found:
-                        morning_slots.append({
-                            **s,
-                            "week": week_offset + 1,
-                            "day": day.strftime('%A'),
-                            "date": day.strftime('%Y-%m-%d'),
-                            "period": "morning"
-                        })
-                        print(f"✅ Morning slot: {day.strftime('%A %Y-%m-%d')} at {datetime.fromisoformat(s['start']).strftime('%I:%M %p')}")
-                        if len(morning_slots) >= morning_needed:
-                            break
-
-                # Afternoon window 13:00–17:00
-                if len(afternoon_slots) < afternoon_needed:
-                    a_start = datetime.combine(day.date(), time(13, 0))
-                    a_end = datetime.combine(day.date(), time(17, 0))
-                    a_found = _collect_slots_in_window(busy_intervals, a_start, a_end, afternoon_needed - len(afternoon_slots))
-                    for s in a_found:
-                        afternoon_slots.append({
-                            **s,
-                            "week": week_offset + 1,
-                            "day": day.strftime('%A'),
-                            "date": day.strftime('%Y-%m-%d'),
-                            "period": "afternoon"
-                        })
-                        print(f"✅ Afternoon slot: {day.strftime('%A %Y-%m-%d')} at {datetime.fromisoformat(s['start']).strftime('%I:%M %p')}")
-                        if len(afternoon_slots) >= afternoon_needed:
-                            break
-
-            if len(morning_slots) >= morning_needed and len(afternoon_slots) >= afternoon_needed:
-                break
-
-        except Exception as e:
-            print(f"❌ Error fetching freebusy for week {week_offset + 1}: {e}")
-            continue
+    try:
+        busy_intervals = query_busy(service, [email], monday, horizon_end)[email]
+    except Exception as e:
+        print(f"❌ Error fetching freebusy for {email}: {e}")
+        return {"morning": morning_slots, "afternoon": afternoon_slots}
+    if busy_intervals is None:
+        return {"morning": morning_slots, "afternoon": afternoon_slots}
+    print(f"📊 Found {len(busy_intervals)} busy time blocks")
+
+    # Free time is precomputed once per recruiter as a bitmap over the horizon (see slot_finder.py)
+    index = get_free_time_index(email, busy_intervals, monday, horizon_end)
+    first_day = datetime.combine(search_start.date(), time(0, 0))  # Skip days before search_start
+
+    for period, needed, slots in (("morning", morning_needed, morning_slots), ("afternoon", afternoon_needed, afternoon_slots)):
+        for slot_start in index.find_slots(WORKING_HOURS[period], slot_minutes=30, limit=needed, not_before=first_day):
+            slots.append({
+                "start": slot_start.isoformat(),
+                "end": (slot_start + timedelta(minutes=30)).isoformat(),
+                "week": (slot_start - monday).days // 7 + 1,
+                "day": slot_start.strftime('%A'),
+                "date": slot_start.strftime('%Y-%m-%d'),
+                "period": period
+            })
+            print(f"✅ {period.title()} slot: {slot_start.strftime('%A %Y-%m-%d')} at {slot_start.strftime('%I:%M %p')}")
 
     return {"morning": morning_slots, "afternoon": afternoon_slots}
 
@@ -753,86 +635,98 @@ async def send_applicant_emails_node(state: AgentState) -> AgentState:
     Send the applicant an email that congratulates them, tells them which job, the name & email of the recruiter, 
     and shares 4 potential slots for an interview.
     '''
-    async with client:
-        print("Preparing to send emails to applicants...")
+    print("Preparing to send emails to applicants...")
 
-        # Get state variables
-        match_list = state.get("match_results", [])
-        applicant_name = state.get("applicant_name", "Candidate")
-        applicant_email = state.get("applicant_email", "")
+    # Get state variables
+    match_list = state.get("match_results", [])
+    applicant_name = state.get("applicant_name", "Candidate")
+    applicant_email = state.get("applicant_email", "")
+    
+    if not applicant_email:
+        print("⚠️ No applicant email found, cannot send notification")
+        return state
+    
+    if not match_list:
+        print("⚠️ No matches found, no email to send")
+        return state
+
+    # Look up every recruiter's calendar in one free/busy query (find_free_time_ then reads from the cache)
+    _, _, monday, horizon_end = free_time_horizon(weeks_to_check=2)
+    try:
+        recruiter_emails = [m["recruiter_email"] for m in match_list if m.get("recruiter_email")]
+        await asyncio.to_thread(query_busy, get_calendar_service(), recruiter_emails, monday, horizon_end)  # Off the event loop
+    except Exception as e:
+        print(f"⚠️ Could not prefetch recruiter calendars: {e}")
+
+    payloads = []
+    keys = []
+    slot_counts = []
+
+    # For every matched job
+    for match in match_list:
+        recruiter_email = match.get("recruiter_email")
+        filename = match.get("filename", "").strip()
+        # job_title = match.get("job_title", "Position") # Future Additions
+        # company_name = match.get("company", "the company") # Future Additions
         
-        if not applicant_email:
-            print("⚠️ No applicant email found, cannot send notification")
-            return state
+        if not recruiter_email:
+            print(f"⚠️ No recruiter email found for match: {filename}")
+            continue
         
-        if not match_list:
-            print("⚠️ No matches found, no email to send")
-            return state
-
-        emails_sent = 0
-
-        # For every matched job
-        for match in match_list:
-            recruiter_email = match.get("recruiter_email")
-            filename = match.get("filename", "").strip()
-            # job_title = match.get("job_title", "Position") # Future Additions
-            # company_name = match.get("company", "the company") # Future Additions
-            
-            if not recruiter_email:
-                print(f"⚠️ No recruiter email found for match: {filename}")
-                continue
-            
-            recruiter_name = recruiter_email.split('@')[0].replace('.', ' ').title()  # Extract name from email
+        recruiter_name = recruiter_email.split('@')[0].replace('.', ' ').title()  # Extract name from email
+        
+        print(f"Processing match for recruiter {recruiter_email}")
+        
+        try:
+            # Use your existing helper function to get 4 free slots - 2 morning, 2 afternoon
+            # In a thread: a calendar the prefetch above missed (or a failed prefetch) means a Calendar API call
+            slots = await asyncio.to_thread(
+                lambda: find_free_time_(get_calendar_service(), recruiter_email, weeks_to_check=2, morning_needed=2, afternoon_needed=2)
+            )
+            morning_slots = slots.get("morning", [])
+            afternoon_slots = slots.get("afternoon", [])
             
-            print(f"Processing match for recruiter {recruiter_email}")
+            # Format available times
+            times_text = ""
+            all_slots = morning_slots + afternoon_slots
             
-            try:
-                # Use your existing helper function to get 4 free slots - 2 morning, 2 afternoon
-                slots = find_free_time_(service, recruiter_email, weeks_to_check=2, morning_needed=2, afternoon_needed=2)
-                morning_slots = slots.get("morning", [])
-                afternoon_slots = slots.get("afternoon", [])
-                
-                # Format available times
-                times_text = ""
-                all_slots = morning_slots + afternoon_slots
+            if all_slots:
+                times_text = "Here are some available meeting times with the recruiter:\n\n"
                 
-                if all_slots:
-                    times_text = "Here are some available meeting times with the recruiter:\n\n"
-                    
-                    if morning_slots:
-                        times_text += "**Morning Options (9 AM - 12 PM):**\n"
-                        for i, slot in enumerate(morning_slots, 1):
-                            start_time = datetime.fromisoformat(slot["start"])
-                            end_time = datetime.fromisoformat(slot["end"])
-                            times_text += f"   {i}. {slot['day']}, {slot['date']} - {start_time.strftime('%I:%M %p')} to {end_time.strftime('%I:%M %p')}\n"
-                        times_text += "\n"
-                    
-                    if afternoon_slots:
-                        times_text += "**Afternoon Options (1 PM - 5 PM):**\n"
-                        for i, slot in enumerate(afternoon_slots, len(morning_slots) + 1):
-                            start_time = datetime.fromisoformat(slot["start"])
-                            end_time = datetime.fromisoformat(slot["end"])
-                            times_text += f"   {i}. {slot['day']}, {slot['date']} - {start_time.strftime('%I:%M %p')} to {end_time.strftime('%I:%M %p')}\n"
-                        times_text += "\n"
-                    
-                    times_text += "Please reply to this email with your preferred time slot number, and we'll coordinate with the recruiter to confirm the meeting.\n"
-                else:
-                    times_text = "We're working on coordinating meeting times with the recruiter and will follow up with availability soon.\n"
+                if morning_slots:
+                    times_text += "**Morning Options (9 AM - 12 PM):**\n"
+                    for i, slot in enumerate(morning_slots, 1):
+                        start_time = datetime.fromisoformat(slot["start"])
+                        end_time = datetime.fromisoformat(slot["end"])
+                        times_text += f"   {i}. {slot['day']}, {slot['date']} - {start_time.strftime('%I:%M %p')} to {end_time.strftime('%I:%M %p')}\n"
+                    times_text += "\n"
                 
-                # Get LLM match notes
-                llm_notes = match.get("match_score", "")
-                match_summary = ""
-                if llm_notes:
-                    # Clean up the LLM notes for better presentation
-                    match_summary = llm_notes.replace('Score:', 'Match Score:').replace('Did Meet All Requirements:', 'Requirements Met:').replace('Comment:', 'Feedback:')
+                if afternoon_slots:
+                    times_text += "**Afternoon Options (1 PM - 5 PM):**\n"
+                    for i, slot in enumerate(afternoon_slots, len(morning_slots) + 1):
+                        start_time = datetime.fromisoformat(slot["start"])
+                        end_time = datetime.fromisoformat(slot["end"])
+                        times_text += f"   {i}. {slot['day']}, {slot['date']} - {start_time.strftime('%I:%M %p')} to {end_time.strftime('%I:%M %p')}\n"
+                    times_text += "\n"
                 
-                subject = f"Exciting News! You're a Match!"
+                times_text += "Please reply to this email with your preferred time slot number, and we'll coordinate with the recruiter to confirm the meeting.\n"
+            else:
+                times_text = "We're working on coordinating meeting times with the recruiter and will follow up with availability soon.\n"
+            
+            # Get LLM match notes
+            llm_notes = match.get("match_score", "")
+            match_summary = ""
+            if llm_notes:
+                # Clean up the LLM notes for better presentation
+                match_summary = llm_notes.replace('Score:', 'Match Score:').replace('Did Meet All Requirements:', 'Requirements Met:').replace('Comment:', 'Feedback:')
+            
+            subject = f"Exciting News! You're a Match!"
 
-                # TO BE ADDED
-                # 🏢 **Company:** {company_name}
-                # 💼 **Position:** {job_title}
-                
-                body = textwrap.dedent(f"""\
+            # TO BE ADDED
+            # 🏢 **Company:** {company_name}
+            # 💼 **Position:** {job_title}
+            
+            body = textwrap.dedent(f"""\
 Hi {applicant_name},
 
 Congratulations! 🎉 Your resume has been matched with an exciting opportunity, and the recruiter is interested in connecting with you.
@@ -859,29 +753,58 @@ Gentoro AI
 This is an automated message. Please reply with your preferred meeting time or contact the recruiter directly.
 """)
 
-                # Send the email
-                await client.call_tool('google_mail_send_email', {
-                    'sender_id': "me",
-                    'recipient_email': applicant_email,
-                    'subject': subject,
-                    'body': body
-                })
-                
-                # print(f"✅ Email sent to {applicant_email} for {job_title} position at {company_name}")
-                print(f" 📅 Included {len(all_slots)} available time slots")
-                emails_sent += 1
-                
-            except Exception as e:
-                # print(f"❌ Failed to process match for {job_title}: {e}")
-                print(f"🔍 Error type: {type(e).__name__}")
-                continue
+            # Queue the email (sent below together with the others)
+            payloads.append({
+                'sender_id': "me",
+                'recipient_email': applicant_email,
+                'subject': subject,
+                'body': body
+            })
+            keys.append(run_email_key("applicant", state.get("file_id"), state.get("resume_md5"), [filename], applicant_email))
+            slot_counts.append(len(all_slots))
+            
+        except Exception as e:
+            # print(f"❌ Failed to process match for {job_title}: {e}")
+            print(f"🔍 Error type: {type(e).__name__}")
+            continue
 
-        if emails_sent == 0:
-            print("⚠️ No applicant emails sent.")
-        else:
-            print(f"✅ Successfully sent {emails_sent} notification(s) to {applicant_email}")
+    # Queue the emails in the outbox (one email per upload of the resume and posting, see outbox.py)
+    emails_queued = await enqueue_emails(payloads, send_email, keys)
+    for slot_count in slot_counts:
+        # print(f"✅ Email queued for {applicant_email} for {job_title} position at {company_name}")
+        print(f" 📅 Included {slot_count} available time slots")
 
-        return state
+    if emails_queued == 0:
+        print("⚠️ No applicant emails queued.")
+    else:
+        print(f"✅ Successfully queued {emails_queued} notification(s) to {applicant_email}")
+
+    return state
+
+# Frees the per-run resources (the downloaded resume bytes) once all emails are sent
+def release_run_resources_node(state: AgentState) -> AgentState:
+    blob_store.release(state.get("resume_blob"))
+    return {"resume_blob": None}
+
+# A node that raises ends the run before release_run_resources, so the wrapped node releases the blob on the way out
+def release_on_error(node):
+    if asyncio.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def wrapper(state: AgentState):
+            try:
+                return await node(state)
+            except BaseException:  # Cancelled runs too
+                blob_store.release(state.get("resume_blob"))
+                raise
+    else:
+        @functools.wraps(node)
+        def wrapper(state: AgentState):
+            try:
+                return node(state)
+            except BaseException:
+                blob_store.release(state.get("resume_blob"))
+                raise
+    return wrapper
 
 def should_continue_processing(state: AgentState) -> str:
     """Determines whether to continue processing or end due to unreadable resume."""
@@ -895,13 +818,15 @@ builder = StateGraph(AgentState)
 
 # Nodes
 builder.add_node("parse_pdf", parse_pdf_node)
-builder.add_node("extract_experience", extract_experience_node)
+builder.add_node("extract_experience", release_on_error(extract_experience_node))
 builder.add_node("resume_unreadable_end", resume_unreadable_end_node)
-builder.add_node("read_drive_folder", read_drive_folder_node)
-builder.add_node("extract_recruiters_emails_node", extract_recruiter_emails_node)
-builder.add_node("match_resume_node", match_resume_node)
-builder.add_node("send_recruiter_emails_node", send_recruiter_emails_node)
-builder.add_node("send_app_email_node", send_applicant_emails_node)
+builder.add_node("read_drive_folder", release_on_error(read_drive_folder_node))
+builder.add_node("extract_recruiters_emails_node", release_on_error(extract_recruiter_emails_node))
+builder.add_node("prefilter_postings_node", release_on_error(prefilter_postings_node))
+builder.add_node("match_resume_node", release_on_error(match_resume_node))
+builder.add_node("send_recruiter_emails_node", release_on_error(send_recruiter_emails_node))
+builder.add_node("send_app_email_node", release_on_error(send_applicant_emails_node))
+builder.add_node("release_run_resources", release_run_resources_node)
 
 # Edges
 builder.add_edge(START, "parse_pdf")
@@ -915,16 +840,17 @@ builder.add_conditional_edges(
     }
 )
 builder.add_edge("read_drive_folder", "extract_recruiters_emails_node")
-builder.add_edge("extract_recruiters_emails_node", "match_resume_node")
+builder.add_edge("extract_recruiters_emails_node", "prefilter_postings_node")
+builder.add_edge("prefilter_postings_node", "match_resume_node")
 builder.add_edge("match_resume_node", "send_recruiter_emails_node")
 builder.add_edge("send_recruiter_emails_node", "send_app_email_node")
-builder.add_edge("send_app_email_node", END)
+builder.add_edge("send_app_email_node", "release_run_resources")
+builder.add_edge("release_run_resources", END)
 builder.add_edge("resume_unreadable_end", END)
 
 
 # Compile the graph for the Langgraph API
 graph = builder.compile()
-print("Graph is compiled!") 
 
 # Run the graph locally (used for initial testing)
 # async def main():
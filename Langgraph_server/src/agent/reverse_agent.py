@@ -0,0 +1,239 @@
+# Description: Reverse matching graph - a new job posting is matched against the whole resume pool
+# The forward graph (recruit_agent.py) only runs when a resume is uploaded. This graph starts from a
+# posting's file ID instead, reuses a cached index of pre-parsed resumes, and fans the LLM comparisons
+# out in parallel with the same match cache and concurrency limits as the forward direction.
+
+import asyncio
+import hashlib
+from typing import TypedDict, Optional, List
+from langgraph.graph import StateGraph, END, START
+
+from agent.blob_store import blob_store
+from agent.clients import get_drive_service, get_llm
+from agent.corpus_cache import DRIVE_FINGERPRINT_FIELDS, get_drive_cache
+from agent.drive_io import download_many, execute_with_retry, list_folder
+from agent.match_cache import get_match_cache, match_cache_key
+from agent.match_engine import MATCH_MAX_IN_FLIGHT, MATCH_PROMPT_VERSION, build_match_prompt, evaluate_match, run_prompts
+from agent.pdf_pool import extract_many
+from agent.recruit_agent import (
+    attach_recruiters,
+    extract_applicant_info,
+    extract_experience_node,
+    extract_recruiter_emails_node,
+    parse_job_file,
+    send_recruiter_emails_node,
+    send_applicant_emails_node,
+)
+
+
+class ReverseState(TypedDict):
+    # Posting fields
+    file_id: str # The GDrive ID of the new job posting (provided in webhook / trigger)
+    file_name: str # The name of the job posting
+    posting: Optional[dict] # Parsed posting {filename, text, requirements}
+    recruiter: Optional[dict] # Recruiter found in the posting {email, name, job_file}
+
+    # Google Drive fields
+    input_folder_id: str # The folder holding the resume pool
+    resume_folder_id: str # The folder holding the opportunities (used to share the job corpus cache)
+    resumes: List[dict] # Pre-parsed resumes {file_id, filename, applicant_name, applicant_email, experience_text}
+
+    # Match results
+    match_results: Optional[List[dict]] # One entry per matched resume
+
+
+# Parses the posting that triggered the run (from the job corpus cache when it has not changed)
+def load_posting_node(state: ReverseState) -> ReverseState:
+    file_id = state["file_id"]
+    print(f"--- Starting Reverse Match for posting: {state.get('file_name')} (ID: {file_id}) ---")
+
+    try:
+        meta = execute_with_retry(get_drive_service().files().get(fileId=file_id, fields=DRIVE_FINGERPRINT_FIELDS).execute)
+        corpus_cache = get_drive_cache("job_corpus", state["resume_folder_id"]) if state.get("resume_folder_id") else None
+
+        posting = corpus_cache.get(meta) if corpus_cache else None
+        if posting is None:
+            posting = parse_job_file(file_id, meta["name"], meta["mimeType"])
+            if posting is not None:
+                attach_recruiters([posting])
+            else:
+                posting = {"skipped": True}
+            if corpus_cache:
+                corpus_cache.put(meta, posting)
+                corpus_cache.save()
+    except Exception as e:
+        print(f"❌ Error reading posting {state.get('file_name')}: {e}")
+        return {"posting": None, "recruiter": None}
+
+    if posting.get("skipped"):
+        print(f"⚠️ Posting {meta['name']} could not be parsed, nothing to match.")
+        return {"posting": None, "recruiter": None}
+
+    posting = {**posting, "filename": meta["name"], "file_id": file_id}
+    recruiters = extract_recruiter_emails_node({"drive_texts": [posting], "recruiter_list": []})["recruiter_list"]
+    return {"posting": posting, "recruiter": recruiters[0] if recruiters else None}
+
+
+# Parses the extracted text of a resume the same way the forward graph does
+def parse_resume_text(file_name: str, text: str) -> dict:
+    if len(text) < 100:
+        print(f"⚠️ Text of {file_name} is too short: {len(text)} characters")
+        return {"skipped": True}
+    applicant_name, applicant_email = extract_applicant_info(text)
+    experience = extract_experience_node({"raw_text": text})
+    if not experience.get("resume_readable"):
+        return {"skipped": True}
+    return {
+        "filename": file_name,
+        "applicant_name": applicant_name,
+        "applicant_email": applicant_email or "",
+        "experience_text": experience["experience_text"],
+    }
+
+
+# Loads the resume pool from the resume index, only parsing resumes that are new or changed
+# New / changed resumes are downloaded in parallel and their PDFs extracted on the process pool
+def load_resume_pool_node(state: ReverseState) -> ReverseState:
+    if not state.get("posting"):
+        return {"resumes": []}
+
+    folder_id = state["input_folder_id"]
+    resume_index = get_drive_cache("resume_index", folder_id)
+
+    files = list_folder(get_drive_service(), folder_id, DRIVE_FINGERPRINT_FIELDS, "mimeType = 'application/pdf'")
+
+    cached_entries = {file["id"]: resume_index.get(file) for file in files}
+    downloads = download_many(get_drive_service(), [file["id"] for file in files if cached_entries[file["id"]] is None])
+    texts = extract_many({file_id: data for file_id, data in downloads.items() if isinstance(data, bytes)}, stop="resume")
+
+    resumes = []
+    parsed = 0
+    for file in files:
+        entry = cached_entries[file["id"]]
+        if entry is None:
+            try:
+                text = texts.get(file["id"], downloads.get(file["id"]))
+                if isinstance(text, Exception):
+                    raise text
+                entry = parse_resume_text(file["name"], text)
+                parsed += 1
+                resume_index.put(file, entry)
+            except Exception as e:
+                print(f"❌ Error parsing resume {file['name']}: {e}")
+                continue
+        if not entry.get("skipped"):
+            resumes.append({**entry, "file_id": file["id"], "filename": file["name"]})
+
+    evicted = resume_index.evict_missing(file["id"] for file in files)
+    try:
+        resume_index.save()
+    except Exception as e:
+        print(f"⚠️ Could not save resume index: {e}")
+    print(f"📚 Resume pool: {len(resumes)} resumes ({parsed} parsed, {evicted} evicted)")
+    return {"resumes": resumes}
+
+
+# Compares every resume in the pool with the posting, concurrently
+async def match_pool_node(state: ReverseState) -> ReverseState:
+    posting = state.get("posting")
+    resumes = state.get("resumes", [])
+    if not posting or not resumes:
+        return {"match_results": []}
+
+    recruiter = state.get("recruiter") or {}
+    requirements = posting.get("requirements", "")
+    if not requirements.strip():
+        print(f"⚠️ No requirements found in {posting['filename']}, skipping.")
+        return {"match_results": []}
+
+    match_cache = get_match_cache()
+    keys = [match_cache_key(r["experience_text"], requirements, MATCH_PROMPT_VERSION, get_llm().model_name) for r in resumes]
+    answers = [match_cache.get(key) for key in keys]
+    pending = [i for i, answer in enumerate(answers) if answer is None]
+
+    print(f"🤖 Matching {posting['filename']} against {len(resumes)} resumes ({len(resumes) - len(pending)} cached, {MATCH_MAX_IN_FLIGHT} in flight)")
+    fresh = await run_prompts(get_llm(), [build_match_prompt(resumes[i]["experience_text"], requirements) for i in pending])
+    for i, content in zip(pending, fresh):
+        answers[i] = content
+        if not isinstance(content, Exception):
+            match_cache.put(keys[i], content)
+
+    match_results = []
+    for resume, content in zip(resumes, answers):
+        if isinstance(content, Exception):
+            print(f"❌ Error matching {resume['filename']}: {content}")
+            continue
+        accepted, requirements_met, score = evaluate_match(content)
+        if accepted:
+            match_results.append({
+                "recruiter_email": recruiter.get("email"),
+                "name": recruiter.get("name"),
+                "filename": posting["filename"],
+                "match_score": content,
+                "resume_file_id": resume["file_id"],
+                "resume_file_name": resume["filename"],
+                "applicant_name": resume.get("applicant_name"),
+                "applicant_email": resume.get("applicant_email", ""),
+            })
+            print(f"✅ Match accepted for {resume['filename']} - Requirements met: {requirements_met}, Score: {score}")
+        else:
+            print(f"❌ Match rejected for {resume['filename']} - Requirements met: {requirements_met}, Score: {score}")
+    return {"match_results": match_results}
+
+
+# Notifies the recruiter and applicant for every matched resume, reusing the forward graph's email nodes
+async def notify_matches_node(state: ReverseState) -> ReverseState:
+    match_results = state.get("match_results", [])
+    if not match_results:
+        print("No resumes in the pool matched this posting.")
+        return {}
+
+    # Download every matched resume up front, in parallel and off the event loop, for the recruiter attachments
+    file_ids = list(dict.fromkeys(match["resume_file_id"] for match in match_results))
+    downloads = await asyncio.to_thread(download_many, get_drive_service(), file_ids)
+    blobs = {}
+    md5s = {}
+    for file_id, data in downloads.items():
+        if isinstance(data, Exception):
+            print(f"⚠️ Could not download resume {file_id} for attachment: {data}")
+        else:
+            blobs[file_id] = blob_store.put(file_id, data)
+            md5s[file_id] = hashlib.md5(data).hexdigest()
+
+    try:
+        for match in match_results:
+            resume_state = {
+                "file_id": match["resume_file_id"],
+                "file_name": match["resume_file_name"],
+                "applicant_name": match.get("applicant_name"),
+                "applicant_email": match.get("applicant_email", ""),
+                "resume_blob": blobs.get(match["resume_file_id"]),
+                "resume_md5": md5s.get(match["resume_file_id"]),
+                "match_results": [match],
+            }
+            await send_recruiter_emails_node(resume_state)
+            await send_applicant_emails_node(resume_state)
+    finally:
+        for handle in blobs.values():
+            blob_store.release(handle)
+    return {}
+
+
+# Build LangGraph
+builder = StateGraph(ReverseState)
+
+# Nodes
+builder.add_node("load_posting", load_posting_node)
+builder.add_node("load_resume_pool", load_resume_pool_node)
+builder.add_node("match_pool", match_pool_node)
+builder.add_node("notify_matches", notify_matches_node)
+
+# Edges
+builder.add_edge(START, "load_posting")
+builder.add_edge("load_posting", "load_resume_pool")
+builder.add_edge("load_resume_pool", "match_pool")
+builder.add_edge("match_pool", "notify_matches")
+builder.add_edge("notify_matches", END)
+
+# Compile the graph for the Langgraph API
+graph = builder.compile()
@@ -0,0 +1,115 @@
+# Description: Single-pass section segmentation shared by the resume and job posting parsers
+# Finding a section used to be a hand written scan per caller, testing every heading keyword against every
+# line with `any(key in line.upper() ...)`. One segmenter per document type now holds all heading keywords,
+# finds their occurrences in one ordered sweep over the upper-cased document (or, for a single section, only
+# searches each keyword up to its first occurrence).
+
+import heapq
+from typing import Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Section(NamedTuple):
+    name: str
+    start: int  # Index of the heading line
+    end: int  # Index of the first line after the section (the next heading, or len(lines))
+
+
+class SectionSegmenter:
+    """
+    Splits a document (a list of lines without line breaks) into named sections. Headings are matched
+    case-insensitively: the document is upper-cased once, then every heading keyword keeps a str.find cursor
+    into it and the cursors are merged in document order (a heap), so each keyword occurrence is found once
+    and the scan can stop at any point.
+    """
+
+    def __init__(self, headings: Dict[str, Iterable[str]]):
+        self._names = {key.upper(): name for name, keys in headings.items() for key in keys}
+
+    def iter_headings(self, lines: Sequence[str], first_line: int = 0) -> Iterator[Tuple[int, FrozenSet[str]]]:
+        """Yields (line index, names of the sections it mentions) for every line from first_line holding a heading."""
+        text = "\n".join(lines[first_line:]).upper()  # upper() never adds or removes line breaks
+        cursors = [(text.find(key), key) for key in self._names]
+        cursors = [cursor for cursor in cursors if cursor[0] >= 0]
+        heapq.heapify(cursors)
+
+        line, pos = first_line, 0
+        current, found = None, set()
+        while cursors:
+            start, key = cursors[0]
+            following = text.find(key, start + len(key))
+            if following >= 0:
+                heapq.heapreplace(cursors, (following, key))
+            else:
+                heapq.heappop(cursors)
+
+            line += text.count("\n", pos, start)
+            pos = start
+            if line != current:
+                if found:
+                    yield current, frozenset(found)
+                current, found = line, set()
+            found.add(self._names[key])
+        if found:
+            yield current, frozenset(found)
+
+    def headings(self, lines: Sequence[str], first_line: int = 0) -> List[Tuple[int, FrozenSet[str]]]:
+        return list(self.iter_headings(lines, first_line))
+
+    def split(self, lines: Sequence[str], first_line: int = 0) -> Dict[str, Section]:
+        """
+        The first section of every name that occurs: from the first line mentioning one of its headings up to
+        the next line mentioning the heading of another section (or the end of the document).
+        """
+        sections = {}
+        pending = {}  # Sections whose end has not been seen yet {name: start}
+        for i, found in self.iter_headings(lines, first_line):
+            for name, start in list(pending.items()):
+                if found - {name}:
+                    sections[name] = Section(name, start, i)
+                    del pending[name]
+            for name in found:
+                if name not in sections and name not in pending:
+                    pending[name] = i
+        for name, start in pending.items():
+            sections[name] = Section(name, start, len(lines))
+        return sections
+
+    def find(self, lines: Sequence[str], name: str, first_line: int = 0) -> Optional[Section]:
+        """
+        The first section called `name` (same bounds as split()), None if none of its headings occur.
+        Each keyword is only searched up to its first occurrence, so this is the cheap way to get one section.
+        """
+        text = "\n".join(lines[first_line:]).upper()
+        starts = [text.find(key) for key, section in self._names.items() if section == name]
+        starts = [pos for pos in starts if pos >= 0]
+        if not starts:
+            return None
+        start = min(starts)
+        start_line = first_line + text.count("\n", 0, start)
+
+        next_line = text.find("\n", start) + 1
+        if next_line == 0:
+            return Section(name, start_line, len(lines))
+        ends = [text.find(key, next_line) for key, section in self._names.items() if section != name]
+        ends = [pos for pos in ends if pos >= 0]
+        if not ends:
+            return Section(name, start_line, len(lines))
+        return Section(name, start_line, start_line + 1 + text.count("\n", next_line, min(ends)))
+
+
+# Resume headings: the work experience section runs until the next of these headings
+resume_sections = SectionSegmenter({
+    "experience": ["WORK EXPERIENCE"],
+    "certifications": ["CERTIFICATIONS"],
+    "education": ["EDUCATION"],
+    "skills": ["SKILLS"],
+    "projects": ["PROJECTS"],
+    "summary": ["SUMMARY"],
+})
+
+# Job posting headings: the requirements block runs until the "nice to have" / "about ..." part
+posting_sections = SectionSegmenter({
+    "requirements": ["skills required", "required skills", "job requirements"],
+    "nice_to_have": ["nice to have"],
+    "about": ["about you", "about the team", "about the company"],
+})
@@ -0,0 +1,105 @@
+# Description: Bitmap based free-slot finder for recruiter calendars
+# A recruiter's busy intervals are turned once into a NumPy boolean array over the search horizon
+# (one cell per `resolution_minutes`). Finding "N morning + M afternoon slots" is then a couple of
+# vectorized scans over that array instead of rescanning the busy list for every window of every day.
+
+import threading
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Working-hour templates: period name -> (start, end) of the window, applied on every searched weekday
+WORKING_HOURS: Dict[str, Tuple[time, time]] = {
+    "morning": (time(9, 0), time(12, 0)),
+    "afternoon": (time(13, 0), time(17, 0)),
+}
+WEEKDAYS = (0, 1, 2, 3, 4)  # Mon–Fri
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (start index, length) of every run of True values in the mask."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+class FreeTimeIndex:
+    """Free/busy bitmap for one calendar over [horizon_start, horizon_end)."""
+
+    def __init__(self, busy_intervals: Iterable[Tuple[datetime, datetime]], horizon_start: datetime, horizon_end: datetime, resolution_minutes: int = 30):
+        self.start = horizon_start
+        self.resolution = timedelta(minutes=resolution_minutes)
+        self.size = int(np.ceil((horizon_end - horizon_start) / self.resolution))
+
+        # Mark every cell touched by a busy block: +1 where a block starts, -1 after it ends, then a running sum
+        step = self.resolution.total_seconds()
+        busy = np.array(
+            [((s - horizon_start).total_seconds(), (e - horizon_start).total_seconds()) for s, e in busy_intervals],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        first = np.clip(np.floor(busy[:, 0] / step), 0, self.size).astype(np.int64)
+        last = np.clip(np.ceil(busy[:, 1] / step), 0, self.size).astype(np.int64)
+        delta = np.zeros(self.size + 1, dtype=np.int32)
+        np.add.at(delta, first, 1)
+        np.add.at(delta, last, -1)
+        self.free = np.cumsum(delta[:-1]) == 0
+
+    def _template_mask(self, window: Tuple[time, time], not_before: datetime, weekdays: Sequence[int]) -> np.ndarray:
+        """True for every cell inside the working-hour window on an allowed day, at or after not_before."""
+        cells = np.arange(self.size)
+        cell_minutes = cells * int(self.resolution.total_seconds() // 60) + (self.start.hour * 60 + self.start.minute)
+        day_index = cell_minutes // (24 * 60)
+        minute_of_day = cell_minutes % (24 * 60)
+        weekday = (self.start.weekday() + day_index) % 7
+
+        window_start = window[0].hour * 60 + window[0].minute
+        window_end = window[1].hour * 60 + window[1].minute
+        mask = (minute_of_day >= window_start) & (minute_of_day < window_end) & np.isin(weekday, weekdays)
+        first_cell = int(np.ceil(max(0.0, (not_before - self.start) / self.resolution)))
+        mask[:first_cell] = False
+        return mask
+
+    def find_slots(self, window: Tuple[time, time], slot_minutes: int = 30, limit: int = 2, not_before: datetime = None, weekdays: Sequence[int] = WEEKDAYS) -> List[datetime]:
+        """
+        Returns the start times of the earliest `limit` free slots of `slot_minutes` inside the window,
+        back to back within each free stretch (like booking them one after another).
+        """
+        cells_per_slot = max(1, int(np.ceil(timedelta(minutes=slot_minutes) / self.resolution)))
+        eligible = self.free & self._template_mask(window, not_before or self.start, weekdays)
+
+        # Every free stretch of length L holds L // k back to back slots
+        starts, lengths = _runs(eligible)
+        counts = lengths // cells_per_slot
+        starts, counts = starts[counts > 0], counts[counts > 0]
+        if limit is not None:
+            # Only expand as many stretches as needed to reach the limit
+            needed = np.searchsorted(np.cumsum(counts), limit) + 1
+            starts, counts = starts[:needed], counts[:needed]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        slot_cells = np.repeat(starts, counts) + offsets * cells_per_slot
+        if limit is not None:
+            slot_cells = slot_cells[:limit]
+        return [self.start + int(cell) * self.resolution for cell in slot_cells]
+
+
+# One index per recruiter and horizon, rebuilt only when the free/busy data behind it changes
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_free_time_index(email: str, busy_intervals: list, horizon_start: datetime, horizon_end: datetime) -> FreeTimeIndex:
+    """Returns the recruiter's FreeTimeIndex, reusing it while the (cached) busy list is the same object."""
+    key = (email, horizon_start, horizon_end)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is not None and entry[0] is busy_intervals:
+            return entry[1]
+    index = FreeTimeIndex(busy_intervals, horizon_start, horizon_end)
+    with _indexes_lock:
+        # Drop indexes for older horizons, they can't be asked for again
+        for old_key in [k for k in _indexes if k[1] < horizon_start]:
+            del _indexes[old_key]
+        _indexes[key] = (busy_intervals, index)
+    return index
@@ -0,0 +1,25 @@
+# Description: Custom HTTP app mounted by the LangGraph server (see "http" in langgraph.json)
+# It only adds a lifespan hook: the email outbox worker is started when the server starts, so emails left
+# pending or waiting for a retry by a previous process are sent right away instead of on the next enqueue.
+
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+
+from agent.outbox import start_outbox_worker
+
+
+@asynccontextmanager
+async def lifespan(app):
+    from agent.recruit_agent import send_email
+
+    # Same event loop as the graph runs, so enqueue_emails() wakes this worker instead of starting another
+    worker = start_outbox_worker(send_email)
+    print("📬 Outbox worker started with the server")
+    try:
+        yield
+    finally:
+        worker.task.cancel()
+
+
+app = Starlette(lifespan=lifespan)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The agent package lives in src/ (see [tool.setuptools.package-dir] in pyproject.toml)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+# The Flask app modules import each other as top level modules (python app/app.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
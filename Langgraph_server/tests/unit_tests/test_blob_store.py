@@ -0,0 +1,35 @@
+import threading
+
+from agent.blob_store import BlobStore
+
+
+def test_shared_handle_is_freed_with_the_last_reference():
+    store = BlobStore(spill_bytes=4)
+    first = store.put("f1", b"spilled bytes")
+    second = store.put("f1", b"spilled bytes")
+    assert first == second
+    store.release(first)
+    assert store.get(first) == b"spilled bytes"
+    store.release(second)
+    assert store.get(first) is None
+
+
+def test_get_never_races_release_of_a_spilled_blob():
+    store = BlobStore(spill_bytes=4)
+    data = b"x" * 100_000
+    errors = []
+
+    def reader(handle):
+        try:
+            for _ in range(50):
+                assert store.get(handle) in (data, None)
+        except Exception as e:
+            errors.append(e)
+
+    for i in range(20):
+        handle = store.put(f"f{i}", data)
+        thread = threading.Thread(target=reader, args=(handle,))
+        thread.start()
+        store.release(handle)
+        thread.join()
+    assert errors == []
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from change_feed import ChangeFeedConsumer, FolderRoutes, iter_change_pages
+
+
+class FakeChanges:
+    """Stands in for service.changes().list(...).execute(): one response per page token."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def changes(self):
+        return self
+
+    def list(self, pageToken, **kwargs):
+        self.requested.append(pageToken)
+        response = self.pages[pageToken]
+        return type("Request", (), {"execute": lambda _, num_retries=0: response})()
+
+
+def test_pages_until_the_new_start_token():
+    service = FakeChanges({
+        "t1": {"changes": [{"fileId": "a"}], "nextPageToken": "t2"},
+        "t2": {"changes": [{"fileId": "b"}], "nextPageToken": "t3"},
+        "t3": {"changes": [], "newStartPageToken": "t4"},
+    })
+    pages = list(iter_change_pages(service, "t1"))
+    assert pages == [([{"fileId": "a"}], "t2"), ([{"fileId": "b"}], "t3"), ([], "t4")]
+    assert service.requested == ["t1", "t2", "t3"]
+
+
+def test_routes_by_parent_folder_and_filter():
+    routes = FolderRoutes()
+    routes.add("resumes", "resume", lambda f: f["mimeType"] == "application/pdf")
+    routes.add("postings", "posting")
+    routes.add(None, "ignored")  # Unset folder IDs are skipped
+
+    assert routes.route({"parents": ["other", "resumes"], "mimeType": "application/pdf"}) == "resume"
+    assert routes.route({"parents": ["resumes"], "mimeType": "image/png"}) is None
+    assert routes.route({"parents": ["postings"], "mimeType": "text/plain"}) == "posting"
+    assert routes.route({"parents": ["postings"], "trashed": True}) is None
+    assert routes.route(None) is None
+
+
+def test_notifications_during_a_pull_are_coalesced_into_one_more_pull():
+    started = threading.Event()
+    release = threading.Event()
+    pulls = []
+
+    def pull():
+        pulls.append(time.monotonic())
+        if len(pulls) == 1:
+            started.set()
+            release.wait(5)
+        return True
+
+    consumer = ChangeFeedConsumer(pull)
+    consumer.notify()
+    assert started.wait(5)
+    for _ in range(10):
+        consumer.notify()
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while len(pulls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    assert len(pulls) == 2
+
+
+def test_incomplete_pull_is_retried():
+    results = [False, True]
+    pulls = []
+    done = threading.Event()
+
+    def pull():
+        pulls.append(1)
+        if len(pulls) == 2:
+            done.set()
+        return results[len(pulls) - 1]
+
+    ChangeFeedConsumer(pull, retry_seconds=0.05).notify()
+    assert done.wait(5)
@@ -0,0 +1,33 @@
+import pytest
+
+from agent.contacts import applicant_contact, extract_many, recruiter_contact
+
+
+@pytest.mark.parametrize("heading", [
+    "Educational Background",
+    "Professional Experiences",
+    "Emails and Phones",
+    "Curriculum Vitae",
+    "Resumes",
+])
+def test_inflected_headings_are_not_taken_as_the_name(heading):
+    name, email = applicant_contact(f"{heading}\nJane Doe\njane.doe@example.com")
+    assert name == "Jane Doe"
+    assert email == "jane.doe@example.com"
+
+
+def test_name_falls_back_to_label_then_email():
+    assert applicant_contact("SKILLS\nName: Bob Stone\n").name == "Bob Stone"
+    assert applicant_contact("SUMMARY\nj_smith99@mail.org").name == "J Smith"
+
+
+def test_recruiter_label_order_and_missing_email():
+    text = "rita@acme.com\ncontact: carl day\nfrom: rita"
+    assert recruiter_contact(text) == ("rita", "rita@acme.com")
+    assert recruiter_contact("no address here") is None
+
+
+def test_extract_many_matches_single_calls():
+    texts = ["Jane Doe\njane@x.com", "EDUCATION\nname: Al Bo", "Jane Doe\njane@x.com"]
+    assert extract_many(texts) == [applicant_contact(text) for text in texts]
+    assert extract_many(["hr@acme.com"], kind="recruiter") == [recruiter_contact("hr@acme.com")]
@@ -0,0 +1,46 @@
+import json
+
+from agent import corpus_cache
+from agent.corpus_cache import DriveFileCache
+
+FILE = {"id": "f1", "name": "posting.pdf", "modifiedTime": "2026-10-01T00:00:00Z", "md5Checksum": "aaa"}
+
+
+def test_changed_files_are_misses(tmp_path):
+    cache = DriveFileCache(str(tmp_path / "job_corpus.json"))
+    cache.put(FILE, {"requirements": "python"})
+    assert cache.get(FILE) == {"requirements": "python"}
+    assert cache.get({**FILE, "name": "renamed.pdf"}) == {"requirements": "python"}  # Metadata only
+    assert cache.get({**FILE, "md5Checksum": "bbb"}) is None
+    assert cache.get({**FILE, "modifiedTime": "2026-10-02T00:00:00Z"}) is None
+
+
+def test_save_reload_and_evict(tmp_path):
+    path = str(tmp_path / "job_corpus.json")
+    cache = DriveFileCache(path)
+    cache.put(FILE, {"requirements": "python"})
+    cache.put({**FILE, "id": "f2"}, {"skipped": True})
+    cache.save()
+
+    reloaded = DriveFileCache(path)
+    assert reloaded.payloads() == {"f1": {"requirements": "python"}, "f2": {"skipped": True}}
+    assert reloaded.evict_missing(["f1"]) == 1
+    reloaded.save()
+    assert list(DriveFileCache(path).payloads()) == ["f1"]
+
+
+def test_old_cache_format_is_rebuilt(tmp_path, capsys):
+    path = tmp_path / "job_corpus.json"
+    path.write_text(json.dumps({"version": corpus_cache.CACHE_VERSION - 1, "entries": {"f1": {}}}))
+    assert DriveFileCache(str(path)).payloads() == {}
+    assert "rebuilding" in capsys.readouterr().out
+
+
+def test_unreadable_cache_starts_empty(tmp_path):
+    path = tmp_path / "job_corpus.json"
+    path.write_text("{not json")
+    cache = DriveFileCache(str(path))
+    assert cache.payloads() == {}
+    cache.put(FILE, {"requirements": "python"})
+    cache.save()
+    assert DriveFileCache(str(path)).get(FILE) == {"requirements": "python"}
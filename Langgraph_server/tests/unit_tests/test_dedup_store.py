@@ -0,0 +1,50 @@
+import pytest
+
+import dedup_store
+from dedup_store import MemoryDedupStore, SqliteDedupStore, dedup_key, get_dedup_store
+
+
+def test_key_changes_with_the_content_version():
+    file = {"id": "f1", "md5Checksum": "aaa", "version": "7"}
+    assert dedup_key(file, "resume") == "resume:f1:aaa"
+    assert dedup_key({**file, "md5Checksum": None}, "resume") == "resume:f1:7"  # Google Docs have no md5
+    assert dedup_key(file, "posting") != dedup_key(file, "resume")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(ttl_seconds=60):
+        if request.param == "memory":
+            return MemoryDedupStore(ttl_seconds=ttl_seconds)
+        return SqliteDedupStore(str(tmp_path / "dedup.sqlite"), ttl_seconds=ttl_seconds)
+    return make
+
+
+def test_marked_keys_are_seen_until_they_expire(make_store, monkeypatch):
+    store = make_store(ttl_seconds=60)
+    assert not store.seen("k")
+    store.mark("k")
+    assert store.seen("k")
+
+    later = dedup_store.time.time() + 61
+    monkeypatch.setattr(dedup_store, "time", type("Clock", (), {"time": staticmethod(lambda: later)}))
+    assert not store.seen("k")
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    SqliteDedupStore(str(tmp_path / "dedup.sqlite")).mark("k")
+    assert SqliteDedupStore(str(tmp_path / "dedup.sqlite")).seen("k")
+
+
+def test_memory_store_evicts_the_least_recently_seen():
+    store = MemoryDedupStore(max_entries=2)
+    store.mark("a")
+    store.mark("b")
+    assert store.seen("a")  # a is now more recent than b
+    store.mark("c")
+    assert store.seen("a") and store.seen("c") and not store.seen("b")
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_dedup_store("redis")
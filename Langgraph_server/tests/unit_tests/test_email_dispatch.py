@@ -0,0 +1,20 @@
+import asyncio
+
+from agent.email_dispatch import EmailDispatcher
+
+
+def test_duplicates_are_coalesced_but_not_different_attachments():
+    sent = []
+
+    async def send(payload):
+        sent.append(payload)
+        return len(sent)
+
+    def payload(attachment):
+        return {"recipient_email": "r@example.com", "subject": "Match", "body": "Hi", "attachments": [{"filename": "cv.pdf", "file_bytes": attachment}]}
+
+    dispatcher = EmailDispatcher(send, per_domain_rpm=0, per_sender_rpm=0)
+    results = asyncio.run(dispatcher.send_all([payload("v1"), payload("v1"), payload("v2")]))
+
+    assert len(sent) == 2
+    assert results[0] == results[1] != results[2]
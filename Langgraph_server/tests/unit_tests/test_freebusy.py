@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from agent.freebusy import FreeBusyCache, query_busy
+
+START = datetime(2026, 10, 19)
+END = START + timedelta(days=12)
+
+
+class FakeCalendar:
+    """Stands in for the Calendar service: freebusy().query(body=...).execute()."""
+
+    def __init__(self, busy, inaccessible=()):
+        self.busy = busy
+        self.inaccessible = set(inaccessible)
+        self.queries = []
+
+    def freebusy(self):
+        return self
+
+    def query(self, body):
+        self.queries.append([item["id"] for item in body["items"]])
+        calendars = {
+            item["id"]: {"busy": self.busy.get(item["id"], [])}
+            for item in body["items"] if item["id"] not in self.inaccessible
+        }
+        return type("Request", (), {"execute": lambda _: {"calendars": calendars}})()
+
+
+def test_one_query_for_every_missing_calendar_then_cached():
+    busy = {"a@example.com": [{"start": "2026-10-20T17:00:00Z", "end": "2026-10-20T18:00:00Z"}]}
+    service = FakeCalendar(busy, inaccessible={"c@example.com"})
+    cache = FreeBusyCache()
+
+    first = query_busy(service, ["a@example.com", "b@example.com", "a@example.com", "c@example.com"], START, END, cache)
+    assert service.queries == [["a@example.com", "b@example.com", "c@example.com"]]
+    assert first["a@example.com"] == [(datetime(2026, 10, 20, 17), datetime(2026, 10, 20, 18))]
+    assert first["b@example.com"] == []
+    assert first["c@example.com"] is None  # No access, cached too
+
+    assert query_busy(service, ["a@example.com", "c@example.com"], START, END, cache) == {
+        "a@example.com": first["a@example.com"], "c@example.com": None,
+    }
+    assert len(service.queries) == 1
+
+
+def test_entries_expire_and_only_cover_their_range():
+    cache = FreeBusyCache(ttl_seconds=60)
+    cache.put("a@example.com", START, END, [])
+    assert cache.get("a@example.com", START + timedelta(days=1), END) == (True, [])
+    assert cache.get("a@example.com", START - timedelta(days=1), END) == (False, None)
+
+    expired = FreeBusyCache(ttl_seconds=-1)
+    expired.put("a@example.com", START, END, [])
+    assert expired.get("a@example.com", START, END) == (False, None)
+
+
+def test_large_lookups_are_split_in_groups_of_fifty():
+    service = FakeCalendar({})
+    emails = [f"r{i}@example.com" for i in range(120)]
+    query_busy(service, emails, START, END, FreeBusyCache())
+    assert [len(group) for group in service.queries] == [50, 50, 20]
@@ -0,0 +1,40 @@
+import sqlite3
+import time
+
+from agent.match_cache import MatchCache
+
+
+def age_rows(path, seconds):
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE match_cache SET created_at = created_at - ?", (seconds,))
+
+
+def count_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM match_cache").fetchone()[0]
+
+
+def test_purge_expired_removes_only_old_rows(tmp_path):
+    path = str(tmp_path / "match_cache.sqlite")
+    cache = MatchCache(path, ttl_seconds=60, max_entries=0)
+    cache.put("old", "a")
+    age_rows(path, 120)
+    cache.put("new", "b")
+
+    assert cache.purge_expired() == 1
+    assert cache.get("new") == "b"
+    assert count_rows(path) == 1
+
+
+def test_put_sweeps_expired_rows_once_the_interval_passed(tmp_path):
+    path = str(tmp_path / "match_cache.sqlite")
+    cache = MatchCache(path, ttl_seconds=60, max_entries=0)
+    cache.put("old", "a")
+    age_rows(path, 120)
+
+    cache.put("other", "b")  # The first put already swept, the next sweep waits for the interval
+    assert count_rows(path) == 2
+
+    cache._last_purge = time.time() - 7200
+    cache.put("third", "c")
+    assert count_rows(path) == 2
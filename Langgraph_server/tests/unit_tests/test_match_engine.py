@@ -0,0 +1,88 @@
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+
+from agent.match_engine import MATCH_PROMPT_VERSION, RateLimiter, match_postings, match_postings_versioned, match_prompt_version, pack_batches, run_prompts
+
+
+class FakeChatModel:
+    """Stand-in for the chat model: `ainvoke` sleeps `latency` seconds and records how many calls overlap."""
+
+    def __init__(self, latency=0.05, reply=None):
+        self.latency = latency
+        self.reply = reply or (lambda prompt: "Score: 9/10\nDid Meet All Requirements: Yes\nComment: ok")
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            return SimpleNamespace(content=self.reply(prompt))
+        finally:
+            self.in_flight -= 1
+
+
+def no_limits():
+    return RateLimiter(rpm=0, tpm=0)
+
+
+def test_run_prompts_bounds_concurrency_and_keeps_order():
+    llm = FakeChatModel(latency=0.02, reply=lambda prompt: prompt.upper())
+    prompts = [f"prompt {i}" for i in range(20)]
+    answers = asyncio.run(run_prompts(llm, prompts, max_in_flight=3, rate_limiter=no_limits()))
+    assert answers == [prompt.upper() for prompt in prompts]
+    assert llm.max_in_flight == 3
+
+
+def test_run_prompts_times_out_slow_calls():
+    llm = FakeChatModel(latency=1.0)
+    answers = asyncio.run(run_prompts(llm, ["a", "b"], timeout=0.05, rate_limiter=no_limits()))
+    assert all(isinstance(answer, TimeoutError) for answer in answers)
+
+
+def test_pack_batches_respects_budget_and_size():
+    requirements = ["x" * 400] * 10
+    batches = pack_batches("resume", requirements, token_budget=900, max_postings=4)
+    assert sorted(i for batch in batches for i in batch) == list(range(10))
+    assert all(1 <= len(batch) <= 4 for batch in batches)
+    assert len(batches) > 1
+
+
+def batch_reply(prompt):
+    count = len(re.findall(r"Posting \d+ Requirements", prompt))
+    if count == 0:  # Single posting prompt
+        return "Score: 3/10\nDid Meet All Requirements: No\nComment: single"
+    if "broken" in prompt:
+        return "Sorry, I can't answer in JSON."
+    return json.dumps([{"id": i, "score": 9, "requirements_met": True, "comment": "batch"} for i in range(1, count + 1)])
+
+
+def test_batch_mode_falls_back_to_single_prompts(monkeypatch):
+    monkeypatch.setattr("agent.match_engine.get_shared_rate_limiter", no_limits)
+    monkeypatch.setattr("agent.match_engine.pack_batches", lambda resume, requirements: pack_batches(resume, requirements, max_postings=2))
+    llm = FakeChatModel(latency=0.01, reply=batch_reply)
+    requirements = ["python", "java", "broken go", "rust"]
+
+    answers = asyncio.run(match_postings(llm, "resume", requirements, batch_mode=True))
+
+    assert [answer.splitlines()[-1] for answer in answers] == [
+        "Comment: batch", "Comment: batch", "Comment: single", "Comment: single",
+    ]
+    # Two batch prompts, then one single prompt for each posting of the batch that could not be parsed
+    assert len(llm.prompts) == 4
+
+
+def test_fallback_answers_carry_the_single_prompt_version(monkeypatch):
+    monkeypatch.setattr("agent.match_engine.get_shared_rate_limiter", no_limits)
+    monkeypatch.setattr("agent.match_engine.pack_batches", lambda resume, requirements: pack_batches(resume, requirements, max_postings=2))
+    llm = FakeChatModel(latency=0.01, reply=batch_reply)
+
+    answers = asyncio.run(match_postings_versioned(llm, "resume", ["python", "java", "broken go", "rust"], batch_mode=True))
+
+    batch_version = match_prompt_version(True)
+    assert [version for _, version in answers] == [batch_version, batch_version, MATCH_PROMPT_VERSION, MATCH_PROMPT_VERSION]
@@ -0,0 +1,126 @@
+import asyncio
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+pytest.importorskip("fastmcp")
+
+from fastmcp import Client  # noqa: E402
+from fastmcp.client.transports import StreamableHttpTransport  # noqa: E402
+from fastmcp.exceptions import ToolError  # noqa: E402
+
+from agent.mcp_pool import MCPSessionPool  # noqa: E402
+
+# Local stand-in for the MCP server (an echo tool and a tool that always fails)
+SERVER = textwrap.dedent("""
+    import sys
+    from fastmcp import FastMCP
+    from fastmcp.exceptions import ToolError
+
+    mcp = FastMCP("stand-in")
+
+    @mcp.tool
+    def echo(text: str) -> str:
+        return text
+
+    @mcp.tool
+    def fail() -> str:
+        raise ToolError("boom")
+
+    mcp.run(transport="http", host="127.0.0.1", port=int(sys.argv[1]), log_level="error")
+""")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port):
+    process = subprocess.Popen([sys.executable, "-c", SERVER, str(port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    pytest.fail("MCP stand-in server did not start")
+
+
+def stop_server(process):
+    process.terminate()
+    process.wait(10)
+
+
+@pytest.fixture
+def server_port():
+    port = free_port()
+    process = start_server(port)
+    yield port, process
+    if process.poll() is None:
+        stop_server(process)
+
+
+def make_pool(port, size):
+    url = f"http://127.0.0.1:{port}/mcp/"
+    return MCPSessionPool(lambda: Client(StreamableHttpTransport(url=url)), size=size, call_timeout=3)
+
+
+def text_of(result):
+    return result.content[0].text
+
+
+def test_pool_reuses_sessions_and_bounds_concurrency(server_port):
+    port, _ = server_port
+    pool = make_pool(port, size=3)
+
+    async def scenario():
+        results = await asyncio.gather(*(pool.call_tool("echo", {"text": str(i)}) for i in range(10)))
+        await pool.close()
+        return [text_of(result) for result in results]
+
+    assert asyncio.run(scenario()) == [str(i) for i in range(10)]
+    assert pool.stats["calls"] == 10
+    assert pool.stats["handshakes"] == 3  # One per pooled session, reused by the other calls
+
+
+def test_tool_error_is_raised_without_reconnecting(server_port):
+    port, _ = server_port
+    pool = make_pool(port, size=1)
+
+    async def scenario():
+        with pytest.raises(ToolError):
+            await pool.call_tool("fail", {})
+        result = await pool.call_tool("echo", {"text": "still here"})
+        await pool.close()
+        return text_of(result)
+
+    assert asyncio.run(scenario()) == "still here"
+    assert pool.stats["handshakes"] == 1
+    assert pool.stats["reconnects"] == 0
+
+
+def test_pool_reconnects_after_the_server_drops(server_port):
+    port, process = server_port
+    pool = make_pool(port, size=1)
+
+    async def scenario():
+        assert text_of(await pool.call_tool("echo", {"text": "before"})) == "before"
+        stop_server(process)
+        restarted = await asyncio.to_thread(start_server, port)
+        try:
+            return text_of(await pool.call_tool("echo", {"text": "after"}, retries=2))
+        finally:
+            await pool.close()
+            stop_server(restarted)
+
+    assert asyncio.run(scenario()) == "after"
+    assert pool.stats["handshakes"] >= 2
+    assert pool.stats["reconnects"] >= 1
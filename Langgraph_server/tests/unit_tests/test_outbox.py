@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+from agent import outbox as outbox_module
+from agent.outbox import Outbox, idempotency_key, run_email_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+def make_outbox(tmp_path, max_attempts=3):
+    return Outbox(str(tmp_path / "outbox.sqlite"), max_attempts=max_attempts)
+
+
+def payload(body="Hello", attachment=None):
+    message = {"sender_id": "me", "recipient_email": "Recruiter@Example.com", "subject": "Match", "body": body}
+    if attachment is not None:
+        message["attachments"] = [{"filename": "resume.pdf", "file_bytes": attachment}]
+    return message
+
+
+def test_run_email_key_changes_with_the_upload_and_attachment():
+    key = run_email_key("recruiter", "file-1", "md5-a", ["job.pdf"], "r@example.com", b"v1")
+    assert key == run_email_key("recruiter", "file-1", "md5-a", ["job.pdf"], "R@example.com", b"v1")
+    assert key != run_email_key("recruiter", "file-1", "md5-b", ["job.pdf"], "r@example.com", b"v1")
+    assert key != run_email_key("recruiter", "file-1", "md5-a", ["job.pdf"], "r@example.com", b"v2")
+    assert key != run_email_key("applicant", "file-1", "md5-a", ["job.pdf"], "r@example.com", b"v1")
+    assert key != run_email_key("recruiter", "file-1", "md5-a", ["other.pdf"], "r@example.com", b"v1")
+
+
+def test_default_key_includes_attachments():
+    assert idempotency_key(payload(attachment="djE=")) != idempotency_key(payload(attachment="djI="))
+
+
+def test_reuploaded_resume_is_queued_again(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first = run_email_key("recruiter", "file-1", "md5-a", ["job.pdf"], "r@example.com", b"v1")
+    assert outbox.enqueue(payload(), first)
+    assert not outbox.enqueue(payload(), first)  # Replayed run
+    assert outbox.enqueue(payload(), run_email_key("recruiter", "file-1", "md5-b", ["job.pdf"], "r@example.com", b"v2"))
+
+
+def test_requeue_keeps_newer_messages_with_the_same_key(tmp_path, capsys):
+    outbox = make_outbox(tmp_path, max_attempts=1)
+    outbox.enqueue(payload("old"), "k1")
+    outbox.enqueue(payload("other"), "k2")
+    for message_id, _ in outbox.claim():
+        assert outbox.mark_failed(message_id, "boom")
+    outbox.enqueue(payload("new"), "k1")  # Queued again after the first one was dead-lettered
+
+    assert outbox.requeue_dead_letters() == 1
+    assert "not requeued" in capsys.readouterr().out
+    assert outbox.stats() == {"pending": 2, "dead_letter": 1}
+    bodies = sorted(message["body"] for _, message in outbox.claim())
+    assert bodies == ["new", "other"]
+
+
+def test_enqueue_emails_uses_the_given_keys(tmp_path, monkeypatch):
+    outbox = make_outbox(tmp_path)
+    monkeypatch.setattr(outbox_module, "get_outbox", lambda: outbox)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def scenario():
+        queued = await outbox_module.enqueue_emails([payload("one"), payload("two")], send, ["a", "b"])
+        worker = outbox_module.start_outbox_worker(send)
+        await asyncio.sleep(0.5)
+        worker.task.cancel()
+        return queued
+
+    assert asyncio.run(scenario()) == 2
+    assert len(sent) == 2
+    assert outbox.stats() == {"sent": 2, "dead_letter": 0}
+
+
+def test_failed_sends_back_off_then_dead_letter(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox_module, "OUTBOX_BACKOFF_SECONDS", 10)
+    monkeypatch.setattr(outbox_module.random, "uniform", lambda low, high: 1.0)
+    clock = FakeClock()
+    monkeypatch.setattr(outbox_module, "time", clock)
+    outbox = make_outbox(tmp_path, max_attempts=3)
+    outbox.enqueue(payload(), "k")
+
+    [(message_id, _)] = outbox.claim()
+    assert not outbox.mark_failed(message_id, "first")
+    assert outbox.claim() == []  # Not due before the backoff
+    clock.now += 10
+    assert [m for m, _ in outbox.claim()] == [message_id]
+
+    assert not outbox.mark_failed(message_id, "second")
+    clock.now += 19
+    assert outbox.claim() == []  # The delay doubled
+    clock.now += 1
+    assert [m for m, _ in outbox.claim()] == [message_id]
+
+    assert outbox.mark_failed(message_id, "third")
+    assert outbox.stats() == {"dead_letter": 1}
+
+
+def test_expired_lease_hands_the_message_out_again(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(outbox_module, "time", clock)
+    outbox = make_outbox(tmp_path)
+    outbox.enqueue(payload(), "k")
+
+    [(message_id, _)] = outbox.claim(lease_seconds=60)
+    assert outbox.claim(lease_seconds=60) == []  # Leased to the first worker
+    clock.now += 61  # That worker died without acking
+    assert [m for m, _ in outbox.claim(lease_seconds=60)] == [message_id]
+
+    outbox.mark_sent(message_id)
+    clock.now += 120
+    assert outbox.claim() == []
+    assert not outbox.enqueue(payload(), "k")  # Sent keys block re-sends until purged
+    assert outbox.purge_sent(retention_seconds=60) == 1
+    assert outbox.enqueue(payload(), "k")
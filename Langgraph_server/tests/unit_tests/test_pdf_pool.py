@@ -0,0 +1,37 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from agent.pdf_pool import extract_many, extract_one  # noqa: E402
+
+
+def make_pdf(*pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_extract_one_reads_every_page():
+    text = extract_one(make_pdf("First page", "Second page"))
+    assert "First page" in text and "Second page" in text
+
+
+def test_extract_one_raises_for_a_broken_pdf():
+    with pytest.raises(Exception):
+        extract_one(b"not a pdf")
+
+
+def test_pool_and_inline_extraction_agree():
+    pdfs = {f"f{i}": make_pdf(f"Posting {i}") for i in range(4)}
+    pdfs["broken"] = b"not a pdf"
+
+    pooled = extract_many(pdfs, workers=2)
+    inline = extract_many(pdfs, workers=0)
+
+    assert isinstance(pooled.pop("broken"), Exception)
+    assert isinstance(inline.pop("broken"), Exception)
+    assert pooled == inline
+    assert "Posting 3" in pooled["f3"]
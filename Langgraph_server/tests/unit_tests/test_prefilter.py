@@ -0,0 +1,55 @@
+import numpy as np
+
+from agent import prefilter
+from agent.prefilter import TfidfIndex, corpus_key, refresh_job_index, tokenize
+
+DOCS = {
+    "py": "Python, Django and PostgreSQL. CI/CD with GitHub Actions.",
+    "js": "Node.js and React front end, TypeScript.",
+    "cpp": "C++ and C# for game engines, low level performance work.",
+    "ops": "Kubernetes, Terraform, AWS operations and on-call.",
+}
+
+
+def test_tokenize_keeps_tech_tokens_and_drops_stop_words():
+    assert tokenize("Experience with C++, C#, Node.js and CI/CD in the cloud") == ["c++", "c#", "node.js", "ci/cd", "cloud"]
+
+
+def test_rank_puts_the_closest_posting_first():
+    index = TfidfIndex.build(DOCS)
+    ranked = index.rank("Built Django services in Python on PostgreSQL", top_k=2, min_score=0)
+    assert [doc_id for doc_id, _ in ranked][0] == "py"
+    assert len(ranked) == 2
+
+
+def test_rank_limits():
+    index = TfidfIndex.build(DOCS)
+    resume = "React and TypeScript, some Python"
+    assert len(index.rank(resume, top_k=0, min_score=0)) == len(DOCS)  # Both limits disabled
+    above = index.rank(resume, top_k=0, min_score=0.05)
+    assert {doc_id for doc_id, _ in above} == {"js", "py"}
+    assert all(score >= 0.05 for _, score in above)
+    assert index.score("nothing in common").tolist() == [0.0] * len(DOCS)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = TfidfIndex.build(DOCS)
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = TfidfIndex.load(path)
+    assert loaded.doc_ids == index.doc_ids and loaded.key == index.key
+    np.testing.assert_allclose(loaded.score("Python Django"), index.score("Python Django"))
+
+
+def test_refresh_only_rebuilds_when_the_postings_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(prefilter, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(prefilter, "_indexes", {})
+    first = refresh_job_index("folder", DOCS)
+    assert refresh_job_index("folder", dict(DOCS)) is first
+
+    changed = {**DOCS, "go": "Go microservices"}
+    second = refresh_job_index("folder", changed)
+    assert second is not first and second.key == corpus_key(changed)
+
+    monkeypatch.setattr(prefilter, "_indexes", {})  # New process: loaded from disk
+    assert prefilter.get_job_index("folder").key == second.key
@@ -0,0 +1,93 @@
+import random
+
+from agent.sections import SectionSegmenter, posting_sections, resume_sections
+
+WORDS = "python java cloud team lead design build data api service customer growth agile scale".split()
+
+
+# The per-line scans extract_experience_node / parse_job_text used before the segmenter (the requirements
+# slice with its off-by-one fixed). Both take the cleaned lines and return (start, end) or None.
+def old_experience(lines):
+    end_keys = ["CERTIFICATIONS", "EDUCATION", "SKILLS", "PROJECTS", "SUMMARY"]
+    try:
+        start_index = next(i for i, line in enumerate(lines) if "WORK EXPERIENCE" in line.upper())
+    except StopIteration:
+        return None
+    end_index = len(lines)
+    for i in range(start_index + 1, len(lines)):
+        if any(key in lines[i].upper() for key in end_keys):
+            end_index = i
+            break
+    return start_index, end_index
+
+
+def old_requirements(lines):
+    start_keys = ["skills required", "required skills", "job requirements"]
+    end_keys = ["nice to have", "about you", "about the team", "about the company"]
+    start_index = None
+    for i, line in enumerate(lines[2:]):
+        if any(key in line.lower() for key in start_keys):
+            start_index = i + 2
+            break
+    if start_index is None:
+        return None
+    end_index = len(lines)
+    for j in range(start_index + 1, len(lines)):
+        if any(key in lines[j].lower() for key in end_keys):
+            end_index = j
+            break
+    return start_index, end_index
+
+
+def bounds(section):
+    return None if section is None else (section.start, section.end)
+
+
+def filler(rng, count):
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 8))) for _ in range(count)]
+
+
+def make_resume(rng):
+    lines = ["Jane Doe", "jane.doe@example.com"] + filler(rng, rng.randint(0, 4))
+    headings = ["Work Experience", "EDUCATION", "Skills", "PROJECTS", "Certifications", "Summary", "Work experience and skills"]
+    for heading in rng.sample(headings, rng.randint(0, len(headings))):
+        lines += [heading] + filler(rng, rng.randint(0, 6))
+    return lines
+
+
+def make_posting(rng):
+    lines = ["Senior Engineer", rng.choice(["Acme Corp", "Required skills below"])] + filler(rng, rng.randint(0, 5))
+    headings = ["Required Skills", "Job requirements", "Nice to have", "About the team", "About you", "Skills required, about the company"]
+    for heading in rng.sample(headings, rng.randint(0, len(headings))):
+        lines += [heading] + filler(rng, rng.randint(0, 6))
+    return lines
+
+
+def test_find_matches_the_old_resume_scan():
+    rng = random.Random(3)
+    for _ in range(2000):
+        lines = make_resume(rng)
+        assert bounds(resume_sections.find(lines, "experience")) == old_experience(lines)
+
+
+def test_find_matches_the_old_posting_scan():
+    rng = random.Random(5)
+    for _ in range(2000):
+        lines = make_posting(rng)
+        assert bounds(posting_sections.find(lines, "requirements", first_line=2)) == old_requirements(lines)
+
+
+def test_split_agrees_with_find():
+    rng = random.Random(9)
+    for _ in range(500):
+        lines = make_resume(rng)
+        sections = resume_sections.split(lines)
+        for name in ("experience", "education", "skills", "projects", "certifications", "summary"):
+            assert bounds(sections.get(name)) == bounds(resume_sections.find(lines, name))
+
+
+def test_headings_lists_every_heading_line_in_order():
+    segmenter = SectionSegmenter({"a": ["ALPHA"], "b": ["BETA", "GAMMA"]})
+    lines = ["intro", "Alpha and beta", "text", "gamma", "alphabet"]
+    assert segmenter.headings(lines) == [(1, frozenset({"a", "b"})), (3, frozenset({"b"})), (4, frozenset({"a"}))]
+    assert segmenter.headings(lines, first_line=2) == [(3, frozenset({"b"})), (4, frozenset({"a"}))]
@@ -0,0 +1,109 @@
+import random
+from datetime import datetime, time, timedelta
+
+from agent.slot_finder import WORKING_HOURS, FreeTimeIndex
+
+MONDAY = datetime(2026, 10, 19)
+HORIZON_END = MONDAY + timedelta(days=12)  # Two working weeks
+
+
+def scan_slots(busy, window, slot_minutes, limit, not_before):
+    """Reference: walk every working day window in 30 minute steps and test each slot against the busy list."""
+    slots = []
+    day = MONDAY
+    while day < HORIZON_END and len(slots) < limit:
+        if day.weekday() < 5:
+            start = datetime.combine(day.date(), window[0])
+            end = datetime.combine(day.date(), window[1])
+            while start + timedelta(minutes=slot_minutes) <= end and len(slots) < limit:
+                slot_end = start + timedelta(minutes=slot_minutes)
+                if start >= not_before and not any(s < slot_end and e > start for s, e in busy):
+                    slots.append(start)
+                    start = slot_end
+                else:
+                    start += timedelta(minutes=30)
+        day += timedelta(days=1)
+    return slots
+
+
+def old_collect_slots_in_window(busy_intervals, window_start, window_end, max_to_collect):
+    """The per-window busy list walk find_free_time_ used before the bitmap (30 minute slots)."""
+    slots = []
+    cursor = window_start
+    for start, end in busy_intervals:
+        if end <= cursor:
+            continue
+        if start > cursor:
+            free_until = min(start, window_end)
+            while max_to_collect > 0 and cursor + timedelta(minutes=30) <= free_until:
+                slots.append(cursor)
+                cursor += timedelta(minutes=30)
+                max_to_collect -= 1
+                if max_to_collect == 0:
+                    return slots
+        cursor = max(cursor, end)
+        if cursor >= window_end:
+            return slots
+    while max_to_collect > 0 and cursor + timedelta(minutes=30) <= window_end:
+        slots.append(cursor)
+        cursor += timedelta(minutes=30)
+        max_to_collect -= 1
+    return slots
+
+
+def old_find_slots(busy, window, needed):
+    slots = []
+    for day_offset in range(12):
+        day = MONDAY + timedelta(days=day_offset)
+        if day.weekday() >= 5 or len(slots) >= needed:
+            continue
+        start, end = datetime.combine(day.date(), window[0]), datetime.combine(day.date(), window[1])
+        slots += old_collect_slots_in_window(busy, start, end, needed - len(slots))
+    return slots
+
+
+def random_busy(rng, count, minutes=(0, 15, 30, 45), lengths=(15, 30, 60, 90, 180)):
+    busy = []
+    for _ in range(count):
+        start = MONDAY + timedelta(days=rng.randrange(12), hours=rng.randrange(8, 18), minutes=rng.choice(minutes))
+        busy.append((start, start + timedelta(minutes=rng.choice(lengths))))
+    return sorted(busy)
+
+
+def test_matches_a_plain_scan_of_the_busy_list():
+    rng = random.Random(7)
+    for _ in range(200):
+        busy = random_busy(rng, rng.randrange(0, 40))
+        not_before = MONDAY + timedelta(days=rng.randrange(3))
+        index = FreeTimeIndex(busy, MONDAY, HORIZON_END)
+        for period in ("morning", "afternoon"):
+            window = WORKING_HOURS[period]
+            for slot_minutes, limit in ((30, 2), (60, 3), (30, 50)):
+                expected = scan_slots(busy, window, slot_minutes, limit, not_before)
+                assert index.find_slots(window, slot_minutes, limit, not_before) == expected
+
+
+def test_matches_the_old_window_walk_on_half_hour_calendars():
+    # The old walk could start a slot at any minute a meeting ended; on a half hour grid both agree
+    rng = random.Random(11)
+    for _ in range(200):
+        busy = random_busy(rng, rng.randrange(0, 40), minutes=(0, 30), lengths=(30, 60, 90, 180))
+        index = FreeTimeIndex(busy, MONDAY, HORIZON_END)
+        for period in ("morning", "afternoon"):
+            window = WORKING_HOURS[period]
+            assert index.find_slots(window, 30, 2, MONDAY) == old_find_slots(busy, window, 2)
+
+
+def test_busy_block_blocks_every_cell_it_touches():
+    busy = [(datetime.combine(MONDAY.date(), time(9, 10)), datetime.combine(MONDAY.date(), time(9, 40)))]
+    index = FreeTimeIndex(busy, MONDAY, HORIZON_END)
+    assert index.find_slots(WORKING_HOURS["morning"], limit=1) == [datetime.combine(MONDAY.date(), time(10, 0))]
+
+
+def test_weekends_and_fully_busy_calendars_have_no_slots():
+    index = FreeTimeIndex([(MONDAY, HORIZON_END)], MONDAY, HORIZON_END)
+    assert index.find_slots(WORKING_HOURS["afternoon"], limit=4) == []
+
+    saturday = MONDAY + timedelta(days=5)
+    index = FreeTimeIndex([], saturday, saturday + timedelta(days=2))
+    assert index.find_slots(WORKING_HOURS["morning"], limit=4) == []
@@ -0,0 +1,21 @@
+from sync_state import SyncStateStore
+
+
+def test_page_triggers_are_committed_with_the_token(tmp_path):
+    store = SyncStateStore(str(tmp_path / "drive_sync.sqlite"))
+    store.commit_page("token-2", [("resume:f1:a", "resume", {"id": "f1", "name": "cv.pdf"}), ("posting:f2:b", "posting", {"id": "f2"})])
+
+    reopened = SyncStateStore(str(tmp_path / "drive_sync.sqlite"))  # As after a crash
+    assert reopened.get_page_token() == "token-2"
+    assert [key for key, _, _ in reopened.pending_triggers()] == ["posting:f2:b", "resume:f1:a"]
+
+    reopened.remove_pending_trigger("resume:f1:a")
+    assert reopened.pending_triggers() == [("posting:f2:b", "posting", {"id": "f2"})]
+
+
+def test_a_trigger_seen_on_two_pages_is_stored_once(tmp_path):
+    store = SyncStateStore(str(tmp_path / "drive_sync.sqlite"))
+    store.commit_page("token-2", [("resume:f1:a", "resume", {"id": "f1"})])
+    store.commit_page("token-3", [("resume:f1:a", "resume", {"id": "f1"})])
+    assert len(store.pending_triggers()) == 1
+    assert store.get_page_token() == "token-3"